@@ -1,1418 +1,4347 @@
-import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from datetime import datetime, date, timedelta
-from werkzeug.security import generate_password_hash, check_password_hash
-from decimal import Decimal
-from sqlalchemy import func, extract
-import traceback
-
-app = Flask(__name__)
-
-# Configuração do banco com psycopg3
-database_url = os.getenv('DATABASE_URL')
-if database_url and database_url.startswith('postgresql://'):
-    database_url = database_url.replace('postgresql://', 'postgresql+psycopg://', 1)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'mindcarepro-secret-key')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-
-# Inicialização das extensões
-db = SQLAlchemy(app)
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
-@login_manager.user_loader
-def load_user(user_id):
-    return Usuario.query.get(int(user_id))
-
-# ========== MODELOS DO BANCO DE DADOS ==========
-
-class Usuario(UserMixin, db.Model):
-    __tablename__ = 'usuarios'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    senha_hash = db.Column(db.String(255), nullable=False)
-    tipo = db.Column(db.String(20), nullable=False, default='psicologo')
-    ativo = db.Column(db.Boolean, default=True)
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def set_password(self, password):
-        self.senha_hash = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.senha_hash, password)
-
-class Paciente(db.Model):
-    __tablename__ = 'pacientes'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120))
-    telefone = db.Column(db.String(20))
-    data_nascimento = db.Column(db.Date)
-    endereco = db.Column(db.Text)
-    observacoes = db.Column(db.Text)
-    ativo = db.Column(db.Boolean, default=True)
-    data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
-    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    
-    sessoes = db.relationship('Sessao', backref='paciente', lazy=True)
-    evolucoes = db.relationship('Evolucao', backref='paciente', lazy=True)
-
-class Sessao(db.Model):
-    __tablename__ = 'sessoes'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
-    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    data_sessao = db.Column(db.DateTime, nullable=False)
-    duracao = db.Column(db.Integer, default=50)
-    valor = db.Column(db.Numeric(10, 2))
-    status = db.Column(db.String(20), default='agendada')
-    observacoes = db.Column(db.Text)
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    psicologo = db.relationship('Usuario', backref='sessoes_psicologo', lazy=True)
-
-class Evolucao(db.Model):
-    __tablename__ = 'evolucoes'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
-    data_evolucao = db.Column(db.DateTime, default=datetime.utcnow)
-    titulo = db.Column(db.String(200), nullable=False)
-    descricao = db.Column(db.Text, nullable=False)
-    tipo = db.Column(db.String(50), default='evolucao')
-    humor = db.Column(db.String(20))
-    medicamentos = db.Column(db.Text)
-    observacoes_privadas = db.Column(db.Text)
-
-class Configuracao(db.Model):
-    __tablename__ = 'configuracoes'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, unique=True)
-    nome_completo = db.Column(db.String(200))
-    crp = db.Column(db.String(20))
-    especialidade = db.Column(db.String(200))
-    telefone_profissional = db.Column(db.String(20))
-    email_profissional = db.Column(db.String(120))
-    endereco = db.Column(db.String(300))
-    cidade = db.Column(db.String(100))
-    estado = db.Column(db.String(2))
-    cep = db.Column(db.String(10))
-    duracao_sessao = db.Column(db.Integer, default=50)
-    valor_sessao = db.Column(db.Numeric(10, 2))
-    horario_inicio = db.Column(db.Time)
-    horario_fim = db.Column(db.Time)
-    dias_atendimento = db.Column(db.String(50))
-    lembrete_paciente = db.Column(db.Boolean, default=True)
-    antecedencia_lembrete = db.Column(db.Integer, default=24)
-    
-    usuario = db.relationship('Usuario', backref='configuracao', uselist=False)
-
-# ========== FUNÇÕES AUXILIARES ==========
-
-def processar_login():
-    email = request.form.get('email', '').strip()
-    senha = request.form.get('senha', '')
-    
-    if not email or not senha:
-        flash('Email e senha são obrigatórios', 'error')
-        return False
-    
-    usuario = Usuario.query.filter_by(email=email).first()
-    
-    if usuario and usuario.check_password(senha) and usuario.ativo:
-        login_user(usuario)
-        return True
-    else:
-        flash('Email ou senha inválidos', 'error')
-        return False
-
-def obter_estatisticas_gerais(data_inicio, data_fim):
-    try:
-        stats = {}
-        stats['total_pacientes'] = Paciente.query.filter_by(psicologo_id=current_user.id).count()
-        stats['pacientes_ativos'] = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
-        
-        sessoes_periodo = Sessao.query.filter(
-            Sessao.psicologo_id == current_user.id,
-            func.date(Sessao.data_sessao) >= data_inicio,
-            func.date(Sessao.data_sessao) <= data_fim
-        ).all()
-        
-        stats['total_sessoes'] = len(sessoes_periodo)
-        stats['sessoes_realizadas'] = len([s for s in sessoes_periodo if s.status == 'realizada'])
-        stats['sessoes_agendadas'] = len([s for s in sessoes_periodo if s.status == 'agendada'])
-        stats['sessoes_canceladas'] = len([s for s in sessoes_periodo if s.status in ['cancelada', 'faltou']])
-        stats['receita_total'] = sum(float(s.valor or 0) for s in sessoes_periodo if s.status == 'realizada')
-        stats['receita_pendente'] = sum(float(s.valor or 0) for s in sessoes_periodo if s.status == 'agendada')
-        
-        sessoes_com_valor = [s for s in sessoes_periodo if s.status == 'realizada' and s.valor]
-        if sessoes_com_valor:
-            stats['valor_medio_sessao'] = stats['receita_total'] / len(sessoes_com_valor)
-        else:
-            stats['valor_medio_sessao'] = 0
-        
-        if stats['total_sessoes'] > 0:
-            stats['taxa_comparecimento'] = (stats['sessoes_realizadas'] / stats['total_sessoes']) * 100
-        else:
-            stats['taxa_comparecimento'] = 0
-        
-        return stats
-    except Exception as e:
-        print(f"❌ Erro ao obter estatísticas: {e}")
-        traceback.print_exc()
-        return {}
-
-# ========== ROTAS PRINCIPAIS ==========
-
-@app.route('/', methods=['GET', 'POST'])
-def index():
-    if request.method == 'POST':
-        if processar_login():
-            return redirect(url_for('dashboard'))
-        return render_template('login.html')
-    
-    if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
-    return render_template('login.html')
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        if processar_login():
-            return redirect(url_for('dashboard'))
-        return render_template('login.html')
-    
-    if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
-    return render_template('login.html')
-
-@app.route('/logout')
-@login_required
-def logout():
-    logout_user()
-    return redirect(url_for('login'))
-
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    print("✅ Rota /dashboard acessada")
-    total_pacientes = 0
-    sessoes_hoje = 0
-    proximas_sessoes = []
-    sessoes_mes = 0
-    receita_mes = 0
-    
-    try:
-        total_pacientes = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
-        hoje = date.today()
-        sessoes_hoje = Sessao.query.filter_by(psicologo_id=current_user.id).filter(
-            db.func.date(Sessao.data_sessao) == hoje
-        ).count()
-        
-        proximas_sessoes = Sessao.query.filter_by(
-            psicologo_id=current_user.id,
-            status='agendada'
-        ).filter(
-            Sessao.data_sessao >= datetime.now(),
-            Sessao.data_sessao <= datetime.now() + timedelta(days=7)
-        ).order_by(Sessao.data_sessao).limit(5).all()
-        
-        primeiro_dia_mes = hoje.replace(day=1)
-        sessoes_mes = Sessao.query.filter_by(psicologo_id=current_user.id).filter(
-            db.func.date(Sessao.data_sessao) >= primeiro_dia_mes,
-            Sessao.status.in_(['realizada', 'agendada'])
-        ).count()
-        
-        receita_query = db.session.query(db.func.sum(Sessao.valor)).filter_by(
-            psicologo_id=current_user.id,
-            status='realizada'
-        ).filter(
-            db.func.date(Sessao.data_sessao) >= primeiro_dia_mes
-        ).scalar()
-        receita_mes = float(receita_query) if receita_query else 0
-    except Exception as e:
-        print(f"❌ Erro ao buscar estatísticas do dashboard: {e}")
-        traceback.print_exc()
-    
-    return render_template('dashboard.html', 
-                         total_pacientes=total_pacientes,
-                         sessoes_hoje=sessoes_hoje,
-                         proximas_sessoes=proximas_sessoes,
-                         sessoes_mes=sessoes_mes,
-                         receita_mes=receita_mes)
-
-# ========== ROTAS DE PACIENTES ==========
-
-@app.route('/pacientes')
-@login_required
-def pacientes():
-    print("✅ Rota /pacientes acessada")
-    try:
-        search = request.args.get('search', '')
-        
-        if search:
-            pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id).filter(
-                db.or_(
-                    Paciente.nome.ilike(f'%{search}%'),
-                    Paciente.email.ilike(f'%{search}%'),
-                    Paciente.telefone.ilike(f'%{search}%')
-                )
-            ).order_by(Paciente.nome).all()
-        else:
-            pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id).order_by(Paciente.nome).all()
-        
-        total_pacientes = Paciente.query.filter_by(psicologo_id=current_user.id).count()
-        pacientes_ativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
-        primeiro_dia_mes = date.today().replace(day=1)
-        novos_mes = Paciente.query.filter_by(psicologo_id=current_user.id).filter(
-            Paciente.data_cadastro >= primeiro_dia_mes
-        ).count()
-        
-        try:
-            sessoes_mes = Sessao.query.filter_by(psicologo_id=current_user.id).filter(
-                db.func.extract('month', Sessao.data_sessao) == date.today().month,
-                db.func.extract('year', Sessao.data_sessao) == date.today().year
-            ).count()
-        except:
-            sessoes_mes = 0
-        
-        return render_template('pacientes.html',
-                             pacientes=pacientes_lista,
-                             total_pacientes=total_pacientes,
-                             pacientes_ativos=pacientes_ativos,
-                             novos_mes=novos_mes,
-                             sessoes_mes=sessoes_mes,
-                             today=date.today())
-    except Exception as e:
-        print(f"❌ Erro na página de pacientes: {e}")
-        traceback.print_exc()
-        flash('Erro ao carregar pacientes', 'error')
-        return redirect(url_for('dashboard'))
-
-@app.route('/pacientes/novo', methods=['GET', 'POST'])
-@login_required
-def novo_paciente():
-    if request.method == 'POST':
-        try:
-            nome = request.form.get('nome', '').strip()
-            email = request.form.get('email', '').strip()
-            telefone = request.form.get('telefone', '').strip()
-            data_nascimento_str = request.form.get('data_nascimento', '')
-            endereco = request.form.get('endereco', '').strip()
-            observacoes = request.form.get('observacoes', '').strip()
-            
-            if not nome:
-                flash('Nome é obrigatório', 'error')
-                return render_template('novo_paciente.html')
-            
-            data_nascimento = None
-            if data_nascimento_str:
-                try:
-                    data_nascimento = datetime.strptime(data_nascimento_str, '%Y-%m-%d').date()
-                except:
-                    flash('Data de nascimento inválida', 'error')
-                    return render_template('novo_paciente.html')
-            
-            if email:
-                paciente_existente = Paciente.query.filter_by(email=email, psicologo_id=current_user.id).first()
-                if paciente_existente:
-                    flash('Já existe um paciente com este email', 'error')
-                    return render_template('novo_paciente.html')
-            
-            novo_paciente = Paciente(
-                nome=nome,
-                email=email if email else None,
-                telefone=telefone if telefone else None,
-                data_nascimento=data_nascimento,
-                endereco=endereco if endereco else None,
-                observacoes=observacoes if observacoes else None,
-                psicologo_id=current_user.id
-            )
-            
-            db.session.add(novo_paciente)
-            db.session.commit()
-            
-            flash(f'Paciente {nome} cadastrado com sucesso!', 'success')
-            return redirect(url_for('pacientes'))
-        except Exception as e:
-            print(f"❌ Erro ao cadastrar paciente: {e}")
-            traceback.print_exc()
-            flash('Erro ao cadastrar paciente', 'error')
-            db.session.rollback()
-    
-    return render_template('novo_paciente.html')
-
-@app.route('/pacientes/<int:id>')
-@login_required
-def ver_paciente(id):
-    try:
-        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        sessoes = Sessao.query.filter_by(paciente_id=id).order_by(Sessao.data_sessao.desc()).limit(10).all()
-        evolucoes = Evolucao.query.filter_by(paciente_id=id).order_by(Evolucao.data_evolucao.desc()).limit(5).all()
-        
-        return render_template('ver_paciente.html', 
-                             paciente=paciente,
-                             sessoes=sessoes,
-                             evolucoes=evolucoes,
-                             today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao ver paciente: {e}")
-        traceback.print_exc()
-        flash('Paciente não encontrado', 'error')
-        return redirect(url_for('pacientes'))
-
-@app.route('/pacientes/<int:id>/editar', methods=['GET', 'POST'])
-@login_required
-def editar_paciente(id):
-    try:
-        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        
-        if request.method == 'POST':
-            nome = request.form.get('nome', '').strip()
-            email = request.form.get('email', '').strip()
-            telefone = request.form.get('telefone', '').strip()
-            data_nascimento_str = request.form.get('data_nascimento', '')
-            endereco = request.form.get('endereco', '').strip()
-            observacoes = request.form.get('observacoes', '').strip()
-            
-            if not nome:
-                flash('Nome é obrigatório', 'error')
-                return render_template('editar_paciente.html', paciente=paciente, today=date.today())
-            
-            data_nascimento = None
-            if data_nascimento_str:
-                try:
-                    data_nascimento = datetime.strptime(data_nascimento_str, '%Y-%m-%d').date()
-                except:
-                    flash('Data de nascimento inválida', 'error')
-                    return render_template('editar_paciente.html', paciente=paciente, today=date.today())
-            
-            if email and email != paciente.email:
-                paciente_existente = Paciente.query.filter_by(email=email, psicologo_id=current_user.id).first()
-                if paciente_existente:
-                    flash('Já existe um paciente com este email', 'error')
-                    return render_template('editar_paciente.html', paciente=paciente, today=date.today())
-            
-            paciente.nome = nome
-            paciente.email = email if email else None
-            paciente.telefone = telefone if telefone else None
-            paciente.data_nascimento = data_nascimento
-            paciente.endereco = endereco if endereco else None
-            paciente.observacoes = observacoes if observacoes else None
-            
-            db.session.commit()
-            
-            flash(f'Dados de {nome} atualizados com sucesso!', 'success')
-            return redirect(url_for('ver_paciente', id=id))
-        
-        return render_template('editar_paciente.html', paciente=paciente, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao editar paciente: {e}")
-        traceback.print_exc()
-        flash('Paciente não encontrado', 'error')
-        return redirect(url_for('pacientes'))
-
-@app.route('/pacientes/<int:id>/desativar', methods=['POST'])
-@login_required
-def desativar_paciente(id):
-    try:
-        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        paciente.ativo = False
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'Paciente {paciente.nome} desativado com sucesso'})
-    except Exception as e:
-        print(f"❌ Erro ao desativar paciente: {e}")
-        return jsonify({'success': False, 'message': 'Erro ao desativar paciente'})
-
-@app.route('/pacientes/<int:id>/ativar', methods=['POST'])
-@login_required
-def ativar_paciente(id):
-    try:
-        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        paciente.ativo = True
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'Paciente {paciente.nome} ativado com sucesso'})
-    except Exception as e:
-        print(f"❌ Erro ao ativar paciente: {e}")
-        return jsonify({'success': False, 'message': 'Erro ao ativar paciente'})
-
-# ========== ROTAS DE SESSÕES ==========
-
-@app.route('/sessoes')
-@login_required
-def sessoes():
-    print("✅ Rota /sessoes acessada")
-    try:
-        status_filter = request.args.get('status', '')
-        paciente_filter = request.args.get('paciente', '')
-        data_inicio = request.args.get('data_inicio', '')
-        data_fim = request.args.get('data_fim', '')
-        
-        query = Sessao.query.filter_by(psicologo_id=current_user.id)
-        
-        if status_filter:
-            query = query.filter(Sessao.status == status_filter)
-        
-        if paciente_filter:
-            query = query.filter(Sessao.paciente_id == paciente_filter)
-        
-        if data_inicio:
-            try:
-                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                query = query.filter(db.func.date(Sessao.data_sessao) >= data_inicio_obj)
-            except:
-                pass
-        
-        if data_fim:
-            try:
-                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                query = query.filter(db.func.date(Sessao.data_sessao) <= data_fim_obj)
-            except:
-                pass
-        
-        sessoes_lista = query.order_by(Sessao.data_sessao.desc()).all()
-        pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-        
-        total_sessoes = Sessao.query.filter_by(psicologo_id=current_user.id).count()
-        sessoes_agendadas = Sessao.query.filter_by(psicologo_id=current_user.id, status='agendada').count()
-        sessoes_realizadas = Sessao.query.filter_by(psicologo_id=current_user.id, status='realizada').count()
-        
-        receita_query = db.session.query(db.func.sum(Sessao.valor)).filter_by(
-            psicologo_id=current_user.id,
-            status='realizada'
-        ).scalar()
-        receita_total = float(receita_query) if receita_query else 0
-        
-        return render_template('sessoes.html',
-                             sessoes=sessoes_lista,
-                             pacientes=pacientes_lista,
-                             total_sessoes=total_sessoes,
-                             sessoes_agendadas=sessoes_agendadas,
-                             sessoes_realizadas=sessoes_realizadas,
-                             receita_total=receita_total,
-                             today=date.today())
-    except Exception as e:
-        print(f"❌ Erro na página de sessões: {e}")
-        traceback.print_exc()
-        flash('Erro ao carregar sessões', 'error')
-        return redirect(url_for('dashboard'))
-
-@app.route('/sessoes/nova', methods=['GET', 'POST'])
-@login_required
-def nova_sessao():
-    if request.method == 'POST':
-        try:
-            paciente_id = request.form.get('paciente_id')
-            data_sessao_str = request.form.get('data_sessao')
-            hora_sessao = request.form.get('hora_sessao')
-            duracao = request.form.get('duracao', 50)
-            valor_str = request.form.get('valor', '').strip()
-            observacoes = request.form.get('observacoes', '').strip()
-            
-            if not paciente_id or paciente_id == '' or paciente_id == 'None':
-                flash('Paciente é obrigatório', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            try:
-                paciente_id_int = int(paciente_id)
-            except (ValueError, TypeError):
-                flash('Paciente inválido', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            if not data_sessao_str or not hora_sessao:
-                flash('Data e hora são obrigatórios', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            try:
-                data_sessao = datetime.strptime(f"{data_sessao_str} {hora_sessao}", '%Y-%m-%d %H:%M')
-            except Exception:
-                flash('Data ou hora inválida', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            if data_sessao < datetime.now():
-                flash('Não é possível agendar sessão no passado', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            paciente = Paciente.query.filter_by(id=paciente_id_int, psicologo_id=current_user.id).first()
-            if not paciente:
-                flash('Paciente não encontrado', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            conflito = Sessao.query.filter(
-                Sessao.psicologo_id == current_user.id,
-                Sessao.status == 'agendada',
-                Sessao.data_sessao == data_sessao
-            ).first()
-            
-            if conflito:
-                flash('Já existe uma sessão agendada para este horário', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            valor = None
-            if valor_str and valor_str.strip():
-                try:
-                    valor_limpo = valor_str.replace(',', '.').strip()
-                    valor = Decimal(valor_limpo)
-                except Exception:
-                    flash('Valor inválido', 'error')
-                    pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                    return render_template('nova_sessao.html', pacientes=pacientes_lista)
-            
-            nova_sessao_obj = Sessao(
-                paciente_id=paciente_id_int,
-                psicologo_id=current_user.id,
-                data_sessao=data_sessao,
-                duracao=int(duracao),
-                valor=valor,
-                observacoes=observacoes if observacoes else None
-            )
-            
-            db.session.add(nova_sessao_obj)
-            db.session.commit()
-            
-            flash(f'Sessão agendada com {paciente.nome} para {data_sessao.strftime("%d/%m/%Y às %H:%M")}!', 'success')
-            return redirect(url_for('sessoes'))
-        except Exception as e:
-            print(f"❌ Erro ao salvar sessão: {e}")
-            traceback.print_exc()
-            flash('Erro ao salvar sessão no banco de dados', 'error')
-            db.session.rollback()
-    
-    try:
-        pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-    except Exception:
-        pacientes_lista = []
-    
-    return render_template('nova_sessao.html', pacientes=pacientes_lista)
-
-@app.route('/sessoes/<int:id>')
-@login_required
-def ver_sessao(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        return render_template('ver_sessao.html', sessao=sessao, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao ver sessão: {e}")
-        flash('Sessão não encontrada', 'error')
-        return redirect(url_for('sessoes'))
-
-@app.route('/sessoes/<int:id>/editar', methods=['GET', 'POST'])
-@login_required
-def editar_sessao(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        
-        if request.method == 'POST':
-            data_sessao_str = request.form.get('data_sessao')
-            hora_sessao = request.form.get('hora_sessao')
-            duracao = request.form.get('duracao', 50)
-            valor_str = request.form.get('valor', '').strip()
-            observacoes = request.form.get('observacoes', '').strip()
-            
-            if not data_sessao_str or not hora_sessao:
-                flash('Data e hora são obrigatórios', 'error')
-                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
-            
-            try:
-                data_sessao = datetime.strptime(f"{data_sessao_str} {hora_sessao}", '%Y-%m-%d %H:%M')
-            except:
-                flash('Data ou hora inválida', 'error')
-                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
-            
-            conflito = Sessao.query.filter(
-                Sessao.psicologo_id == current_user.id,
-                Sessao.status == 'agendada',
-                Sessao.data_sessao == data_sessao,
-                Sessao.id != id
-            ).first()
-            
-            if conflito:
-                flash('Já existe uma sessão agendada para este horário', 'error')
-                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
-            
-            valor = None
-            if valor_str and valor_str.strip():
-                try:
-                    valor = Decimal(valor_str.replace(',', '.'))
-                except:
-                    flash('Valor inválido', 'error')
-                    return render_template('editar_sessao.html', sessao=sessao, today=date.today())
-            
-            sessao.data_sessao = data_sessao
-            sessao.duracao = int(duracao)
-            sessao.valor = valor
-            sessao.observacoes = observacoes if observacoes else None
-            
-            db.session.commit()
-            
-            flash('Sessão atualizada com sucesso!', 'success')
-            return redirect(url_for('ver_sessao', id=id))
-        
-        return render_template('editar_sessao.html', sessao=sessao, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao editar sessão: {e}")
-        flash('Sessão não encontrada', 'error')
-        return redirect(url_for('sessoes'))
-
-@app.route('/sessoes/<int:id>/marcar-realizada', methods=['POST'])
-@login_required
-def marcar_sessao_realizada(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        sessao.status = 'realizada'
-        db.session.commit()
-        return jsonify({'success': True, 'message': 'Sessão marcada como realizada'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Erro ao atualizar sessão'})
-
-@app.route('/sessoes/<int:id>/marcar-faltou', methods=['POST'])
-@login_required
-def marcar_sessao_faltou(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        sessao.status = 'faltou'
-        db.session.commit()
-        return jsonify({'success': True, 'message': 'Sessão marcada como falta'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Erro ao atualizar sessão'})
-
-@app.route('/sessoes/<int:id>/cancelar', methods=['POST'])
-@login_required
-def cancelar_sessao(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        sessao.status = 'cancelada'
-        db.session.commit()
-        return jsonify({'success': True, 'message': 'Sessão cancelada'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Erro ao cancelar sessão'})
-
-@app.route('/sessoes/<int:id>/reagendar', methods=['POST'])
-@login_required
-def reagendar_sessao(id):
-    try:
-        sessao = Sessao.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
-        sessao.status = 'agendada'
-        db.session.commit()
-        return jsonify({'success': True, 'message': 'Sessão reagendada'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Erro ao reagendar sessão'})
-
-# ========== ROTAS DE PRONTUÁRIO/EVOLUÇÃO ==========
-
-@app.route('/prontuario/<int:paciente_id>')
-@login_required
-def prontuario(paciente_id):
-    print("✅ Rota /prontuario acessada")
-    try:
-        paciente = Paciente.query.filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
-        evolucoes = Evolucao.query.filter_by(paciente_id=paciente_id).order_by(Evolucao.data_evolucao.desc()).all()
-        return render_template('prontuario.html', paciente=paciente, evolucoes=evolucoes, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao ver prontuário: {e}")
-        traceback.print_exc()
-        flash('Paciente não encontrado', 'error')
-        return redirect(url_for('pacientes'))
-
-@app.route('/prontuario/<int:paciente_id>/nova', methods=['POST'])
-@login_required
-def nova_evolucao_prontuario(paciente_id):
-    try:
-        paciente = Paciente.query.filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
-        
-        tipo = request.form.get('tipo', 'evolucao')
-        titulo = request.form.get('titulo', '').strip()
-        conteudo = request.form.get('conteudo', '').strip()
-        humor = request.form.get('humor', '')
-        medicamentos = request.form.get('medicamentos', '').strip()
-        observacoes_privadas = request.form.get('observacoes_privadas', '').strip()
-        
-        if not titulo or not conteudo:
-            flash('Título e conteúdo são obrigatórios', 'error')
-            return redirect(url_for('prontuario', paciente_id=paciente_id))
-        
-        nova_evolucao = Evolucao(
-            paciente_id=paciente_id,
-            tipo=tipo,
-            titulo=titulo,
-            descricao=conteudo,
-            humor=humor if humor else None,
-            medicamentos=medicamentos if medicamentos else None,
-            observacoes_privadas=observacoes_privadas if observacoes_privadas else None
-        )
-        
-        db.session.add(nova_evolucao)
-        db.session.commit()
-        
-        flash('Evolução registrada com sucesso!', 'success')
-        return redirect(url_for('prontuario', paciente_id=paciente_id))
-    except Exception as e:
-        print(f"❌ Erro ao criar evolução: {e}")
-        traceback.print_exc()
-        flash('Erro ao registrar evolução', 'error')
-        db.session.rollback()
-        return redirect(url_for('prontuario', paciente_id=paciente_id))
-
-@app.route('/evolucoes')
-@login_required
-def evolucoes():
-    print("✅ Rota /evolucoes acessada")
-    try:
-        paciente_filter = request.args.get('paciente', '')
-        data_inicio = request.args.get('data_inicio', '')
-        data_fim = request.args.get('data_fim', '')
-        
-        query = Evolucao.query.join(Paciente).filter(Paciente.psicologo_id == current_user.id)
-        
-        if paciente_filter:
-            query = query.filter(Evolucao.paciente_id == paciente_filter)
-        
-        if data_inicio:
-            try:
-                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                query = query.filter(func.date(Evolucao.data_evolucao) >= data_inicio_obj)
-            except:
-                pass
-        
-        if data_fim:
-            try:
-                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                query = query.filter(func.date(Evolucao.data_evolucao) <= data_fim_obj)
-            except:
-                pass
-        
-        evolucoes_lista = query.order_by(Evolucao.data_evolucao.desc()).all()
-        pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-        
-        total_evolucoes = Evolucao.query.join(Paciente).filter(Paciente.psicologo_id == current_user.id).count()
-        
-        primeiro_dia_mes = date.today().replace(day=1)
-        evolucoes_mes = Evolucao.query.join(Paciente).filter(
-            Paciente.psicologo_id == current_user.id,
-            func.date(Evolucao.data_evolucao) >= primeiro_dia_mes
-        ).count()
-        
-        return render_template('evolucoes.html',
-                             evolucoes=evolucoes_lista,
-                             pacientes=pacientes_lista,
-                             total_evolucoes=total_evolucoes,
-                             evolucoes_mes=evolucoes_mes,
-                             today=date.today())
-    except Exception as e:
-        print(f"❌ Erro na página de evoluções: {e}")
-        traceback.print_exc()
-        flash('Erro ao carregar evoluções', 'error')
-        return redirect(url_for('dashboard'))
-
-@app.route('/evolucoes/nova', methods=['GET', 'POST'])
-@login_required
-def nova_evolucao():
-    if request.method == 'POST':
-        try:
-            paciente_id = request.form.get('paciente_id')
-            titulo = request.form.get('titulo', '').strip()
-            descricao = request.form.get('descricao', '').strip()
-            tipo = request.form.get('tipo', 'evolucao')
-            
-            if not paciente_id or paciente_id == '' or paciente_id == 'None':
-                flash('Paciente é obrigatório', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
-            
-            if not titulo:
-                flash('Título é obrigatório', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
-            
-            if not descricao:
-                flash('Descrição é obrigatória', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
-            
-            paciente = Paciente.query.filter_by(id=int(paciente_id), psicologo_id=current_user.id).first()
-            if not paciente:
-                flash('Paciente não encontrado', 'error')
-                pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
-            
-            nova_evolucao_obj = Evolucao(
-                paciente_id=int(paciente_id),
-                titulo=titulo,
-                descricao=descricao,
-                tipo=tipo
-            )
-            
-            db.session.add(nova_evolucao_obj)
-            db.session.commit()
-            
-            flash(f'Evolução de {paciente.nome} registrada com sucesso!', 'success')
-            return redirect(url_for('evolucoes'))
-        except Exception as e:
-            print(f"❌ Erro ao criar evolução: {e}")
-            traceback.print_exc()
-            flash('Erro ao registrar evolução', 'error')
-            db.session.rollback()
-    
-    try:
-        pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).order_by(Paciente.nome).all()
-    except Exception:
-        pacientes_lista = []
-    
-    return render_template('nova_evolucao.html', pacientes=pacientes_lista)
-
-@app.route('/evolucoes/<int:id>')
-@login_required
-def ver_evolucao(id):
-    try:
-        evolucao = Evolucao.query.join(Paciente).filter(
-            Evolucao.id == id,
-            Paciente.psicologo_id == current_user.id
-        ).first_or_404()
-        
-        return render_template('ver_evolucao.html', evolucao=evolucao, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao ver evolução: {e}")
-        flash('Evolução não encontrada', 'error')
-        return redirect(url_for('evolucoes'))
-
-@app.route('/evolucoes/<int:id>/editar', methods=['GET', 'POST'])
-@login_required
-def editar_evolucao(id):
-    try:
-        evolucao = Evolucao.query.join(Paciente).filter(
-            Evolucao.id == id,
-            Paciente.psicologo_id == current_user.id
-        ).first_or_404()
-        
-        if request.method == 'POST':
-            titulo = request.form.get('titulo', '').strip()
-            descricao = request.form.get('descricao', '').strip()
-            tipo = request.form.get('tipo', 'evolucao')
-            
-            if not titulo:
-                flash('Título é obrigatório', 'error')
-                return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
-            
-            if not descricao:
-                flash('Descrição é obrigatória', 'error')
-                return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
-            
-            evolucao.titulo = titulo
-            evolucao.descricao = descricao
-            evolucao.tipo = tipo
-            
-            db.session.commit()
-            
-            flash('Evolução atualizada com sucesso!', 'success')
-            return redirect(url_for('ver_evolucao', id=id))
-        
-        return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao editar evolução: {e}")
-        flash('Evolução não encontrada', 'error')
-        return redirect(url_for('evolucoes'))
-
-@app.route('/evolucoes/<int:id>/excluir', methods=['POST'])
-@login_required
-def excluir_evolucao(id):
-    try:
-        evolucao = Evolucao.query.join(Paciente).filter(
-            Evolucao.id == id,
-            Paciente.psicologo_id == current_user.id
-        ).first_or_404()
-        
-        db.session.delete(evolucao)
-        db.session.commit()
-        
-        return jsonify({'success': True, 'message': 'Evolução excluída com sucesso'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Erro ao excluir evolução'})
-
-# ========== ROTAS DE CONFIGURAÇÕES ==========
-
-@app.route('/configuracoes')
-@login_required
-def configuracoes():
-    print("✅ Rota /configuracoes acessada")
-    try:
-        config = Configuracao.query.filter_by(usuario_id=current_user.id).first()
-        return render_template('configuracoes.html', config=config, usuario=current_user, today=date.today())
-    except Exception as e:
-        print(f"❌ Erro ao carregar configurações: {e}")
-        traceback.print_exc()
-        return render_template('configuracoes.html', config=None, usuario=current_user, today=date.today())
-
-@app.route('/configuracoes/salvar', methods=['POST'])
-@login_required
-def salvar_configuracoes():
-    try:
-        config = Configuracao.query.filter_by(usuario_id=current_user.id).first()
-        
-        if not config:
-            config = Configuracao(usuario_id=current_user.id)
-            db.session.add(config)
-        
-        config.nome_completo = request.form.get('nome_completo')
-        config.crp = request.form.get('crp')
-        config.especialidade = request.form.get('especialidade')
-        config.telefone_profissional = request.form.get('telefone_profissional')
-        config.email_profissional = request.form.get('email_profissional')
-        config.endereco = request.form.get('endereco')
-        config.cidade = request.form.get('cidade')
-        config.estado = request.form.get('estado')
-        config.cep = request.form.get('cep')
-        
-        duracao = request.form.get('duracao_sessao')
-        if duracao:
-            config.duracao_sessao = int(duracao)
-        
-        valor = request.form.get('valor_sessao')
-        if valor:
-            try:
-                config.valor_sessao = Decimal(valor.replace(',', '.'))
-            except:
-                pass
-        
-        horario_inicio = request.form.get('horario_inicio')
-        horario_fim = request.form.get('horario_fim')
-        if horario_inicio:
-            try:
-                config.horario_inicio = datetime.strptime(horario_inicio, '%H:%M').time()
-            except:
-                pass
-        if horario_fim:
-            try:
-                config.horario_fim = datetime.strptime(horario_fim, '%H:%M').time()
-            except:
-                pass
-        
-        dias = request.form.getlist('dias_atendimento')
-        config.dias_atendimento = ','.join(dias) if dias else None
-        config.lembrete_paciente = 'lembrete_paciente' in request.form
-        
-        antecedencia = request.form.get('antecedencia_lembrete')
-        if antecedencia:
-            config.antecedencia_lembrete = int(antecedencia)
-        
-        senha_atual = request.form.get('senha_atual')
-        nova_senha = request.form.get('nova_senha')
-        confirmar_senha = request.form.get('confirmar_senha')
-        
-        if senha_atual and nova_senha:
-            if current_user.check_password(senha_atual):
-                if nova_senha == confirmar_senha:
-                    if len(nova_senha) >= 6:
-                        current_user.set_password(nova_senha)
-                        flash('Senha alterada com sucesso!', 'success')
-                    else:
-                        flash('A nova senha deve ter pelo menos 6 caracteres!', 'warning')
-                else:
-                    flash('As senhas não coincidem!', 'danger')
-                    return redirect(url_for('configuracoes'))
-            else:
-                flash('Senha atual incorreta!', 'danger')
-                return redirect(url_for('configuracoes'))
-        
-        db.session.commit()
-        flash('Configurações salvas com sucesso!', 'success')
-        return redirect(url_for('configuracoes'))
-    except Exception as e:
-        print(f"❌ Erro ao salvar configurações: {e}")
-        traceback.print_exc()
-        flash('Erro ao salvar configurações', 'error')
-        db.session.rollback()
-        return redirect(url_for('configuracoes'))
-
-@app.route('/configuracoes/perfil', methods=['GET', 'POST'])
-@login_required
-def configuracoes_perfil():
-    if request.method == 'POST':
-        try:
-            nome = request.form.get('nome', '').strip()
-            email = request.form.get('email', '').strip()
-            
-            if not nome:
-                flash('Nome é obrigatório', 'error')
-                return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
-            
-            if not email:
-                flash('Email é obrigatório', 'error')
-                return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
-            
-            if email != current_user.email:
-                usuario_existente = Usuario.query.filter_by(email=email).first()
-                if usuario_existente:
-                    flash('Este email já está sendo usado por outro usuário', 'error')
-                    return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
-            
-            current_user.nome = nome
-            current_user.email = email
-            db.session.commit()
-            
-            flash('Perfil atualizado com sucesso!', 'success')
-            return redirect(url_for('configuracoes'))
-        except Exception as e:
-            print(f"❌ Erro ao atualizar perfil: {e}")
-            flash('Erro ao atualizar perfil', 'error')
-            db.session.rollback()
-    
-    return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
-
-@app.route('/configuracoes/senha', methods=['GET', 'POST'])
-@login_required
-def configuracoes_senha():
-    if request.method == 'POST':
-        try:
-            senha_atual = request.form.get('senha_atual', '')
-            nova_senha = request.form.get('nova_senha', '')
-            confirmar_senha = request.form.get('confirmar_senha', '')
-            
-            if not senha_atual:
-                flash('Senha atual é obrigatória', 'error')
-                return render_template('configuracoes_senha.html', today=date.today())
-            
-            if not nova_senha:
-                flash('Nova senha é obrigatória', 'error')
-                return render_template('configuracoes_senha.html', today=date.today())
-            
-            if len(nova_senha) < 6:
-                flash('Nova senha deve ter pelo menos 6 caracteres', 'error')
-                return render_template('configuracoes_senha.html', today=date.today())
-            
-            if nova_senha != confirmar_senha:
-                flash('Confirmação de senha não confere', 'error')
-                return render_template('configuracoes_senha.html', today=date.today())
-            
-            if not current_user.check_password(senha_atual):
-                flash('Senha atual incorreta', 'error')
-                return render_template('configuracoes_senha.html', today=date.today())
-            
-            current_user.set_password(nova_senha)
-            db.session.commit()
-            
-            flash('Senha alterada com sucesso!', 'success')
-            return redirect(url_for('configuracoes'))
-        except Exception as e:
-            print(f"❌ Erro ao alterar senha: {e}")
-            flash('Erro ao alterar senha', 'error')
-            db.session.rollback()
-    
-    return render_template('configuracoes_senha.html', today=date.today())
-
-# ========== ROTAS DE RELATÓRIOS ==========
-
-@app.route('/relatorios')
-@login_required
-def relatorios():
-    print("✅ Rota /relatorios acessada")
-    try:
-        periodo = request.args.get('periodo', '12')
-        hoje = date.today()
-        
-        if periodo == '1':
-            data_inicio = hoje.replace(day=1)
-        elif periodo == '3':
-            data_inicio = hoje - timedelta(days=90)
-        elif periodo == '6':
-            data_inicio = hoje - timedelta(days=180)
-        else:
-            data_inicio = hoje - timedelta(days=365)
-        
-        stats = obter_estatisticas_gerais(data_inicio, hoje)
-        
-        return render_template('relatorios.html', 
-                             stats=stats,
-                             periodo=periodo,
-                             data_inicio=data_inicio.strftime('%Y-%m-%d'),
-                             data_fim=hoje.strftime('%Y-%m-%d'))
-    except Exception as e:
-        print(f"❌ Erro na página de relatórios: {e}")
-        traceback.print_exc()
-        flash('Erro ao carregar relatórios', 'error')
-        return redirect(url_for('dashboard'))
-
-@app.route('/relatorios/financeiro')
-@login_required
-def relatorio_financeiro():
-    try:
-        data_inicio = request.args.get('data_inicio', '')
-        data_fim = request.args.get('data_fim', '')
-        
-        if not data_inicio or not data_fim:
-            hoje = date.today()
-            data_fim = hoje.strftime('%Y-%m-%d')
-            data_inicio = hoje.replace(day=1).strftime('%Y-%m-%d')
-        
-        data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-        data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
-        
-        sessoes = Sessao.query.filter(
-            Sessao.psicologo_id == current_user.id,
-            func.date(Sessao.data_sessao) >= data_inicio_obj,
-            func.date(Sessao.data_sessao) <= data_fim_obj
-        ).order_by(Sessao.data_sessao.desc()).all()
-        
-        total_receita = sum(float(s.valor or 0) for s in sessoes if s.status == 'realizada')
-        total_sessoes = len([s for s in sessoes if s.status == 'realizada'])
-        receita_pendente = sum(float(s.valor or 0) for s in sessoes if s.status == 'agendada')
-        sessoes_canceladas = len([s for s in sessoes if s.status in ['cancelada', 'faltou']])
-        
-        receita_mensal = {}
-        for sessao in sessoes:
-            if sessao.status == 'realizada' and sessao.valor:
-                mes_ano = sessao.data_sessao.strftime('%m/%Y')
-                if mes_ano not in receita_mensal:
-                    receita_mensal[mes_ano] = 0
-                receita_mensal[mes_ano] += float(sessao.valor)
-        
-        return render_template('relatorio_financeiro.html',
-                             sessoes=sessoes,
-                             total_receita=total_receita,
-                             total_sessoes=total_sessoes,
-                             receita_pendente=receita_pendente,
-                             sessoes_canceladas=sessoes_canceladas,
-                             receita_mensal=receita_mensal,
-                             data_inicio=data_inicio,
-                             data_fim=data_fim)
-    except Exception as e:
-        print(f"❌ Erro no relatório financeiro: {e}")
-        traceback.print_exc()
-        flash('Erro ao gerar relatório financeiro', 'error')
-        return redirect(url_for('relatorios'))
-
-# ========== APIs PARA GRÁFICOS ==========
-
-@app.route('/api/relatorios/receita-mensal')
-@login_required
-def api_receita_mensal():
-    try:
-        periodo = int(request.args.get('periodo', 12))
-        hoje = date.today()
-        meses = []
-        receitas = []
-        
-        for i in range(periodo):
-            mes_atual = hoje.replace(day=1) - timedelta(days=i*30)
-            primeiro_dia = mes_atual.replace(day=1)
-            
-            if mes_atual.month == 12:
-                ultimo_dia = mes_atual.replace(year=mes_atual.year+1, month=1, day=1) - timedelta(days=1)
-            else:
-                ultimo_dia = mes_atual.replace(month=mes_atual.month+1, day=1) - timedelta(days=1)
-            
-            receita = db.session.query(func.sum(Sessao.valor)).filter(
-                Sessao.psicologo_id == current_user.id,
-                Sessao.status == 'realizada',
-                func.date(Sessao.data_sessao) >= primeiro_dia,
-                func.date(Sessao.data_sessao) <= ultimo_dia
-            ).scalar() or 0
-            
-            meses.insert(0, mes_atual.strftime('%m/%Y'))
-            receitas.insert(0, float(receita))
-        
-        return jsonify({'labels': meses, 'data': receitas})
-    except Exception as e:
-        print(f"❌ Erro na API receita mensal: {e}")
-        return jsonify({'error': 'Erro ao buscar dados'}), 500
-
-@app.route('/api/relatorios/sessoes-status')
-@login_required
-def api_sessoes_status():
-    try:
-        periodo = int(request.args.get('periodo', 12))
-        hoje = date.today()
-        data_inicio = hoje - timedelta(days=periodo*30)
-        
-        status_counts = db.session.query(
-            Sessao.status,
-            func.count(Sessao.id)
-        ).filter(
-            Sessao.psicologo_id == current_user.id,
-            func.date(Sessao.data_sessao) >= data_inicio
-        ).group_by(Sessao.status).all()
-        
-        labels = []
-        data = []
-        colors = {
-            'realizada': '#28a745',
-            'agendada': '#007bff',
-            'cancelada': '#dc3545',
-            'faltou': '#ffc107'
-        }
-        background_colors = []
-        
-        for status, count in status_counts:
-            labels.append(status.title())
-            data.append(count)
-            background_colors.append(colors.get(status, '#6c757d'))
-        
-        return jsonify({'labels': labels, 'data': data, 'backgroundColor': background_colors})
-    except Exception as e:
-        print(f"❌ Erro na API sessões status: {e}")
-        return jsonify({'error': 'Erro ao buscar dados'}), 500
-
-@app.route('/api/relatorios/pacientes-ativos')
-@login_required
-def api_pacientes_ativos():
-    try:
-        ativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
-        inativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=False).count()
-        
-        return jsonify({
-            'labels': ['Ativos', 'Inativos'],
-            'data': [ativos, inativos],
-            'backgroundColor': ['#28a745', '#dc3545']
-        })
-    except Exception as e:
-        print(f"❌ Erro na API pacientes ativos: {e}")
-        return jsonify({'error': 'Erro ao buscar dados'}), 500
-
-@app.route('/api/relatorios/evolucao-sessoes')
-@login_required
-def api_evolucao_sessoes():
-    try:
-        periodo = int(request.args.get('periodo', 12))
-        hoje = date.today()
-        semanas = []
-        sessoes_realizadas = []
-        sessoes_agendadas = []
-        
-        for i in range(periodo):
-            inicio_semana = hoje - timedelta(days=hoje.weekday() + i*7)
-            fim_semana = inicio_semana + timedelta(days=6)
-            
-            realizadas = Sessao.query.filter(
-                Sessao.psicologo_id == current_user.id,
-                Sessao.status == 'realizada',
-                func.date(Sessao.data_sessao) >= inicio_semana,
-                func.date(Sessao.data_sessao) <= fim_semana
-            ).count()
-            
-            agendadas = Sessao.query.filter(
-                Sessao.psicologo_id == current_user.id,
-                Sessao.status == 'agendada',
-                func.date(Sessao.data_sessao) >= inicio_semana,
-                func.date(Sessao.data_sessao) <= fim_semana
-            ).count()
-            
-            semanas.insert(0, f"{inicio_semana.strftime('%d/%m')}")
-            sessoes_realizadas.insert(0, realizadas)
-            sessoes_agendadas.insert(0, agendadas)
-        
-        return jsonify({
-            'labels': semanas,
-            'datasets': [
-                {
-                    'label': 'Realizadas',
-                    'data': sessoes_realizadas,
-                    'borderColor': '#28a745',
-                    'backgroundColor': 'rgba(40, 167, 69, 0.1)',
-                    'fill': True
-                },
-                {
-                    'label': 'Agendadas',
-                    'data': sessoes_agendadas,
-                    'borderColor': '#007bff',
-                    'backgroundColor': 'rgba(0, 123, 255, 0.1)',
-                    'fill': True
-                }
-            ]
-        })
-    except Exception as e:
-        print(f"❌ Erro na API evolução sessões: {e}")
-        return jsonify({'error': 'Erro ao buscar dados'}), 500
-
-@app.route('/api/relatorios/top-pacientes')
-@login_required
-def api_top_pacientes():
-    try:
-        periodo = int(request.args.get('periodo', 12))
-        hoje = date.today()
-        data_inicio = hoje - timedelta(days=periodo*30)
-        
-        top_pacientes = db.session.query(
-            Paciente.nome,
-            func.count(Sessao.id).label('total_sessoes'),
-            func.sum(Sessao.valor).label('total_receita')
-        ).join(Sessao).filter(
-            Sessao.psicologo_id == current_user.id,
-            func.date(Sessao.data_sessao) >= data_inicio,
-            Sessao.status == 'realizada'
-        ).group_by(Paciente.id, Paciente.nome).order_by(
-            func.count(Sessao.id).desc()
-        ).limit(5).all()
-        
-        pacientes = []
-        for nome, total_sessoes, total_receita in top_pacientes:
-            pacientes.append({
-                'nome': nome,
-                'sessoes': total_sessoes,
-                'receita': float(total_receita or 0)
-            })
-        
-        return jsonify({'pacientes': pacientes})
-    except Exception as e:
-        print(f"❌ Erro na API top pacientes: {e}")
-        return jsonify({'error': 'Erro ao buscar dados'}), 500
-
-# ========== ROTA DE DEBUG ==========
-
-@app.route('/debug/rotas')
-@login_required
-def debug_rotas():
-    """Rota para listar todas as rotas disponíveis"""
-    rotas = []
-    for rule in app.url_map.iter_rules():
-        rotas.append({
-            'endpoint': rule.endpoint,
-            'methods': ','.join(rule.methods),
-            'path': str(rule)
-        })
-    return jsonify(rotas)
-
-# ========== INICIALIZAÇÃO ==========
-
-with app.app_context():
-    try:
-        db.create_all()
-        print("=" * 60)
-        print("✅ Tabelas criadas/verificadas com sucesso!")
-        print("✅ Nova tabela 'configuracoes' adicionada!")
-        print("✅ Campos de prontuário adicionados à tabela 'evolucoes'!")
-        print("=" * 60)
-        print("\n🔗 ROTAS REGISTRADAS:")
-        print("   - /dashboard")
-        print("   - /pacientes")
-        print("   - /sessoes")
-        print("   - /evolucoes")
-        print("   - /relatorios")
-        print("   - /configuracoes")
-        print("   - /prontuario/<id>")
-        print("=" * 60)
-    except Exception as e:
-        print("=" * 60)
-        print(f"❌ Erro ao criar tabelas: {e}")
-        traceback.print_exc()
-        print("=" * 60)
-
-if __name__ == '__main__':
-    app.run(debug=True)
-
+import os
+import io
+import base64
+import csv
+import json
+import hashlib
+import itertools
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time as relogio
+import urllib.request
+import click
+from collections import OrderedDict
+from functools import wraps
+from flask import Flask, Response, g, has_request_context, render_template, request, redirect, url_for, flash, jsonify, session, get_template_attribute, stream_with_context
+from jinja2 import FileSystemBytecodeCache
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as SessaoFlaskSQLAlchemy
+from flask_migrate import Migrate, upgrade as migrar_banco
+from flask_compress import Compress
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from datetime import datetime, date, time, timedelta, timezone
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash, check_password_hash
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, extract, case, event, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import AddConstraint
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+import traceback
+
+app = Flask(__name__)
+
+# Configuração do banco com psycopg3
+def url_banco(variavel):
+    url = os.getenv(variavel)
+    if url and url.startswith('postgresql://'):
+        url = url.replace('postgresql://', 'postgresql+psycopg://', 1)
+    return url
+
+# ========== CONFIGURAÇÃO ==========
+# O perfil vem de APP_PERFIL: 'desenvolvimento' (padrão, `flask run` /
+# `python app.py`) ou 'producao' (definido pelo gunicorn.conf.py). Em produção
+# os templates não são relidos do disco a cada render e a compilação do Jinja
+# fica em cache no disco, compartilhada entre os workers do gunicorn.
+
+SECRET_KEY_PADRAO = 'mindcarepro-secret-key'
+
+class ConfigBase:
+    SQLALCHEMY_DATABASE_URI = url_banco('DATABASE_URL')
+    SECRET_KEY = os.getenv('SECRET_KEY', SECRET_KEY_PADRAO)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = 500
+    # 'worker': as tarefas em segundo plano são executadas pelo processo `flask worker`;
+    # 'thread': executadas numa thread do próprio servidor (desenvolvimento local)
+    TAREFAS_MODO = os.getenv('TAREFAS_MODO', 'worker')
+    JINJA_CACHE_DIR = None
+    # Baldes de tentativas de login (ver LIMITE DE TENTATIVAS DE LOGIN)
+    LIMITE_LOGIN_BACKEND = os.getenv('LIMITE_LOGIN_BACKEND', 'memoria')
+    LIMITE_LOGIN_ARQUIVO = os.getenv('LIMITE_LOGIN_ARQUIVO', os.path.join(tempfile.gettempdir(), 'mindcarepro-login.db'))
+    # Quantos proxies na frente da aplicação preenchem X-Forwarded-For/Proto
+    PROXIES_CONFIAVEIS = int(os.getenv('PROXIES_CONFIAVEIS', 0))
+    # Fuso da clínica: data_sessao é gravada nele, sem fuso; o resto (datetime.utcnow) é UTC
+    FUSO_HORARIO = os.getenv('FUSO_HORARIO', 'America/Sao_Paulo')
+
+class ConfigDesenvolvimento(ConfigBase):
+    TEMPLATES_AUTO_RELOAD = True
+
+class ConfigProducao(ConfigBase):
+    TEMPLATES_AUTO_RELOAD = False
+    JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mindcarepro-jinja'))
+    # Conexões que o Postgres ou o proxy derrubaram são descartadas antes do uso
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True, 'pool_recycle': 1800}
+    # Os workers do gunicorn precisam enxergar os mesmos baldes
+    LIMITE_LOGIN_BACKEND = os.getenv('LIMITE_LOGIN_BACKEND', 'sqlite')
+    PROXIES_CONFIAVEIS = int(os.getenv('PROXIES_CONFIAVEIS', 1))
+
+PERFIS_CONFIG = {
+    'desenvolvimento': ConfigDesenvolvimento,
+    'producao': ConfigProducao,
+}
+
+PERFIL = os.getenv('APP_PERFIL', 'desenvolvimento')
+if PERFIL not in PERFIS_CONFIG:
+    raise RuntimeError(f"APP_PERFIL inválido: {PERFIL} (use {', '.join(PERFIS_CONFIG)})")
+app.config.from_object(PERFIS_CONFIG[PERFIL])
+
+# Réplica de leitura opcional (ver RÉPLICA DE LEITURA abaixo)
+if url_banco('DATABASE_REPLICA_URL'):
+    app.config['SQLALCHEMY_BINDS'] = {'replica': url_banco('DATABASE_REPLICA_URL')}
+
+if app.config['PROXIES_CONFIAVEIS']:
+    # request.remote_addr passa a ser o IP do cliente, não o do proxy
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIAVEIS'],
+                            x_proto=app.config['PROXIES_CONFIAVEIS'])
+
+if app.config['JINJA_CACHE_DIR']:
+    os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])}
+
+# Identifica o deploy atual; entra no ETag das páginas para que um deploy novo
+# (templates e assets diferentes) não seja respondido com 304
+VERSAO_APP = os.getenv('APP_VERSION') or os.getenv('RAILWAY_GIT_COMMIT_SHA') or 'dev'
+
+# ========== RÉPLICA DE LEITURA ==========
+# Com DATABASE_REPLICA_URL definida, as views marcadas com @leitura_replica
+# mandam seus SELECTs para a réplica; flushes, UPDATE/DELETE em massa,
+# SELECT ... FOR UPDATE e todo o resto continuam no primário. Sem a variável
+# tudo vai para o primário, como antes. Para testar localmente, aponte
+# DATABASE_REPLICA_URL para uma cópia do arquivo SQLite ou um segundo Postgres.
+
+class SessaoRoteada(SessaoFlaskSQLAlchemy):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context() and g.get('usar_replica')
+                and clause is not None and clause.is_select and clause._for_update_arg is None):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# Inicialização das extensões (sem acesso ao banco durante o import;
+# o schema é aplicado pelas migrações em `flask db-init` / `flask db upgrade`)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
+migrate = Migrate(compare_type=True, render_as_batch=True, transaction_per_migration=True)
+compress = Compress()
+login_manager = LoginManager()
+login_manager.login_view = 'login'
+
+db.init_app(app)
+migrate.init_app(app, db, directory=os.path.join(app.root_path, 'migrations'))
+login_manager.init_app(app)
+compress.init_app(app)
+
+@login_manager.user_loader
+def load_user(user_id):
+    return Usuario.query.get(int(user_id))
+
+# ========== ARQUIVOS ESTÁTICOS ==========
+# O CSS e o JS das páginas ficam em static/css e static/js. O comando
+# `flask assets-build` gera cópias minificadas com o hash do conteúdo no nome
+# (static/dist) e baixa as bibliotecas de terceiros em versões fixas
+# (static/vendor). Os templates usam asset_url(), que aponta para a cópia com
+# hash quando o manifesto existe e para o arquivo original em desenvolvimento.
+
+ASSETS_VENDOR = {
+    'vendor/chart.js-4.4.0/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js',
+    'vendor/fontawesome-6.4.0/css/all.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+}
+for _fonte in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility'):
+    for _extensao in ('woff2', 'ttf'):
+        ASSETS_VENDOR[f'vendor/fontawesome-6.4.0/webfonts/{_fonte}.{_extensao}'] = \
+            f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/{_fonte}.{_extensao}'
+
+_manifesto_assets = None
+
+def carregar_manifesto_assets():
+    global _manifesto_assets
+    if _manifesto_assets is None:
+        try:
+            with open(os.path.join(app.static_folder, 'dist', 'manifest.json'), encoding='utf-8') as arquivo:
+                _manifesto_assets = json.load(arquivo)
+        except FileNotFoundError:
+            _manifesto_assets = {}
+    return _manifesto_assets
+
+@app.template_global()
+def asset_url(nome):
+    manifesto = carregar_manifesto_assets()
+    if nome in manifesto:
+        return url_for('static', filename=manifesto[nome])
+    if nome in ASSETS_VENDOR and not os.path.exists(os.path.join(app.static_folder, nome)):
+        # Biblioteca ainda não baixada: usa a mesma versão fixa direto da CDN
+        return ASSETS_VENDOR[nome]
+    return url_for('static', filename=nome)
+
+@app.after_request
+def cache_assets_versionados(response):
+    # Arquivos com hash ou versão no caminho nunca mudam de conteúdo
+    if request.endpoint == 'static' and request.path.startswith(('/static/dist/', '/static/vendor/')):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+# ========== MODELOS DO BANCO DE DADOS ==========
+
+class Usuario(UserMixin, db.Model):
+    __tablename__ = 'usuarios'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(255), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False, default='psicologo')
+    ativo = db.Column(db.Boolean, default=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    versao_dados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    dados_atualizados_em = db.Column(db.DateTime)
+    token_agenda = db.Column(db.String(64), unique=True, index=True)
+    
+    def set_password(self, password):
+        self.senha_hash = generate_password_hash(password)
+    
+    def check_password(self, password):
+        return check_password_hash(self.senha_hash, password)
+
+class Paciente(db.Model):
+    __tablename__ = 'pacientes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120))
+    telefone = db.Column(db.String(20))
+    data_nascimento = db.Column(db.Date)
+    endereco = db.deferred(db.Column(db.Text), group='detalhes')
+    observacoes = db.deferred(db.Column(db.Text), group='detalhes')
+    ativo = db.Column(db.Boolean, default=True)
+    data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_pacientes_psicologo_nome', 'psicologo_id', 'nome'),
+        db.Index('ix_pacientes_psicologo_atualizado', 'psicologo_id', 'atualizado_em', 'id'),
+    )
+    
+    sessoes = db.relationship('Sessao', backref='paciente', lazy=True)
+    evolucoes = db.relationship('Evolucao', backref='paciente', lazy=True)
+
+class Sessao(db.Model):
+    __tablename__ = 'sessoes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    data_sessao = db.Column(db.DateTime, nullable=False)
+    duracao = db.Column(db.Integer, default=50)
+    valor = db.Column(db.Numeric(10, 2))
+    status = db.Column(db.String(20), default='agendada')
+    observacoes = db.deferred(db.Column(db.Text))
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Início das observações, preenchido só por consultas com with_expression
+    observacoes_resumo = db.query_expression()
+    
+    __table_args__ = (
+        db.Index('ix_sessoes_psicologo_data', 'psicologo_id', 'data_sessao'),
+        db.Index('ix_sessoes_paciente_data', 'paciente_id', 'data_sessao'),
+        db.Index('ix_sessoes_psicologo_atualizado', 'psicologo_id', 'atualizado_em', 'id'),
+    )
+    
+    psicologo = db.relationship('Usuario', backref='sessoes_psicologo', lazy=True)
+
+class Evolucao(db.Model):
+    __tablename__ = 'evolucoes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    # Cópia de pacientes.psicologo_id, para a sincronização filtrar sem join
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    data_evolucao = db.Column(db.DateTime, default=datetime.utcnow)
+    titulo = db.Column(db.String(200), nullable=False)
+    descricao = db.deferred(db.Column(db.Text, nullable=False), group='corpo')
+    tipo = db.Column(db.String(50), default='evolucao')
+    humor = db.Column(db.String(20))
+    medicamentos = db.deferred(db.Column(db.Text), group='corpo')
+    observacoes_privadas = db.deferred(db.Column(db.Text), group='corpo')
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    descricao_resumo = db.query_expression()
+    
+    __table_args__ = (
+        db.Index('ix_evolucoes_paciente_data', 'paciente_id', 'data_evolucao'),
+        db.Index('ix_evolucoes_psicologo_data', 'psicologo_id', 'data_evolucao'),
+        db.Index('ix_evolucoes_psicologo_atualizado', 'psicologo_id', 'atualizado_em', 'id'),
+    )
+
+class Configuracao(db.Model):
+    __tablename__ = 'configuracoes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, unique=True)
+    nome_completo = db.Column(db.String(200))
+    crp = db.Column(db.String(20))
+    especialidade = db.Column(db.String(200))
+    telefone_profissional = db.Column(db.String(20))
+    email_profissional = db.Column(db.String(120))
+    endereco = db.Column(db.String(300))
+    cidade = db.Column(db.String(100))
+    estado = db.Column(db.String(2))
+    cep = db.Column(db.String(10))
+    duracao_sessao = db.Column(db.Integer, default=50)
+    valor_sessao = db.Column(db.Numeric(10, 2))
+    horario_inicio = db.Column(db.Time)
+    horario_fim = db.Column(db.Time)
+    dias_atendimento = db.Column(db.String(50))
+    lembrete_paciente = db.Column(db.Boolean, default=True)
+    antecedencia_lembrete = db.Column(db.Integer, default=24)
+    
+    usuario = db.relationship('Usuario', backref='configuracao', uselist=False)
+
+class Pagamento(db.Model):
+    __tablename__ = 'pagamentos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sessao_id = db.Column(db.Integer, db.ForeignKey('sessoes.id'), nullable=False)
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    valor = db.Column(db.Numeric(10, 2), nullable=False)
+    metodo = db.Column(db.String(20), nullable=False, default='pix')
+    data_pagamento = db.Column(db.Date, nullable=False, default=date.today)
+    observacoes = db.Column(db.Text)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_pagamentos_sessao', 'sessao_id'),
+        db.Index('ix_pagamentos_psicologo_data', 'psicologo_id', 'data_pagamento'),
+    )
+    
+    sessao = db.relationship('Sessao', backref=db.backref('pagamentos', lazy=True))
+
+class Tarefa(db.Model):
+    __tablename__ = 'tarefas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text)
+    resultado_nome = db.Column(db.String(200))
+    resultado_mimetype = db.Column(db.String(100))
+    resultado = db.deferred(db.Column(db.LargeBinary))
+    criada_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciada_em = db.Column(db.DateTime)
+    concluida_em = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_tarefas_status_id', 'status', 'id'),
+        db.Index('ix_tarefas_usuario_criada', 'usuario_id', 'criada_em'),
+    )
+
+class Exclusao(db.Model):
+    """Registro de um paciente, sessão ou evolução apagado, para a API de sincronização."""
+    __tablename__ = 'exclusoes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    tabela = db.Column(db.String(20), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    excluido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_exclusoes_psicologo_excluido', 'psicologo_id', 'excluido_em'),
+    )
+
+class ReceitaMensal(db.Model):
+    __tablename__ = 'receita_mensal'
+    
+    psicologo_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    mes = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    quantidade_com_valor = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+# ========== RECEITA MENSAL (AGREGADO) ==========
+# A tabela receita_mensal guarda, por psicólogo, mês e status, a quantidade de
+# sessões e a soma dos valores. Ela é atualizada no mesmo flush que grava a
+# Sessao, então os relatórios leem poucas linhas agregadas em vez de varrer
+# a tabela de sessões. Alterações feitas fora do ORM (query.update, SQL direto)
+# não passam por aqui: nesses casos rode `flask receita-rebuild`, que também
+# roda a cada implantação logo depois do `flask db-init`.
+
+# Guarda o valor antigo mesmo quando o atributo é alterado em um objeto
+# expirado, para que o delta saia da linha certa do agregado.
+for _atributo in ('psicologo_id', 'data_sessao', 'status', 'valor'):
+    event.listen(getattr(Sessao, _atributo), 'set', lambda *args: None, active_history=True)
+
+def _chave_receita(psicologo_id, data_sessao, status):
+    return (psicologo_id, data_sessao.date().replace(day=1), status or 'agendada')
+
+def _valor_anterior(estado, atributo):
+    historico = estado.attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.unchanged:
+        return historico.unchanged[0]
+    return estado.attrs[atributo].value
+
+def _somar_delta(deltas, chave, sinal, valor):
+    quantidade, com_valor, total = deltas.get(chave, (0, 0, Decimal('0')))
+    deltas[chave] = (
+        quantidade + sinal,
+        com_valor + (sinal if valor else 0),
+        total + sinal * Decimal(valor or 0),
+    )
+
+def _aplicar_deltas_receita(conexao, deltas):
+    tabela = ReceitaMensal.__table__
+    insert = postgresql.insert if conexao.dialect.name == 'postgresql' else sqlite.insert
+    
+    for (psicologo_id, mes, status), (quantidade, com_valor, total) in deltas.items():
+        if not quantidade and not com_valor and not total:
+            continue
+        comando = insert(tabela).values(
+            psicologo_id=psicologo_id,
+            mes=mes,
+            status=status,
+            quantidade=quantidade,
+            quantidade_com_valor=com_valor,
+            total=total
+        )
+        comando = comando.on_conflict_do_update(
+            index_elements=[tabela.c.psicologo_id, tabela.c.mes, tabela.c.status],
+            set_={
+                'quantidade': tabela.c.quantidade + comando.excluded.quantidade,
+                'quantidade_com_valor': tabela.c.quantidade_com_valor + comando.excluded.quantidade_com_valor,
+                'total': tabela.c.total + comando.excluded.total,
+            }
+        )
+        conexao.execute(comando)
+
+@event.listens_for(db.session, 'before_flush')
+def atualizar_receita_mensal(session, flush_context, instances):
+    deltas = {}
+    
+    for sessao in session.new:
+        if isinstance(sessao, Sessao):
+            _somar_delta(deltas, _chave_receita(sessao.psicologo_id, sessao.data_sessao, sessao.status), 1, sessao.valor)
+    
+    for sessao in session.deleted:
+        if isinstance(sessao, Sessao):
+            estado = sa_inspect(sessao)
+            chave = _chave_receita(_valor_anterior(estado, 'psicologo_id'),
+                                   _valor_anterior(estado, 'data_sessao'),
+                                   _valor_anterior(estado, 'status'))
+            _somar_delta(deltas, chave, -1, _valor_anterior(estado, 'valor'))
+    
+    for sessao in session.dirty:
+        if not isinstance(sessao, Sessao):
+            continue
+        estado = sa_inspect(sessao)
+        atributos = ('psicologo_id', 'data_sessao', 'status', 'valor')
+        if not any(estado.attrs[a].history.has_changes() for a in atributos):
+            continue
+        chave_anterior = _chave_receita(_valor_anterior(estado, 'psicologo_id'),
+                                        _valor_anterior(estado, 'data_sessao'),
+                                        _valor_anterior(estado, 'status'))
+        _somar_delta(deltas, chave_anterior, -1, _valor_anterior(estado, 'valor'))
+        _somar_delta(deltas, _chave_receita(sessao.psicologo_id, sessao.data_sessao, sessao.status), 1, sessao.valor)
+    
+    if deltas:
+        _aplicar_deltas_receita(session.connection(), deltas)
+
+def reconstruir_receita_mensal(psicologo_id=None):
+    """Recalcula receita_mensal a partir da tabela de sessões.
+    
+    Os meses já arquivados (`flask arquivar`) não estão mais em sessoes, então
+    as linhas deles são mantidas como estão.
+    """
+    ano = extract('year', Sessao.data_sessao)
+    mes = extract('month', Sessao.data_sessao)
+    query = db.session.query(
+        Sessao.psicologo_id,
+        ano,
+        mes,
+        Sessao.status,
+        func.count(Sessao.id),
+        func.sum(case((Sessao.valor != 0, 1), else_=0)),
+        func.sum(Sessao.valor)
+    )
+    remover = ReceitaMensal.query
+    if psicologo_id is not None:
+        query = query.filter(Sessao.psicologo_id == psicologo_id)
+        remover = remover.filter_by(psicologo_id=psicologo_id)
+    # Sem cache: um valor antigo aqui apagaria o rollup dos meses já arquivados
+    inicio_ativo = inicio_dados_ativos('sessoes', usar_cache=False)
+    if inicio_ativo:
+        query = query.filter(Sessao.data_sessao >= datetime.combine(inicio_ativo, time.min))
+        remover = remover.filter(ReceitaMensal.mes >= inicio_ativo)
+    
+    linhas = query.group_by(Sessao.psicologo_id, ano, mes, Sessao.status).all()
+    
+    remover.delete(synchronize_session=False)
+    db.session.add_all(
+        ReceitaMensal(
+            psicologo_id=psicologo,
+            mes=date(int(ano_linha), int(mes_linha), 1),
+            status=status or 'agendada',
+            quantidade=quantidade,
+            quantidade_com_valor=com_valor or 0,
+            total=total or 0
+        )
+        for psicologo, ano_linha, mes_linha, status, quantidade, com_valor, total in linhas
+    )
+    db.session.commit()
+    return len(linhas)
+
+# ========== VERSÃO DOS DADOS POR USUÁRIO ==========
+# Usuario.versao_dados é incrementado no mesmo flush que altera qualquer
+# paciente, sessão, pagamento, evolução ou configuração do usuário. Como o usuário já é
+# carregado em toda requisição pelo Flask-Login, o número sai de graça e serve
+# de validador (ETag) para páginas e relatórios sem refazer suas consultas.
+# dados_atualizados_em guarda o instante da mesma alteração (Last-Modified).
+
+@event.listens_for(db.session, 'before_flush')
+def incrementar_versao_dados(session, flush_context, instances):
+    usuarios = set()
+    
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(objeto, (Paciente, Sessao, Pagamento, Evolucao)):
+            usuarios.add(objeto.psicologo_id)
+        elif isinstance(objeto, Configuracao):
+            usuarios.add(objeto.usuario_id)
+        elif isinstance(objeto, Usuario) and objeto.id is not None:
+            usuarios.add(objeto.id)
+    
+    usuarios.discard(None)
+    if usuarios:
+        session.connection().execute(
+            db.update(Usuario)
+            .where(Usuario.id.in_(usuarios))
+            .values(versao_dados=Usuario.versao_dados + 1, dados_atualizados_em=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+# ========== LIMITE DE TENTATIVAS DE LOGIN ==========
+# Cada tentativa de login calcula um hash de senha caro de propósito. Para
+# que uma enxurrada de tentativas não ocupe todos os workers, cada IP e cada
+# email têm um balde de fichas (token bucket): a tentativa gasta uma ficha, as
+# fichas voltam aos poucos e, com o balde vazio, o login é recusado antes de
+# qualquer hash. O backend 'memoria' vale só para o processo atual; o
+# 'sqlite' guarda os baldes num arquivo local compartilhado por todos os
+# workers do container (mesma interface de um backend em Redis, por exemplo).
+
+# (capacidade, fichas recuperadas por segundo)
+LIMITE_LOGIN_IP = (20, 1 / 15)
+LIMITE_LOGIN_EMAIL = (5, 1 / 60)
+
+def recarregar_balde(fichas, atualizado_em, agora, capacidade, por_segundo):
+    return min(capacidade, fichas + (agora - atualizado_em) * por_segundo)
+
+class LimiteMemoria:
+    MAXIMO_BALDES = 10000
+    
+    def __init__(self, app):
+        # Ordem de último acesso: os baldes parados há mais tempo ficam no início
+        self.baldes = OrderedDict()
+        self.contadores = {}
+        self.trava = threading.Lock()
+    
+    def consumir(self, chave, capacidade, por_segundo):
+        agora = relogio.time()
+        with self.trava:
+            fichas, atualizado_em, _, _ = self.baldes.pop(chave, (capacidade, agora, capacidade, por_segundo))
+            fichas = recarregar_balde(fichas, atualizado_em, agora, capacidade, por_segundo)
+            permitido = fichas >= 1
+            self.baldes[chave] = (fichas - 1 if permitido else fichas, agora, capacidade, por_segundo)
+            
+            # Baldes já cheios de novo equivalem a baldes inexistentes; cada
+            # um é conferido com a própria capacidade e taxa. Acima do limite,
+            # os menos usados saem mesmo sem estar cheios.
+            while self.baldes:
+                fichas_antigo, atualizado_antigo, capacidade_antigo, por_segundo_antigo = next(iter(self.baldes.values()))
+                cheio = recarregar_balde(
+                    fichas_antigo, atualizado_antigo, agora, capacidade_antigo, por_segundo_antigo
+                ) >= capacidade_antigo
+                if not cheio and len(self.baldes) <= self.MAXIMO_BALDES:
+                    break
+                self.baldes.popitem(last=False)
+            return permitido
+    
+    def incrementar(self, nome):
+        with self.trava:
+            self.contadores[nome] = self.contadores.get(nome, 0) + 1
+    
+    def metricas(self):
+        with self.trava:
+            return dict(self.contadores)
+
+class LimiteSQLite:
+    def __init__(self, app):
+        self.caminho = app.config['LIMITE_LOGIN_ARQUIVO']
+        self.local = threading.local()
+    
+    def conexao(self):
+        if getattr(self.local, 'conexao', None) is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('CREATE TABLE IF NOT EXISTS baldes (chave TEXT PRIMARY KEY, fichas REAL, atualizado_em REAL)')
+            conexao.execute('CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER)')
+            self.local.conexao = conexao
+        return self.local.conexao
+    
+    def consumir(self, chave, capacidade, por_segundo):
+        agora = relogio.time()
+        conexao = self.conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            linha = conexao.execute('SELECT fichas, atualizado_em FROM baldes WHERE chave = ?', (chave,)).fetchone()
+            fichas = recarregar_balde(*linha, agora, capacidade, por_segundo) if linha else capacidade
+            permitido = fichas >= 1
+            conexao.execute(
+                'INSERT OR REPLACE INTO baldes (chave, fichas, atualizado_em) VALUES (?, ?, ?)',
+                (chave, fichas - 1 if permitido else fichas, agora)
+            )
+            if secrets.randbelow(1000) == 0:
+                # Baldes parados há mais de uma hora já estão cheios
+                conexao.execute('DELETE FROM baldes WHERE atualizado_em < ?', (agora - 3600,))
+            conexao.execute('COMMIT')
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+        return permitido
+    
+    def incrementar(self, nome):
+        self.conexao().execute(
+            'INSERT INTO contadores (nome, valor) VALUES (?, 1) '
+            'ON CONFLICT (nome) DO UPDATE SET valor = valor + 1', (nome,)
+        )
+    
+    def metricas(self):
+        return dict(self.conexao().execute('SELECT nome, valor FROM contadores').fetchall())
+
+BACKENDS_LIMITE_LOGIN = {
+    'memoria': LimiteMemoria,
+    'sqlite': LimiteSQLite,
+}
+
+_limitador_login = None
+_hash_ficticio = None
+
+def limitador_login():
+    global _limitador_login
+    if _limitador_login is None:
+        _limitador_login = BACKENDS_LIMITE_LOGIN[app.config['LIMITE_LOGIN_BACKEND']](app)
+    return _limitador_login
+
+def hash_ficticio():
+    """Hash de uma senha aleatória, conferido quando o email não existe.
+    
+    Assim a tentativa com email desconhecido custa o mesmo que uma com senha
+    errada, e o tempo de resposta não revela quais emails têm conta.
+    """
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = generate_password_hash(secrets.token_urlsafe(16))
+    return _hash_ficticio
+
+def login_permitido(email):
+    """Gasta uma ficha do IP e uma do email; False se algum balde está vazio."""
+    limitador = limitador_login()
+    try:
+        if not limitador.consumir(f'ip:{request.remote_addr}', *LIMITE_LOGIN_IP):
+            motivo = 'ip'
+        elif not limitador.consumir(f'email:{email.lower()}', *LIMITE_LOGIN_EMAIL):
+            motivo = 'email'
+        else:
+            return True
+    except Exception as e:
+        # Falha no backend não pode impedir os usuários de entrar
+        print(f"❌ Erro no limite de tentativas de login: {e}")
+        return True
+    incrementar_metrica_login(f'login_recusado_{motivo}')
+    print(f"⚠️ Login recusado por excesso de tentativas ({motivo}: {request.remote_addr})")
+    return False
+
+def incrementar_metrica_login(nome):
+    try:
+        limitador_login().incrementar(nome)
+    except Exception as e:
+        print(f"❌ Erro ao registrar métrica de login {nome}: {e}")
+
+# ========== FUNÇÕES AUXILIARES ==========
+
+def etag_dados_usuario():
+    chave = f'{VERSAO_APP}|{current_user.id}|{current_user.versao_dados}|{date.today()}|{request.full_path}'
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+def resposta_condicional(view):
+    """Responde 304 quando os dados do usuário não mudaram desde a última visita.
+
+    Deve ficar abaixo de @login_required. Requisições com mensagens flash
+    pendentes sempre renderizam, para a mensagem não ficar presa na sessão.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if app.debug or request.method != 'GET' or session.get('_flashes'):
+            return view(*args, **kwargs)
+        
+        etag = etag_dados_usuario()
+        # O Flask-Compress acrescenta ":gzip"/":br" ao ETag da resposta comprimida
+        for recebido in request.if_none_match.as_set(include_weak=True):
+            if recebido.split(':')[0] == etag:
+                resposta = app.response_class(status=304)
+                resposta.set_etag(recebido, weak=True)
+                resposta.headers['Cache-Control'] = 'private, no-cache'
+                return resposta
+        
+        resposta = app.make_response(view(*args, **kwargs))
+        if resposta.status_code == 200:
+            resposta.set_etag(etag, weak=True)
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta
+    return wrapper
+
+def replica_em_dia():
+    """Indica se a réplica já recebeu a última escrita do usuário logado.
+    
+    current_user vem do primário (user_loader), então comparar o versao_dados
+    dele com o da réplica garante que o usuário sempre enxerga o que acabou
+    de gravar, e que o ETag de @resposta_condicional nunca é associado a um
+    conteúdo mais antigo. Réplica atrasada ou fora do ar: usa o primário.
+    """
+    if 'replica' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return False
+    try:
+        with db.engines['replica'].connect() as conexao:
+            versao = conexao.execute(
+                db.select(Usuario.versao_dados).where(Usuario.id == current_user.id)
+            ).scalar()
+    except Exception as e:
+        print(f"❌ Erro ao consultar réplica: {e}")
+        return False
+    return versao is not None and versao >= current_user.versao_dados
+
+def leitura_replica(view):
+    """Executa as consultas da view na réplica de leitura, quando ela está em dia.
+    
+    Só para views que não gravam nada. Deve ficar abaixo de @login_required e
+    de @resposta_condicional, para que um 304 nem chegue a consultar a réplica.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and replica_em_dia():
+            g.usar_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+def processar_login():
+    email = request.form.get('email', '').strip()
+    senha = request.form.get('senha', '')
+    
+    if not email or not senha:
+        flash('Email e senha são obrigatórios', 'error')
+        return False
+    
+    if not login_permitido(email):
+        g.login_recusado = True
+        flash('Muitas tentativas de login. Aguarde alguns minutos e tente novamente.', 'error')
+        return False
+    
+    usuario = Usuario.query.filter_by(email=email).first()
+    senha_correta = usuario.check_password(senha) if usuario else check_password_hash(hash_ficticio(), senha)
+    
+    if usuario and senha_correta and usuario.ativo:
+        login_user(usuario)
+        return True
+    else:
+        incrementar_metrica_login('login_falhou')
+        flash('Email ou senha inválidos', 'error')
+        return False
+
+def inicio_proximo_mes(dia):
+    return (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def resumo_sessoes_por_psicologo(data_inicio, data_fim, psicologo_id=None):
+    """Quantidade e valor das sessões por psicólogo e status entre duas datas (inclusive).
+    
+    Os meses inteiros do período são lidos de receita_mensal; só os dias das
+    pontas que não fecham um mês completo são agregados direto em sessoes.
+    Sem psicologo_id, todos os psicólogos saem das mesmas duas consultas.
+    Retorna {psicologo_id: {status: {quantidade, com_valor, total}}}.
+    """
+    resumo = {}
+    
+    def acumular(psicologo, status, quantidade, com_valor, total):
+        item = resumo.setdefault(psicologo, {}).setdefault(
+            status or 'agendada', {'quantidade': 0, 'com_valor': 0, 'total': 0.0}
+        )
+        item['quantidade'] += quantidade or 0
+        item['com_valor'] += com_valor or 0
+        item['total'] += float(total or 0)
+    
+    fim_exclusivo = data_fim + timedelta(days=1)
+    primeiro_mes = data_inicio if data_inicio.day == 1 else inicio_proximo_mes(data_inicio)
+    fim_meses = fim_exclusivo.replace(day=1)
+    
+    if primeiro_mes < fim_meses:
+        agregados = db.session.query(
+            ReceitaMensal.psicologo_id,
+            ReceitaMensal.status,
+            func.sum(ReceitaMensal.quantidade),
+            func.sum(ReceitaMensal.quantidade_com_valor),
+            func.sum(ReceitaMensal.total)
+        ).filter(
+            ReceitaMensal.mes >= primeiro_mes,
+            ReceitaMensal.mes < fim_meses
+        )
+        if psicologo_id is not None:
+            agregados = agregados.filter(ReceitaMensal.psicologo_id == psicologo_id)
+        for linha in agregados.group_by(ReceitaMensal.psicologo_id, ReceitaMensal.status).all():
+            acumular(*linha)
+        pontas = [(data_inicio, primeiro_mes), (fim_meses, fim_exclusivo)]
+    else:
+        pontas = [(data_inicio, fim_exclusivo)]
+    
+    pontas = [(inicio, fim) for inicio, fim in pontas if inicio < fim]
+    if pontas:
+        agregados = db.session.query(
+            Sessao.psicologo_id,
+            Sessao.status,
+            func.count(Sessao.id),
+            func.sum(case((Sessao.valor != 0, 1), else_=0)),
+            func.sum(Sessao.valor)
+        ).filter(
+            db.or_(*[
+                db.and_(Sessao.data_sessao >= datetime.combine(inicio, time.min),
+                        Sessao.data_sessao < datetime.combine(fim, time.min))
+                for inicio, fim in pontas
+            ])
+        )
+        if psicologo_id is not None:
+            agregados = agregados.filter(Sessao.psicologo_id == psicologo_id)
+        for linha in agregados.group_by(Sessao.psicologo_id, Sessao.status).all():
+            acumular(*linha)
+    
+    return resumo
+
+def resumo_sessoes_por_status(psicologo_id, data_inicio, data_fim):
+    """Quantidade e valor das sessões de um psicólogo por status entre duas datas."""
+    return resumo_sessoes_por_psicologo(data_inicio, data_fim, psicologo_id).get(psicologo_id, {})
+
+def contadores_sessoes(psicologo_id):
+    """Totais exibidos nos cards da página de sessões, lidos de receita_mensal."""
+    agregados = db.session.query(
+        ReceitaMensal.status,
+        func.sum(ReceitaMensal.quantidade),
+        func.sum(ReceitaMensal.total)
+    ).filter(ReceitaMensal.psicologo_id == psicologo_id).group_by(ReceitaMensal.status).all()
+    
+    quantidades = {status: int(quantidade or 0) for status, quantidade, _ in agregados}
+    totais = {status: float(total or 0) for status, _, total in agregados}
+    return {
+        'total_sessoes': sum(quantidades.values()),
+        'sessoes_agendadas': quantidades.get('agendada', 0),
+        'sessoes_realizadas': quantidades.get('realizada', 0),
+        'receita_total': totais.get('realizada', 0.0)
+    }
+
+def pacientes_para_selecao(psicologo_id):
+    """Pacientes ativos para os campos de seleção, só com as colunas que eles mostram."""
+    return Paciente.query.options(
+        db.load_only(Paciente.id, Paciente.nome, Paciente.telefone)
+    ).filter_by(psicologo_id=psicologo_id, ativo=True).order_by(Paciente.nome).all()
+
+def resumo_texto(coluna, tamanho=200):
+    """Primeiros caracteres de uma coluna de texto, para listas com with_expression.
+    
+    Um caractere a mais é lido para o template saber se precisa de reticências.
+    """
+    return func.substr(coluna, 1, tamanho + 1)
+
+def resumo_pacientes(psicologo_id, paciente_ids=None):
+    """Totais de sessões por paciente, calculados em uma única consulta agrupada.
+    
+    Sem `paciente_ids` o resumo cobre todos os pacientes do psicólogo.
+    Pacientes sem nenhuma sessão não aparecem no resultado.
+    """
+    if paciente_ids is not None and not paciente_ids:
+        return {}
+    
+    agora = datetime.now()
+    realizada = Sessao.status == 'realizada'
+    agendada = Sessao.status == 'agendada'
+    query = db.session.query(
+        Sessao.paciente_id,
+        func.sum(case((realizada, 1), else_=0)),
+        func.sum(case((Sessao.status == 'faltou', 1), else_=0)),
+        func.max(case((realizada, Sessao.data_sessao))),
+        func.min(case((db.and_(agendada, Sessao.data_sessao >= agora), Sessao.data_sessao))),
+        func.sum(case((realizada, Sessao.valor), else_=0)),
+        func.sum(case((agendada, Sessao.valor), else_=0))
+    ).filter(Sessao.psicologo_id == psicologo_id)
+    
+    if paciente_ids is not None:
+        query = query.filter(Sessao.paciente_id.in_(paciente_ids))
+    
+    resumos = {}
+    for paciente_id, realizadas, faltas, ultima, proxima, receita, pendente in query.group_by(Sessao.paciente_id):
+        resumos[paciente_id] = {
+            'sessoes_realizadas': int(realizadas or 0),
+            'faltas': int(faltas or 0),
+            'ultima_sessao': ultima,
+            'proxima_sessao': proxima,
+            'receita': float(receita or 0),
+            'pendente': float(pendente or 0)
+        }
+    return resumos
+
+def consulta_recebiveis(psicologo_id):
+    """Sessões realizadas cujo valor ainda não foi totalmente pago.
+    
+    Cada linha traz sessao_id, paciente_id, data_sessao, valor, pago e saldo.
+    Os pagamentos são somados por sessão uma única vez (ix_pagamentos_psicologo_data)
+    e cruzados com as sessões do psicólogo (ix_sessoes_psicologo_data).
+    """
+    pagos = db.session.query(
+        Pagamento.sessao_id,
+        func.sum(Pagamento.valor).label('pago')
+    ).filter(Pagamento.psicologo_id == psicologo_id).group_by(Pagamento.sessao_id).subquery()
+    
+    pago = func.coalesce(pagos.c.pago, 0)
+    saldo = Sessao.valor - pago
+    return db.session.query(
+        Sessao.id.label('sessao_id'),
+        Sessao.paciente_id.label('paciente_id'),
+        Sessao.data_sessao.label('data_sessao'),
+        Sessao.valor.label('valor'),
+        pago.label('pago'),
+        saldo.label('saldo')
+    ).outerjoin(pagos, pagos.c.sessao_id == Sessao.id).filter(
+        Sessao.psicologo_id == psicologo_id,
+        Sessao.status == 'realizada',
+        Sessao.valor > 0,
+        saldo > 0
+    )
+
+def recebiveis_por_paciente(psicologo_id):
+    recebiveis = consulta_recebiveis(psicologo_id).subquery()
+    saldo = func.sum(recebiveis.c.saldo)
+    linhas = db.session.query(
+        Paciente.id,
+        Paciente.nome,
+        func.count(recebiveis.c.sessao_id),
+        saldo,
+        func.min(recebiveis.c.data_sessao)
+    ).join(recebiveis, recebiveis.c.paciente_id == Paciente.id).group_by(
+        Paciente.id, Paciente.nome
+    ).order_by(saldo.desc()).all()
+    
+    return [{
+        'paciente_id': paciente_id,
+        'nome': nome,
+        'sessoes': int(quantidade or 0),
+        'saldo': float(total or 0),
+        'mais_antiga': mais_antiga.date().isoformat() if mais_antiga else None
+    } for paciente_id, nome, quantidade, total, mais_antiga in linhas]
+
+# Faixas de atraso pela idade da sessão em dias (limite superior inclusivo)
+FAIXAS_ATRASO = (('0-30', 30), ('31-60', 60), ('61-90', 90), ('90+', None))
+
+def aging_recebiveis(psicologo_id):
+    recebiveis = consulta_recebiveis(psicologo_id).subquery()
+    hoje = date.today()
+    faixa = case(
+        *[(recebiveis.c.data_sessao >= datetime.combine(hoje - timedelta(days=limite), time.min), nome)
+          for nome, limite in FAIXAS_ATRASO if limite is not None],
+        else_=FAIXAS_ATRASO[-1][0]
+    ).label('faixa')
+    
+    linhas = db.session.query(
+        faixa,
+        func.count(recebiveis.c.sessao_id),
+        func.sum(recebiveis.c.saldo)
+    ).group_by(faixa).all()
+    
+    aging = {nome: {'sessoes': 0, 'saldo': 0.0} for nome, _ in FAIXAS_ATRASO}
+    for nome, quantidade, total in linhas:
+        aging[nome] = {'sessoes': int(quantidade or 0), 'saldo': float(total or 0)}
+    return aging
+
+def registrar_pagamentos(psicologo_id, sessao_ids, metodo, data_pagamento, valor=None):
+    """Cria um pagamento para cada sessão em aberto de `sessao_ids`.
+    
+    Sem `valor` a sessão é quitada pelo saldo; com `valor` é registrado um
+    pagamento parcial, limitado ao saldo. Sessões já quitadas são ignoradas.
+    As sessões ficam travadas (SELECT ... FOR UPDATE, no PostgreSQL) até o
+    commit e o saldo é lido depois da trava, então duas requisições
+    simultâneas (ou um clique duplo em "marcar pagas") não quitam a mesma
+    sessão duas vezes: a segunda espera a primeira e encontra o saldo zerado.
+    """
+    db.session.query(Sessao.id).filter(
+        Sessao.psicologo_id == psicologo_id,
+        Sessao.id.in_(sessao_ids)
+    ).order_by(Sessao.id).with_for_update().all()
+    
+    saldos = consulta_recebiveis(psicologo_id).filter(Sessao.id.in_(sessao_ids)).all()
+    
+    pagamentos = []
+    for linha in saldos:
+        saldo = Decimal(str(linha.saldo))
+        pagamentos.append(Pagamento(
+            sessao_id=linha.sessao_id,
+            psicologo_id=psicologo_id,
+            valor=saldo if valor is None else min(valor, saldo),
+            metodo=metodo,
+            data_pagamento=data_pagamento
+        ))
+    
+    db.session.add_all(pagamentos)
+    db.session.commit()
+    return pagamentos
+
+def estatisticas_do_resumo(resumo, total_pacientes=0, pacientes_ativos=0):
+    """Indicadores dos cards de relatório a partir de um resumo por status."""
+    stats = {'total_pacientes': total_pacientes, 'pacientes_ativos': pacientes_ativos}
+    vazio = {'quantidade': 0, 'com_valor': 0, 'total': 0.0}
+    realizadas = resumo.get('realizada', vazio)
+    
+    stats['total_sessoes'] = sum(item['quantidade'] for item in resumo.values())
+    stats['sessoes_realizadas'] = realizadas['quantidade']
+    stats['sessoes_agendadas'] = resumo.get('agendada', vazio)['quantidade']
+    stats['sessoes_faltas'] = resumo.get('faltou', vazio)['quantidade']
+    stats['sessoes_canceladas'] = resumo.get('cancelada', vazio)['quantidade'] + stats['sessoes_faltas']
+    stats['receita_total'] = realizadas['total']
+    stats['receita_pendente'] = resumo.get('agendada', vazio)['total']
+    
+    if realizadas['com_valor']:
+        stats['valor_medio_sessao'] = stats['receita_total'] / realizadas['com_valor']
+    else:
+        stats['valor_medio_sessao'] = 0
+    
+    if stats['total_sessoes'] > 0:
+        stats['taxa_comparecimento'] = (stats['sessoes_realizadas'] / stats['total_sessoes']) * 100
+    else:
+        stats['taxa_comparecimento'] = 0
+    
+    return stats
+
+def obter_estatisticas_gerais(data_inicio, data_fim):
+    try:
+        return estatisticas_do_resumo(
+            resumo_sessoes_por_status(current_user.id, data_inicio, data_fim),
+            Paciente.query.filter_by(psicologo_id=current_user.id).count(),
+            Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
+        )
+    except Exception as e:
+        print(f"❌ Erro ao obter estatísticas: {e}")
+        traceback.print_exc()
+        return {}
+
+# ========== ROTAS PRINCIPAIS ==========
+
+@app.route('/', methods=['GET', 'POST'])
+def index():
+    if request.method == 'POST':
+        if processar_login():
+            return redirect(url_for('dashboard'))
+        return render_template('login.html'), 429 if g.get('login_recusado') else 200
+    
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard'))
+    return render_template('login.html')
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        if processar_login():
+            return redirect(url_for('dashboard'))
+        return render_template('login.html'), 429 if g.get('login_recusado') else 200
+    
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard'))
+    return render_template('login.html')
+
+@app.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('login'))
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    print("✅ Rota /dashboard acessada")
+    total_pacientes = 0
+    sessoes_hoje = 0
+    proximas_sessoes = []
+    sessoes_mes = 0
+    receita_mes = 0
+    
+    try:
+        hoje = date.today()
+        inicio_hoje = datetime.combine(hoje, time.min)
+        inicio_amanha = inicio_hoje + timedelta(days=1)
+        inicio_mes = datetime.combine(hoje.replace(day=1), time.min)
+        
+        # Todos os contadores numa consulta só: somas condicionais sobre as
+        # sessões do mês (faixa do índice psicologo_id, data_sessao) e o total
+        # de pacientes ativos como subconsulta escalar
+        pacientes_ativos = db.select(func.count(Paciente.id)).where(
+            Paciente.psicologo_id == current_user.id,
+            Paciente.ativo.is_(True)
+        ).scalar_subquery()
+        resumo = db.session.query(
+            pacientes_ativos.label('pacientes_ativos'),
+            func.sum(case(
+                (db.and_(Sessao.data_sessao >= inicio_hoje, Sessao.data_sessao < inicio_amanha), 1), else_=0
+            )).label('sessoes_hoje'),
+            func.sum(case((Sessao.status.in_(['realizada', 'agendada']), 1), else_=0)).label('sessoes_mes'),
+            func.sum(case((Sessao.status == 'realizada', Sessao.valor), else_=0)).label('receita_mes')
+        ).select_from(Sessao).filter(
+            Sessao.psicologo_id == current_user.id,
+            Sessao.data_sessao >= inicio_mes,
+            Sessao.data_sessao < datetime.combine(inicio_proximo_mes(hoje), time.min)
+        ).one()
+        
+        total_pacientes = resumo.pacientes_ativos or 0
+        sessoes_hoje = int(resumo.sessoes_hoje or 0)
+        sessoes_mes = int(resumo.sessoes_mes or 0)
+        receita_mes = float(resumo.receita_mes or 0)
+        
+        agora = datetime.now()
+        proximas_sessoes = Sessao.query.options(
+            db.joinedload(Sessao.paciente).load_only(Paciente.id, Paciente.nome)
+        ).filter(
+            Sessao.psicologo_id == current_user.id,
+            Sessao.status == 'agendada',
+            Sessao.data_sessao >= agora,
+            Sessao.data_sessao <= agora + timedelta(days=7)
+        ).order_by(Sessao.data_sessao).limit(5).all()
+    except Exception as e:
+        print(f"❌ Erro ao buscar estatísticas do dashboard: {e}")
+        traceback.print_exc()
+    
+    return render_template('dashboard.html', 
+                         total_pacientes=total_pacientes,
+                         sessoes_hoje=sessoes_hoje,
+                         proximas_sessoes=proximas_sessoes,
+                         sessoes_mes=sessoes_mes,
+                         receita_mes=receita_mes)
+
+# ========== ROTAS DE PACIENTES ==========
+
+@app.route('/pacientes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def pacientes():
+    print("✅ Rota /pacientes acessada")
+    try:
+        search = request.args.get('search', '')
+        
+        if search:
+            pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id).filter(
+                db.or_(
+                    Paciente.nome.ilike(f'%{search}%'),
+                    Paciente.email.ilike(f'%{search}%'),
+                    Paciente.telefone.ilike(f'%{search}%')
+                )
+            ).order_by(Paciente.nome).all()
+        else:
+            pacientes_lista = Paciente.query.filter_by(psicologo_id=current_user.id).order_by(Paciente.nome).all()
+        
+        resumos = resumo_pacientes(current_user.id, [p.id for p in pacientes_lista] if search else None)
+        
+        total_pacientes = Paciente.query.filter_by(psicologo_id=current_user.id).count()
+        pacientes_ativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
+        primeiro_dia_mes = date.today().replace(day=1)
+        novos_mes = Paciente.query.filter_by(psicologo_id=current_user.id).filter(
+            Paciente.data_cadastro >= primeiro_dia_mes
+        ).count()
+        
+        try:
+            sessoes_mes = Sessao.query.filter_by(psicologo_id=current_user.id).filter(
+                db.func.extract('month', Sessao.data_sessao) == date.today().month,
+                db.func.extract('year', Sessao.data_sessao) == date.today().year
+            ).count()
+        except:
+            sessoes_mes = 0
+        
+        return render_template('pacientes.html',
+                             pacientes=pacientes_lista,
+                             resumos=resumos,
+                             total_pacientes=total_pacientes,
+                             pacientes_ativos=pacientes_ativos,
+                             novos_mes=novos_mes,
+                             sessoes_mes=sessoes_mes,
+                             today=date.today())
+    except Exception as e:
+        print(f"❌ Erro na página de pacientes: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar pacientes', 'error')
+        return redirect(url_for('dashboard'))
+
+@app.route('/api/pacientes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_pacientes():
+    try:
+        search = request.args.get('search', '')
+        ativo = request.args.get('ativo', '')
+        pagina = request.args.get('pagina', 1, type=int)
+        por_pagina = min(request.args.get('por_pagina', 50, type=int), 200)
+        
+        query = Paciente.query.filter_by(psicologo_id=current_user.id)
+        if search:
+            query = query.filter(
+                db.or_(
+                    Paciente.nome.ilike(f'%{search}%'),
+                    Paciente.email.ilike(f'%{search}%'),
+                    Paciente.telefone.ilike(f'%{search}%')
+                )
+            )
+        if ativo in ('0', '1'):
+            query = query.filter(Paciente.ativo == (ativo == '1'))
+        
+        paginacao = query.order_by(Paciente.nome).paginate(page=pagina, per_page=por_pagina, error_out=False)
+        resumos = resumo_pacientes(current_user.id, [p.id for p in paginacao.items])
+        
+        pacientes_json = []
+        for paciente in paginacao.items:
+            resumo = resumos.get(paciente.id, {})
+            pacientes_json.append({
+                'id': paciente.id,
+                'nome': paciente.nome,
+                'email': paciente.email,
+                'telefone': paciente.telefone,
+                'ativo': paciente.ativo,
+                'sessoes_realizadas': resumo.get('sessoes_realizadas', 0),
+                'faltas': resumo.get('faltas', 0),
+                'ultima_sessao': resumo['ultima_sessao'].isoformat() if resumo.get('ultima_sessao') else None,
+                'proxima_sessao': resumo['proxima_sessao'].isoformat() if resumo.get('proxima_sessao') else None,
+                'receita': resumo.get('receita', 0.0),
+                'pendente': resumo.get('pendente', 0.0)
+            })
+        
+        return jsonify({
+            'pacientes': pacientes_json,
+            'pagina': paginacao.page,
+            'por_pagina': paginacao.per_page,
+            'total': paginacao.total
+        })
+    except Exception as e:
+        print(f"❌ Erro na API pacientes: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+@app.route('/pacientes/novo', methods=['GET', 'POST'])
+@login_required
+def novo_paciente():
+    if request.method == 'POST':
+        try:
+            nome = request.form.get('nome', '').strip()
+            email = request.form.get('email', '').strip()
+            telefone = request.form.get('telefone', '').strip()
+            data_nascimento_str = request.form.get('data_nascimento', '')
+            endereco = request.form.get('endereco', '').strip()
+            observacoes = request.form.get('observacoes', '').strip()
+            
+            if not nome:
+                flash('Nome é obrigatório', 'error')
+                return render_template('novo_paciente.html')
+            
+            data_nascimento = None
+            if data_nascimento_str:
+                try:
+                    data_nascimento = datetime.strptime(data_nascimento_str, '%Y-%m-%d').date()
+                except:
+                    flash('Data de nascimento inválida', 'error')
+                    return render_template('novo_paciente.html')
+            
+            if email:
+                paciente_existente = Paciente.query.filter_by(email=email, psicologo_id=current_user.id).first()
+                if paciente_existente:
+                    flash('Já existe um paciente com este email', 'error')
+                    return render_template('novo_paciente.html')
+            
+            novo_paciente = Paciente(
+                nome=nome,
+                email=email if email else None,
+                telefone=telefone if telefone else None,
+                data_nascimento=data_nascimento,
+                endereco=endereco if endereco else None,
+                observacoes=observacoes if observacoes else None,
+                psicologo_id=current_user.id
+            )
+            
+            db.session.add(novo_paciente)
+            db.session.commit()
+            
+            flash(f'Paciente {nome} cadastrado com sucesso!', 'success')
+            return redirect(url_for('pacientes'))
+        except Exception as e:
+            print(f"❌ Erro ao cadastrar paciente: {e}")
+            traceback.print_exc()
+            flash('Erro ao cadastrar paciente', 'error')
+            db.session.rollback()
+    
+    return render_template('novo_paciente.html')
+
+@app.route('/pacientes/<int:id>')
+@login_required
+def ver_paciente(id):
+    try:
+        paciente = Paciente.query.options(db.undefer_group('detalhes')).filter_by(
+            id=id, psicologo_id=current_user.id
+        ).first_or_404()
+        sessoes = Sessao.query.filter_by(paciente_id=id).order_by(Sessao.data_sessao.desc()).limit(10).all()
+        evolucoes = Evolucao.query.options(
+            db.with_expression(Evolucao.descricao_resumo, resumo_texto(Evolucao.descricao))
+        ).filter_by(paciente_id=id).order_by(Evolucao.data_evolucao.desc()).limit(5).all()
+        resumo = resumo_pacientes(current_user.id, [id]).get(id)
+        
+        return render_template('ver_paciente.html', 
+                             paciente=paciente,
+                             resumo=resumo,
+                             sessoes=sessoes,
+                             evolucoes=evolucoes,
+                             today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao ver paciente: {e}")
+        traceback.print_exc()
+        flash('Paciente não encontrado', 'error')
+        return redirect(url_for('pacientes'))
+
+@app.route('/pacientes/<int:id>/editar', methods=['GET', 'POST'])
+@login_required
+def editar_paciente(id):
+    try:
+        paciente = Paciente.query.options(db.undefer_group('detalhes')).filter_by(
+            id=id, psicologo_id=current_user.id
+        ).first_or_404()
+        
+        if request.method == 'POST':
+            nome = request.form.get('nome', '').strip()
+            email = request.form.get('email', '').strip()
+            telefone = request.form.get('telefone', '').strip()
+            data_nascimento_str = request.form.get('data_nascimento', '')
+            endereco = request.form.get('endereco', '').strip()
+            observacoes = request.form.get('observacoes', '').strip()
+            
+            if not nome:
+                flash('Nome é obrigatório', 'error')
+                return render_template('editar_paciente.html', paciente=paciente, today=date.today())
+            
+            data_nascimento = None
+            if data_nascimento_str:
+                try:
+                    data_nascimento = datetime.strptime(data_nascimento_str, '%Y-%m-%d').date()
+                except:
+                    flash('Data de nascimento inválida', 'error')
+                    return render_template('editar_paciente.html', paciente=paciente, today=date.today())
+            
+            if email and email != paciente.email:
+                paciente_existente = Paciente.query.filter_by(email=email, psicologo_id=current_user.id).first()
+                if paciente_existente:
+                    flash('Já existe um paciente com este email', 'error')
+                    return render_template('editar_paciente.html', paciente=paciente, today=date.today())
+            
+            paciente.nome = nome
+            paciente.email = email if email else None
+            paciente.telefone = telefone if telefone else None
+            paciente.data_nascimento = data_nascimento
+            paciente.endereco = endereco if endereco else None
+            paciente.observacoes = observacoes if observacoes else None
+            
+            db.session.commit()
+            
+            flash(f'Dados de {nome} atualizados com sucesso!', 'success')
+            return redirect(url_for('ver_paciente', id=id))
+        
+        return render_template('editar_paciente.html', paciente=paciente, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao editar paciente: {e}")
+        traceback.print_exc()
+        flash('Paciente não encontrado', 'error')
+        return redirect(url_for('pacientes'))
+
+@app.route('/pacientes/<int:id>/desativar', methods=['POST'])
+@login_required
+def desativar_paciente(id):
+    try:
+        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
+        paciente.ativo = False
+        db.session.commit()
+        return jsonify({'success': True, 'message': f'Paciente {paciente.nome} desativado com sucesso'})
+    except Exception as e:
+        print(f"❌ Erro ao desativar paciente: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao desativar paciente'})
+
+@app.route('/pacientes/<int:id>/ativar', methods=['POST'])
+@login_required
+def ativar_paciente(id):
+    try:
+        paciente = Paciente.query.filter_by(id=id, psicologo_id=current_user.id).first_or_404()
+        paciente.ativo = True
+        db.session.commit()
+        return jsonify({'success': True, 'message': f'Paciente {paciente.nome} ativado com sucesso'})
+    except Exception as e:
+        print(f"❌ Erro ao ativar paciente: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao ativar paciente'})
+
+# ========== ROTAS DE SESSÕES ==========
+
+@app.route('/sessoes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def sessoes():
+    print("✅ Rota /sessoes acessada")
+    try:
+        status_filter = request.args.get('status', '')
+        paciente_filter = request.args.get('paciente', '')
+        data_inicio = request.args.get('data_inicio', '')
+        data_fim = request.args.get('data_fim', '')
+        
+        query = Sessao.query.filter_by(psicologo_id=current_user.id)
+        
+        if status_filter:
+            query = query.filter(Sessao.status == status_filter)
+        
+        if paciente_filter:
+            query = query.filter(Sessao.paciente_id == paciente_filter)
+        
+        if data_inicio:
+            try:
+                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+                query = query.filter(db.func.date(Sessao.data_sessao) >= data_inicio_obj)
+            except:
+                pass
+        
+        if data_fim:
+            try:
+                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
+                query = query.filter(db.func.date(Sessao.data_sessao) <= data_fim_obj)
+            except:
+                pass
+        
+        sessoes_lista = query.options(
+            db.joinedload(Sessao.paciente).load_only(Paciente.id, Paciente.nome, Paciente.telefone)
+        ).order_by(Sessao.data_sessao.desc()).all()
+        pacientes_lista = pacientes_para_selecao(current_user.id)
+        
+        return render_template('sessoes.html',
+                             sessoes=sessoes_lista,
+                             pacientes=pacientes_lista,
+                             **contadores_sessoes(current_user.id),
+                             today=date.today())
+    except Exception as e:
+        print(f"❌ Erro na página de sessões: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar sessões', 'error')
+        return redirect(url_for('dashboard'))
+
+@app.route('/sessoes/nova', methods=['GET', 'POST'])
+@login_required
+def nova_sessao():
+    if request.method == 'POST':
+        try:
+            paciente_id = request.form.get('paciente_id')
+            data_sessao_str = request.form.get('data_sessao')
+            hora_sessao = request.form.get('hora_sessao')
+            duracao = request.form.get('duracao', 50)
+            valor_str = request.form.get('valor', '').strip()
+            observacoes = request.form.get('observacoes', '').strip()
+            
+            if not paciente_id or paciente_id == '' or paciente_id == 'None':
+                flash('Paciente é obrigatório', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            try:
+                paciente_id_int = int(paciente_id)
+            except (ValueError, TypeError):
+                flash('Paciente inválido', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            if not data_sessao_str or not hora_sessao:
+                flash('Data e hora são obrigatórios', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            try:
+                data_sessao = datetime.strptime(f"{data_sessao_str} {hora_sessao}", '%Y-%m-%d %H:%M')
+            except Exception:
+                flash('Data ou hora inválida', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            if data_sessao < datetime.now():
+                flash('Não é possível agendar sessão no passado', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            paciente = Paciente.query.filter_by(id=paciente_id_int, psicologo_id=current_user.id).first()
+            if not paciente:
+                flash('Paciente não encontrado', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            conflito = Sessao.query.filter(
+                Sessao.psicologo_id == current_user.id,
+                Sessao.status == 'agendada',
+                Sessao.data_sessao == data_sessao
+            ).first()
+            
+            if conflito:
+                flash('Já existe uma sessão agendada para este horário', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            valor = None
+            if valor_str and valor_str.strip():
+                try:
+                    valor_limpo = valor_str.replace(',', '.').strip()
+                    valor = Decimal(valor_limpo)
+                except Exception:
+                    flash('Valor inválido', 'error')
+                    pacientes_lista = pacientes_para_selecao(current_user.id)
+                    return render_template('nova_sessao.html', pacientes=pacientes_lista)
+            
+            nova_sessao_obj = Sessao(
+                paciente_id=paciente_id_int,
+                psicologo_id=current_user.id,
+                data_sessao=data_sessao,
+                duracao=int(duracao),
+                valor=valor,
+                observacoes=observacoes if observacoes else None
+            )
+            
+            db.session.add(nova_sessao_obj)
+            db.session.commit()
+            
+            flash(f'Sessão agendada com {paciente.nome} para {data_sessao.strftime("%d/%m/%Y às %H:%M")}!', 'success')
+            return redirect(url_for('sessoes'))
+        except Exception as e:
+            print(f"❌ Erro ao salvar sessão: {e}")
+            traceback.print_exc()
+            flash('Erro ao salvar sessão no banco de dados', 'error')
+            db.session.rollback()
+    
+    try:
+        pacientes_lista = pacientes_para_selecao(current_user.id)
+    except Exception:
+        pacientes_lista = []
+    
+    return render_template('nova_sessao.html', pacientes=pacientes_lista)
+
+@app.route('/sessoes/<int:id>')
+@login_required
+def ver_sessao(id):
+    try:
+        sessao = Sessao.query.options(db.undefer(Sessao.observacoes)).filter_by(
+            id=id, psicologo_id=current_user.id
+        ).first_or_404()
+        return render_template('ver_sessao.html', sessao=sessao, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao ver sessão: {e}")
+        flash('Sessão não encontrada', 'error')
+        return redirect(url_for('sessoes'))
+
+@app.route('/sessoes/<int:id>/editar', methods=['GET', 'POST'])
+@login_required
+def editar_sessao(id):
+    try:
+        sessao = Sessao.query.options(db.undefer(Sessao.observacoes)).filter_by(
+            id=id, psicologo_id=current_user.id
+        ).first_or_404()
+        
+        if request.method == 'POST':
+            data_sessao_str = request.form.get('data_sessao')
+            hora_sessao = request.form.get('hora_sessao')
+            duracao = request.form.get('duracao', 50)
+            valor_str = request.form.get('valor', '').strip()
+            observacoes = request.form.get('observacoes', '').strip()
+            
+            if not data_sessao_str or not hora_sessao:
+                flash('Data e hora são obrigatórios', 'error')
+                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
+            
+            try:
+                data_sessao = datetime.strptime(f"{data_sessao_str} {hora_sessao}", '%Y-%m-%d %H:%M')
+            except:
+                flash('Data ou hora inválida', 'error')
+                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
+            
+            conflito = Sessao.query.filter(
+                Sessao.psicologo_id == current_user.id,
+                Sessao.status == 'agendada',
+                Sessao.data_sessao == data_sessao,
+                Sessao.id != id
+            ).first()
+            
+            if conflito:
+                flash('Já existe uma sessão agendada para este horário', 'error')
+                return render_template('editar_sessao.html', sessao=sessao, today=date.today())
+            
+            valor = None
+            if valor_str and valor_str.strip():
+                try:
+                    valor = Decimal(valor_str.replace(',', '.'))
+                except:
+                    flash('Valor inválido', 'error')
+                    return render_template('editar_sessao.html', sessao=sessao, today=date.today())
+            
+            sessao.data_sessao = data_sessao
+            sessao.duracao = int(duracao)
+            sessao.valor = valor
+            sessao.observacoes = observacoes if observacoes else None
+            
+            db.session.commit()
+            
+            flash('Sessão atualizada com sucesso!', 'success')
+            return redirect(url_for('ver_sessao', id=id))
+        
+        return render_template('editar_sessao.html', sessao=sessao, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao editar sessão: {e}")
+        flash('Sessão não encontrada', 'error')
+        return redirect(url_for('sessoes'))
+
+def alterar_status_sessao(id, status, mensagem, mensagem_erro):
+    """Grava o novo status e devolve os trechos da página que mudaram.
+    
+    O cliente informa no corpo JSON qual página está aberta: `linha` (lista
+    de sessões) recebe a linha da tabela e os contadores dos cards; `detalhe`
+    (ver_sessao) recebe o selo de status e os botões de ação. Sem `fragmento`
+    a resposta continua sendo só success/message.
+    """
+    try:
+        sessao = Sessao.query.options(db.joinedload(Sessao.paciente)).filter_by(
+            id=id, psicologo_id=current_user.id
+        ).first_or_404()
+        sessao.status = status
+        
+        resposta = {'success': True, 'message': mensagem, 'status': status}
+        fragmento = (request.get_json(silent=True) or {}).get('fragmento')
+        if fragmento == 'linha':
+            resposta['html'] = str(get_template_attribute('_sessao_fragmentos.html', 'linha_sessao')(sessao))
+        elif fragmento == 'detalhe':
+            resposta['html'] = {
+                'status': str(get_template_attribute('_sessao_fragmentos.html', 'status_sessao')(sessao)),
+                'acoes': str(get_template_attribute('_sessao_fragmentos.html', 'acoes_sessao')(sessao))
+            }
+        
+        db.session.commit()
+        
+        if fragmento == 'linha':
+            resposta['contadores'] = contadores_sessoes(current_user.id)
+        return jsonify(resposta)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao alterar status da sessão: {e}")
+        return jsonify({'success': False, 'message': mensagem_erro})
+
+@app.route('/sessoes/<int:id>/marcar-realizada', methods=['POST'])
+@login_required
+def marcar_sessao_realizada(id):
+    return alterar_status_sessao(id, 'realizada', 'Sessão marcada como realizada', 'Erro ao atualizar sessão')
+
+@app.route('/sessoes/<int:id>/marcar-faltou', methods=['POST'])
+@login_required
+def marcar_sessao_faltou(id):
+    return alterar_status_sessao(id, 'faltou', 'Sessão marcada como falta', 'Erro ao atualizar sessão')
+
+@app.route('/sessoes/<int:id>/cancelar', methods=['POST'])
+@login_required
+def cancelar_sessao(id):
+    return alterar_status_sessao(id, 'cancelada', 'Sessão cancelada', 'Erro ao cancelar sessão')
+
+@app.route('/sessoes/<int:id>/reagendar', methods=['POST'])
+@login_required
+def reagendar_sessao(id):
+    return alterar_status_sessao(id, 'agendada', 'Sessão reagendada', 'Erro ao reagendar sessão')
+
+# ========== ROTAS DE AGENDA ==========
+
+# Maior janela aceita por /api/agenda/eventos: a visão mensal pede no máximo
+# seis semanas completas (42 dias).
+AGENDA_JANELA_MAXIMA_DIAS = 42
+
+@app.route('/agenda')
+@login_required
+def agenda():
+    print("✅ Rota /agenda acessada")
+    visao = request.args.get('visao', 'semana')
+    if visao not in ('semana', 'mes'):
+        visao = 'semana'
+    
+    try:
+        referencia = datetime.strptime(request.args.get('data', ''), '%Y-%m-%d').date()
+    except ValueError:
+        referencia = date.today()
+    
+    return render_template('agenda.html', visao=visao, referencia=referencia)
+
+@app.route('/api/agenda/eventos')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_agenda_eventos():
+    try:
+        try:
+            inicio = datetime.strptime(request.args.get('inicio', ''), '%Y-%m-%d').date()
+            fim = datetime.strptime(request.args.get('fim', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Informe inicio e fim no formato AAAA-MM-DD'}), 400
+        
+        if fim < inicio or (fim - inicio).days >= AGENDA_JANELA_MAXIMA_DIAS:
+            return jsonify({'error': f'Janela inválida: máximo de {AGENDA_JANELA_MAXIMA_DIAS} dias'}), 400
+        
+        # Faixa em (psicologo_id, data_sessao), coberta por ix_sessoes_psicologo_data;
+        # só as colunas que o calendário desenha são lidas.
+        eventos = db.session.query(
+            Sessao.id,
+            Sessao.data_sessao,
+            Sessao.duracao,
+            Sessao.status,
+            Sessao.paciente_id,
+            Paciente.nome
+        ).join(Paciente, Paciente.id == Sessao.paciente_id).filter(
+            Sessao.psicologo_id == current_user.id,
+            Sessao.data_sessao >= datetime.combine(inicio, time.min),
+            Sessao.data_sessao < datetime.combine(fim + timedelta(days=1), time.min)
+        ).order_by(Sessao.data_sessao).all()
+        
+        return jsonify({
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'eventos': [{
+                'id': evento.id,
+                'inicio': evento.data_sessao.isoformat(),
+                'fim': (evento.data_sessao + timedelta(minutes=evento.duracao or 50)).isoformat(),
+                'status': evento.status or 'agendada',
+                'paciente_id': evento.paciente_id,
+                'paciente': evento.nome
+            } for evento in eventos]
+        })
+    except Exception as e:
+        print(f"❌ Erro na API da agenda: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+# ========== AGENDA ICS (ASSINATURA) ==========
+# Feed iCalendar por usuário, autenticado pelo token_agenda na URL para que
+# o aplicativo de calendário do celular possa assiná-lo sem login. O feed
+# cobre uma janela móvel em volta de hoje e é validado pela versão dos dados
+# do usuário: enquanto nada muda, as consultas periódicas recebem 304 sem
+# tocar na tabela de sessões.
+
+ICS_DIAS_ANTES = 30
+ICS_DIAS_DEPOIS = 180
+ICS_STATUS = {'cancelada': 'CANCELLED', 'agendada': 'CONFIRMED', 'realizada': 'CONFIRMED', 'faltou': 'CONFIRMED'}
+
+def _texto_ics(texto):
+    return (texto or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _linha_ics(linha):
+    """Quebra a linha em blocos de até 75 bytes, como pede a RFC 5545."""
+    dados = linha.encode('utf-8')
+    partes = []
+    while len(dados) > 75:
+        corte = 75 if not partes else 74
+        while corte and (dados[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(dados[:corte].decode('utf-8'))
+        dados = dados[corte:]
+    partes.append(dados.decode('utf-8'))
+    return '\r\n '.join(partes) + '\r\n'
+
+def _horario_utc_ics(horario, fuso):
+    """Horário local da clínica como data-hora UTC do iCalendar (sufixo Z)."""
+    return horario.replace(tzinfo=fuso).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def gerar_ics(usuario, inicio, fim):
+    fuso = ZoneInfo(app.config['FUSO_HORARIO'])
+    carimbo = (usuario.dados_atualizados_em or usuario.data_criacao or datetime.utcnow()).strftime('%Y%m%dT%H%M%SZ')
+    dominio = request.host.split(':')[0]
+    
+    yield _linha_ics('BEGIN:VCALENDAR')
+    yield _linha_ics('VERSION:2.0')
+    yield _linha_ics('PRODID:-//MindCarePro//Agenda//PT-BR')
+    yield _linha_ics('CALSCALE:GREGORIAN')
+    yield _linha_ics('METHOD:PUBLISH')
+    yield _linha_ics(f'X-WR-CALNAME:{_texto_ics("MindCarePro - " + usuario.nome)}')
+    yield _linha_ics('REFRESH-INTERVAL;VALUE=DURATION:PT15M')
+    
+    sessoes = db.session.query(
+        Sessao.id,
+        Sessao.data_sessao,
+        Sessao.duracao,
+        Sessao.status,
+        Paciente.nome
+    ).join(Paciente, Paciente.id == Sessao.paciente_id).filter(
+        Sessao.psicologo_id == usuario.id,
+        Sessao.data_sessao >= inicio,
+        Sessao.data_sessao < fim
+    ).order_by(Sessao.data_sessao).execution_options(yield_per=500)
+    
+    for sessao in sessoes:
+        termino = sessao.data_sessao + timedelta(minutes=sessao.duracao or 50)
+        yield _linha_ics('BEGIN:VEVENT')
+        yield _linha_ics(f'UID:sessao-{sessao.id}@{dominio}')
+        yield _linha_ics(f'DTSTAMP:{carimbo}')
+        yield _linha_ics(f'DTSTART:{_horario_utc_ics(sessao.data_sessao, fuso)}')
+        yield _linha_ics(f'DTEND:{_horario_utc_ics(termino, fuso)}')
+        yield _linha_ics(f'SUMMARY:{_texto_ics("Sessão - " + sessao.nome)}')
+        yield _linha_ics(f'STATUS:{ICS_STATUS.get(sessao.status, "CONFIRMED")}')
+        yield _linha_ics(f'URL:{url_for("ver_sessao", id=sessao.id, _external=True)}')
+        yield _linha_ics('END:VEVENT')
+    
+    yield _linha_ics('END:VCALENDAR')
+
+@app.route('/agenda/<token>.ics')
+def agenda_ics(token):
+    usuario = Usuario.query.filter_by(token_agenda=token, ativo=True).first()
+    if not usuario:
+        return Response('Agenda não encontrada', status=404, mimetype='text/plain')
+    
+    fuso = ZoneInfo(app.config['FUSO_HORARIO'])
+    hoje = datetime.now(fuso).date()
+    etag = hashlib.sha1(f'{VERSAO_APP}|ics|{usuario.id}|{usuario.versao_dados}|{hoje}'.encode('utf-8')).hexdigest()
+    # A janela anda à meia-noite da clínica, então a data de modificação nunca
+    # é anterior a ela; tudo em UTC, como dados_atualizados_em
+    meia_noite = datetime.combine(hoje, time.min, tzinfo=fuso).astimezone(timezone.utc).replace(tzinfo=None)
+    ultima_alteracao = max(usuario.dados_atualizados_em or usuario.data_criacao or datetime.min,
+                           meia_noite).replace(microsecond=0)
+    
+    resposta = Response(mimetype='text/calendar')
+    resposta.set_etag(etag)
+    resposta.last_modified = ultima_alteracao
+    resposta.headers['Cache-Control'] = 'private, max-age=900'
+    resposta.headers['Content-Disposition'] = 'inline; filename="agenda.ics"'
+    
+    if request.if_none_match:
+        if request.if_none_match.contains(etag):
+            resposta.status_code = 304
+            return resposta
+    elif request.if_modified_since and request.if_modified_since.replace(tzinfo=None) >= ultima_alteracao:
+        resposta.status_code = 304
+        return resposta
+    
+    inicio = datetime.combine(hoje - timedelta(days=ICS_DIAS_ANTES), time.min)
+    fim = datetime.combine(hoje + timedelta(days=ICS_DIAS_DEPOIS + 1), time.min)
+    resposta.response = stream_with_context(gerar_ics(usuario, inicio, fim))
+    return resposta
+
+# ========== ROTAS DE PRONTUÁRIO/EVOLUÇÃO ==========
+
+EVOLUCOES_POR_PAGINA = 20
+
+def pagina_evolucoes(paciente_id, cursor=None):
+    """Busca uma página de cabeçalhos da linha do tempo, da mais recente para a mais antiga.
+    
+    Paginação por chave em (data_evolucao, id), percorrendo
+    ix_evolucoes_paciente_data; o cursor é "<data ISO>|<id>" do último item
+    da página anterior. Descrição, medicamentos e observações privadas não
+    são lidos aqui. Retorna (evolucoes, proximo_cursor).
+    """
+    consulta = Evolucao.query.options(db.load_only(
+        Evolucao.id, Evolucao.data_evolucao, Evolucao.tipo, Evolucao.titulo, Evolucao.humor
+    )).filter(Evolucao.paciente_id == paciente_id)
+    
+    if cursor:
+        data_cursor, id_cursor = cursor.rsplit('|', 1)
+        data_cursor, id_cursor = datetime.fromisoformat(data_cursor), int(id_cursor)
+        consulta = consulta.filter(db.or_(
+            Evolucao.data_evolucao < data_cursor,
+            db.and_(Evolucao.data_evolucao == data_cursor, Evolucao.id < id_cursor)
+        ))
+    
+    evolucoes = consulta.order_by(
+        Evolucao.data_evolucao.desc(), Evolucao.id.desc()
+    ).limit(EVOLUCOES_POR_PAGINA + 1).all()
+    
+    # As arquivadas são todas mais antigas que as ativas: completam a página
+    if len(evolucoes) <= EVOLUCOES_POR_PAGINA and existe_tabela(db.session.connection(), 'evolucoes_arquivo'):
+        arquivo = EVOLUCOES_ARQUIVO.c
+        consulta_arquivo = db.select(
+            arquivo.id, arquivo.data_evolucao, arquivo.tipo, arquivo.titulo, arquivo.humor
+        ).where(arquivo.paciente_id == paciente_id)
+        if cursor:
+            consulta_arquivo = consulta_arquivo.where(db.or_(
+                arquivo.data_evolucao < data_cursor,
+                db.and_(arquivo.data_evolucao == data_cursor, arquivo.id < id_cursor)
+            ))
+        evolucoes += db.session.execute(consulta_arquivo.order_by(
+            arquivo.data_evolucao.desc(), arquivo.id.desc()
+        ).limit(EVOLUCOES_POR_PAGINA + 1 - len(evolucoes))).all()
+    
+    proximo_cursor = None
+    if len(evolucoes) > EVOLUCOES_POR_PAGINA:
+        evolucoes = evolucoes[:EVOLUCOES_POR_PAGINA]
+        ultima = evolucoes[-1]
+        proximo_cursor = f'{ultima.data_evolucao.isoformat()}|{ultima.id}'
+    return evolucoes, proximo_cursor
+
+@app.route('/prontuario/<int:paciente_id>')
+@login_required
+def prontuario(paciente_id):
+    print("✅ Rota /prontuario acessada")
+    try:
+        paciente = Paciente.query.filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
+        evolucoes, proximo_cursor = pagina_evolucoes(paciente_id)
+        return render_template('prontuario.html', paciente=paciente, evolucoes=evolucoes,
+                               proximo_cursor=proximo_cursor, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao ver prontuário: {e}")
+        traceback.print_exc()
+        flash('Paciente não encontrado', 'error')
+        return redirect(url_for('pacientes'))
+
+@app.route('/prontuario/<int:paciente_id>/nova', methods=['POST'])
+@login_required
+def nova_evolucao_prontuario(paciente_id):
+    try:
+        paciente = Paciente.query.filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
+        
+        tipo = request.form.get('tipo', 'evolucao')
+        titulo = request.form.get('titulo', '').strip()
+        conteudo = request.form.get('conteudo', '').strip()
+        humor = request.form.get('humor', '')
+        medicamentos = request.form.get('medicamentos', '').strip()
+        observacoes_privadas = request.form.get('observacoes_privadas', '').strip()
+        
+        if not titulo or not conteudo:
+            flash('Título e conteúdo são obrigatórios', 'error')
+            return redirect(url_for('prontuario', paciente_id=paciente_id))
+        
+        nova_evolucao = Evolucao(
+            paciente_id=paciente_id,
+            psicologo_id=current_user.id,
+            tipo=tipo,
+            titulo=titulo,
+            descricao=conteudo,
+            humor=humor if humor else None,
+            medicamentos=medicamentos if medicamentos else None,
+            observacoes_privadas=observacoes_privadas if observacoes_privadas else None
+        )
+        
+        db.session.add(nova_evolucao)
+        db.session.commit()
+        
+        flash('Evolução registrada com sucesso!', 'success')
+        return redirect(url_for('prontuario', paciente_id=paciente_id))
+    except Exception as e:
+        print(f"❌ Erro ao criar evolução: {e}")
+        traceback.print_exc()
+        flash('Erro ao registrar evolução', 'error')
+        db.session.rollback()
+        return redirect(url_for('prontuario', paciente_id=paciente_id))
+
+@app.route('/api/prontuario/<int:paciente_id>/evolucoes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_evolucoes_prontuario(paciente_id):
+    Paciente.query.with_entities(Paciente.id).filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
+    try:
+        evolucoes, proximo_cursor = pagina_evolucoes(paciente_id, request.args.get('antes'))
+    except ValueError:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    
+    return jsonify({
+        'html': str(get_template_attribute('_prontuario_fragmentos.html', 'itens_evolucao')(evolucoes)),
+        'quantidade': len(evolucoes),
+        'proximo_cursor': proximo_cursor
+    })
+
+@app.route('/api/evolucoes/<int:id>/corpo')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_corpo_evolucao(id):
+    evolucao = Evolucao.query.options(db.load_only(
+        Evolucao.id, Evolucao.descricao, Evolucao.medicamentos, Evolucao.observacoes_privadas
+    )).join(Paciente, Paciente.id == Evolucao.paciente_id).filter(
+        Evolucao.id == id,
+        Paciente.psicologo_id == current_user.id
+    ).first()
+    if evolucao is None and existe_tabela(db.session.connection(), 'evolucoes_arquivo'):
+        arquivo = EVOLUCOES_ARQUIVO.c
+        evolucao = db.session.execute(db.select(
+            arquivo.id, arquivo.descricao, arquivo.medicamentos, arquivo.observacoes_privadas
+        ).join(Paciente, Paciente.id == arquivo.paciente_id).where(
+            arquivo.id == id,
+            Paciente.psicologo_id == current_user.id
+        )).first()
+    if evolucao is None:
+        return jsonify({'error': 'Evolução não encontrada'}), 404
+    
+    return jsonify({
+        'id': evolucao.id,
+        'html': str(get_template_attribute('_prontuario_fragmentos.html', 'corpo_evolucao')(evolucao))
+    })
+
+@app.route('/evolucoes')
+@login_required
+def evolucoes():
+    print("✅ Rota /evolucoes acessada")
+    try:
+        paciente_filter = request.args.get('paciente', '')
+        data_inicio = request.args.get('data_inicio', '')
+        data_fim = request.args.get('data_fim', '')
+        
+        # Faixa em (psicologo_id, data_evolucao), coberta por ix_evolucoes_psicologo_data;
+        # o corpo das anotações não é lido, só um resumo da descrição.
+        query = Evolucao.query.options(
+            db.load_only(Evolucao.id, Evolucao.paciente_id, Evolucao.data_evolucao,
+                         Evolucao.tipo, Evolucao.titulo, Evolucao.humor),
+            db.with_expression(Evolucao.descricao_resumo, resumo_texto(Evolucao.descricao)),
+            db.joinedload(Evolucao.paciente).load_only(Paciente.id, Paciente.nome)
+        ).filter(Evolucao.psicologo_id == current_user.id)
+        
+        if paciente_filter:
+            query = query.filter(Evolucao.paciente_id == paciente_filter)
+        
+        if data_inicio:
+            try:
+                data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+                query = query.filter(Evolucao.data_evolucao >= datetime.combine(data_inicio_obj, time.min))
+            except ValueError:
+                pass
+        
+        if data_fim:
+            try:
+                data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
+                query = query.filter(Evolucao.data_evolucao < datetime.combine(data_fim_obj + timedelta(days=1), time.min))
+            except ValueError:
+                pass
+        
+        evolucoes_lista = query.order_by(Evolucao.data_evolucao.desc()).all()
+        pacientes_lista = pacientes_para_selecao(current_user.id)
+        
+        inicio_mes = datetime.combine(date.today().replace(day=1), time.min)
+        contagens = db.session.query(
+            func.count(Evolucao.id),
+            func.sum(case((Evolucao.data_evolucao >= inicio_mes, 1), else_=0))
+        ).filter(Evolucao.psicologo_id == current_user.id).one()
+        total_evolucoes = contagens[0]
+        evolucoes_mes = int(contagens[1] or 0)
+        
+        return render_template('evolucoes.html',
+                             evolucoes=evolucoes_lista,
+                             pacientes=pacientes_lista,
+                             total_evolucoes=total_evolucoes,
+                             evolucoes_mes=evolucoes_mes,
+                             today=date.today())
+    except Exception as e:
+        print(f"❌ Erro na página de evoluções: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar evoluções', 'error')
+        return redirect(url_for('dashboard'))
+
+@app.route('/evolucoes/nova', methods=['GET', 'POST'])
+@login_required
+def nova_evolucao():
+    if request.method == 'POST':
+        try:
+            paciente_id = request.form.get('paciente_id')
+            titulo = request.form.get('titulo', '').strip()
+            descricao = request.form.get('descricao', '').strip()
+            tipo = request.form.get('tipo', 'evolucao')
+            
+            if not paciente_id or paciente_id == '' or paciente_id == 'None':
+                flash('Paciente é obrigatório', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
+            
+            if not titulo:
+                flash('Título é obrigatório', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
+            
+            if not descricao:
+                flash('Descrição é obrigatória', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
+            
+            paciente = Paciente.query.filter_by(id=int(paciente_id), psicologo_id=current_user.id).first()
+            if not paciente:
+                flash('Paciente não encontrado', 'error')
+                pacientes_lista = pacientes_para_selecao(current_user.id)
+                return render_template('nova_evolucao.html', pacientes=pacientes_lista)
+            
+            nova_evolucao_obj = Evolucao(
+                paciente_id=int(paciente_id),
+                psicologo_id=current_user.id,
+                titulo=titulo,
+                descricao=descricao,
+                tipo=tipo
+            )
+            
+            db.session.add(nova_evolucao_obj)
+            db.session.commit()
+            
+            flash(f'Evolução de {paciente.nome} registrada com sucesso!', 'success')
+            return redirect(url_for('evolucoes'))
+        except Exception as e:
+            print(f"❌ Erro ao criar evolução: {e}")
+            traceback.print_exc()
+            flash('Erro ao registrar evolução', 'error')
+            db.session.rollback()
+    
+    try:
+        pacientes_lista = pacientes_para_selecao(current_user.id)
+    except Exception:
+        pacientes_lista = []
+    
+    return render_template('nova_evolucao.html', pacientes=pacientes_lista)
+
+@app.route('/evolucoes/<int:id>')
+@login_required
+def ver_evolucao(id):
+    try:
+        evolucao = Evolucao.query.options(db.undefer_group('corpo')).join(Paciente).filter(
+            Evolucao.id == id,
+            Paciente.psicologo_id == current_user.id
+        ).first_or_404()
+        
+        return render_template('ver_evolucao.html', evolucao=evolucao, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao ver evolução: {e}")
+        flash('Evolução não encontrada', 'error')
+        return redirect(url_for('evolucoes'))
+
+@app.route('/evolucoes/<int:id>/editar', methods=['GET', 'POST'])
+@login_required
+def editar_evolucao(id):
+    try:
+        evolucao = Evolucao.query.options(db.undefer_group('corpo')).join(Paciente).filter(
+            Evolucao.id == id,
+            Paciente.psicologo_id == current_user.id
+        ).first_or_404()
+        
+        if request.method == 'POST':
+            titulo = request.form.get('titulo', '').strip()
+            descricao = request.form.get('descricao', '').strip()
+            tipo = request.form.get('tipo', 'evolucao')
+            
+            if not titulo:
+                flash('Título é obrigatório', 'error')
+                return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
+            
+            if not descricao:
+                flash('Descrição é obrigatória', 'error')
+                return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
+            
+            evolucao.titulo = titulo
+            evolucao.descricao = descricao
+            evolucao.tipo = tipo
+            
+            db.session.commit()
+            
+            flash('Evolução atualizada com sucesso!', 'success')
+            return redirect(url_for('ver_evolucao', id=id))
+        
+        return render_template('editar_evolucao.html', evolucao=evolucao, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao editar evolução: {e}")
+        flash('Evolução não encontrada', 'error')
+        return redirect(url_for('evolucoes'))
+
+@app.route('/evolucoes/<int:id>/excluir', methods=['POST'])
+@login_required
+def excluir_evolucao(id):
+    try:
+        evolucao = Evolucao.query.join(Paciente).filter(
+            Evolucao.id == id,
+            Paciente.psicologo_id == current_user.id
+        ).first_or_404()
+        
+        db.session.delete(evolucao)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Evolução excluída com sucesso'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Erro ao excluir evolução'})
+
+# ========== ROTAS DE CONFIGURAÇÕES ==========
+
+@app.route('/configuracoes')
+@login_required
+def configuracoes():
+    print("✅ Rota /configuracoes acessada")
+    try:
+        config = Configuracao.query.filter_by(usuario_id=current_user.id).first()
+        return render_template('configuracoes.html', config=config, usuario=current_user, today=date.today())
+    except Exception as e:
+        print(f"❌ Erro ao carregar configurações: {e}")
+        traceback.print_exc()
+        return render_template('configuracoes.html', config=None, usuario=current_user, today=date.today())
+
+@app.route('/configuracoes/agenda-token', methods=['POST'])
+@login_required
+def gerar_token_agenda():
+    try:
+        current_user.token_agenda = secrets.token_urlsafe(32)
+        db.session.commit()
+        flash('Novo endereço de assinatura gerado. O endereço anterior deixou de funcionar.', 'success')
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao gerar token da agenda: {e}")
+        flash('Erro ao gerar endereço da agenda', 'error')
+    return redirect(url_for('configuracoes'))
+
+@app.route('/configuracoes/salvar', methods=['POST'])
+@login_required
+def salvar_configuracoes():
+    try:
+        config = Configuracao.query.filter_by(usuario_id=current_user.id).first()
+        
+        if not config:
+            config = Configuracao(usuario_id=current_user.id)
+            db.session.add(config)
+        
+        config.nome_completo = request.form.get('nome_completo')
+        config.crp = request.form.get('crp')
+        config.especialidade = request.form.get('especialidade')
+        config.telefone_profissional = request.form.get('telefone_profissional')
+        config.email_profissional = request.form.get('email_profissional')
+        config.endereco = request.form.get('endereco')
+        config.cidade = request.form.get('cidade')
+        config.estado = request.form.get('estado')
+        config.cep = request.form.get('cep')
+        
+        duracao = request.form.get('duracao_sessao')
+        if duracao:
+            config.duracao_sessao = int(duracao)
+        
+        valor = request.form.get('valor_sessao')
+        if valor:
+            try:
+                config.valor_sessao = Decimal(valor.replace(',', '.'))
+            except:
+                pass
+        
+        horario_inicio = request.form.get('horario_inicio')
+        horario_fim = request.form.get('horario_fim')
+        if horario_inicio:
+            try:
+                config.horario_inicio = datetime.strptime(horario_inicio, '%H:%M').time()
+            except:
+                pass
+        if horario_fim:
+            try:
+                config.horario_fim = datetime.strptime(horario_fim, '%H:%M').time()
+            except:
+                pass
+        
+        dias = request.form.getlist('dias_atendimento')
+        config.dias_atendimento = ','.join(dias) if dias else None
+        config.lembrete_paciente = 'lembrete_paciente' in request.form
+        
+        antecedencia = request.form.get('antecedencia_lembrete')
+        if antecedencia:
+            config.antecedencia_lembrete = int(antecedencia)
+        
+        senha_atual = request.form.get('senha_atual')
+        nova_senha = request.form.get('nova_senha')
+        confirmar_senha = request.form.get('confirmar_senha')
+        
+        if senha_atual and nova_senha:
+            if current_user.check_password(senha_atual):
+                if nova_senha == confirmar_senha:
+                    if len(nova_senha) >= 6:
+                        current_user.set_password(nova_senha)
+                        flash('Senha alterada com sucesso!', 'success')
+                    else:
+                        flash('A nova senha deve ter pelo menos 6 caracteres!', 'warning')
+                else:
+                    flash('As senhas não coincidem!', 'danger')
+                    return redirect(url_for('configuracoes'))
+            else:
+                flash('Senha atual incorreta!', 'danger')
+                return redirect(url_for('configuracoes'))
+        
+        db.session.commit()
+        flash('Configurações salvas com sucesso!', 'success')
+        return redirect(url_for('configuracoes'))
+    except Exception as e:
+        print(f"❌ Erro ao salvar configurações: {e}")
+        traceback.print_exc()
+        flash('Erro ao salvar configurações', 'error')
+        db.session.rollback()
+        return redirect(url_for('configuracoes'))
+
+@app.route('/configuracoes/perfil', methods=['GET', 'POST'])
+@login_required
+def configuracoes_perfil():
+    if request.method == 'POST':
+        try:
+            nome = request.form.get('nome', '').strip()
+            email = request.form.get('email', '').strip()
+            
+            if not nome:
+                flash('Nome é obrigatório', 'error')
+                return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
+            
+            if not email:
+                flash('Email é obrigatório', 'error')
+                return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
+            
+            if email != current_user.email:
+                usuario_existente = Usuario.query.filter_by(email=email).first()
+                if usuario_existente:
+                    flash('Este email já está sendo usado por outro usuário', 'error')
+                    return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
+            
+            current_user.nome = nome
+            current_user.email = email
+            db.session.commit()
+            
+            flash('Perfil atualizado com sucesso!', 'success')
+            return redirect(url_for('configuracoes'))
+        except Exception as e:
+            print(f"❌ Erro ao atualizar perfil: {e}")
+            flash('Erro ao atualizar perfil', 'error')
+            db.session.rollback()
+    
+    return render_template('configuracoes_perfil.html', usuario=current_user, today=date.today())
+
+@app.route('/configuracoes/senha', methods=['GET', 'POST'])
+@login_required
+def configuracoes_senha():
+    if request.method == 'POST':
+        try:
+            senha_atual = request.form.get('senha_atual', '')
+            nova_senha = request.form.get('nova_senha', '')
+            confirmar_senha = request.form.get('confirmar_senha', '')
+            
+            if not senha_atual:
+                flash('Senha atual é obrigatória', 'error')
+                return render_template('configuracoes_senha.html', today=date.today())
+            
+            if not nova_senha:
+                flash('Nova senha é obrigatória', 'error')
+                return render_template('configuracoes_senha.html', today=date.today())
+            
+            if len(nova_senha) < 6:
+                flash('Nova senha deve ter pelo menos 6 caracteres', 'error')
+                return render_template('configuracoes_senha.html', today=date.today())
+            
+            if nova_senha != confirmar_senha:
+                flash('Confirmação de senha não confere', 'error')
+                return render_template('configuracoes_senha.html', today=date.today())
+            
+            if not current_user.check_password(senha_atual):
+                flash('Senha atual incorreta', 'error')
+                return render_template('configuracoes_senha.html', today=date.today())
+            
+            current_user.set_password(nova_senha)
+            db.session.commit()
+            
+            flash('Senha alterada com sucesso!', 'success')
+            return redirect(url_for('configuracoes'))
+        except Exception as e:
+            print(f"❌ Erro ao alterar senha: {e}")
+            flash('Erro ao alterar senha', 'error')
+            db.session.rollback()
+    
+    return render_template('configuracoes_senha.html', today=date.today())
+
+# ========== ROTAS FINANCEIRAS ==========
+
+METODOS_PAGAMENTO = ('pix', 'dinheiro', 'cartao', 'transferencia', 'convenio')
+
+# Sessões realizadas há mais dias que isso sem pagamento contam como atrasadas
+DIAS_ATRASO_PAGAMENTO = 30
+
+@app.route('/financeiro')
+@login_required
+@resposta_condicional
+@leitura_replica
+def financeiro():
+    print("✅ Rota /financeiro acessada")
+    try:
+        hoje = date.today()
+        inicio_mes = hoje.replace(day=1)
+        recebido_mes = db.session.query(func.sum(Pagamento.valor)).filter(
+            Pagamento.psicologo_id == current_user.id,
+            Pagamento.data_pagamento >= inicio_mes,
+            Pagamento.data_pagamento < inicio_proximo_mes(hoje)
+        ).scalar()
+        
+        recebiveis = consulta_recebiveis(current_user.id).subquery()
+        pendentes = db.session.query(recebiveis, Paciente.nome.label('paciente')).join(
+            Paciente, Paciente.id == recebiveis.c.paciente_id
+        ).order_by(recebiveis.c.data_sessao).limit(200).all()
+        
+        aging = aging_recebiveis(current_user.id)
+        limite_atraso = datetime.combine(hoje - timedelta(days=DIAS_ATRASO_PAGAMENTO), time.min)
+        
+        return render_template('financeiro.html',
+                             recebido_mes=float(recebido_mes or 0),
+                             pendentes=pendentes,
+                             total_pendentes=sum(faixa['sessoes'] for faixa in aging.values()),
+                             saldo_pendente=sum(faixa['saldo'] for faixa in aging.values()),
+                             atrasados=sum(faixa['sessoes'] for nome, faixa in aging.items() if nome != FAIXAS_ATRASO[0][0]),
+                             aging=aging,
+                             por_paciente=recebiveis_por_paciente(current_user.id),
+                             limite_atraso=limite_atraso,
+                             metodos=METODOS_PAGAMENTO,
+                             today=hoje)
+    except Exception as e:
+        print(f"❌ Erro na página financeira: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar financeiro', 'error')
+        return redirect(url_for('dashboard'))
+
+def ler_dados_pagamento(dados):
+    metodo = dados.get('metodo') or 'pix'
+    if metodo not in METODOS_PAGAMENTO:
+        raise ValueError(f'Método de pagamento inválido: {metodo}')
+    
+    data_pagamento = date.today()
+    if dados.get('data_pagamento'):
+        data_pagamento = datetime.strptime(dados['data_pagamento'], '%Y-%m-%d').date()
+    
+    valor = None
+    if dados.get('valor') not in (None, ''):
+        valor = Decimal(str(dados['valor']).replace(',', '.'))
+        if valor <= 0:
+            raise ValueError('O valor do pagamento deve ser positivo')
+    
+    return metodo, data_pagamento, valor
+
+@app.route('/api/marcar_pagamento/<int:sessao_id>', methods=['POST'])
+@login_required
+def marcar_pagamento(sessao_id):
+    try:
+        metodo, data_pagamento, valor = ler_dados_pagamento(request.get_json(silent=True) or {})
+    except (ValueError, ArithmeticError) as e:
+        return jsonify({'success': False, 'message': str(e) or 'Dados de pagamento inválidos'}), 400
+    
+    try:
+        pagamentos = registrar_pagamentos(current_user.id, [sessao_id], metodo, data_pagamento, valor)
+        if not pagamentos:
+            return jsonify({'success': False, 'message': 'Sessão não encontrada ou já quitada'}), 404
+        return jsonify({'success': True, 'message': 'Pagamento registrado', 'valor': float(pagamentos[0].valor)})
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao registrar pagamento: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao registrar pagamento'}), 500
+
+@app.route('/api/pagamentos/marcar-pagos', methods=['POST'])
+@login_required
+def marcar_pagamentos_em_lote():
+    dados = request.get_json(silent=True) or {}
+    try:
+        sessao_ids = [int(sessao_id) for sessao_id in dados.get('sessao_ids', [])]
+        metodo, data_pagamento, _ = ler_dados_pagamento(dados)
+    except (TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'success': False, 'message': str(e) or 'Dados de pagamento inválidos'}), 400
+    
+    if not sessao_ids:
+        return jsonify({'success': False, 'message': 'Nenhuma sessão selecionada'}), 400
+    
+    try:
+        pagamentos = registrar_pagamentos(current_user.id, sessao_ids, metodo, data_pagamento)
+        return jsonify({
+            'success': True,
+            'message': f'{len(pagamentos)} sessão(ões) quitada(s)',
+            'quantidade': len(pagamentos),
+            'total': float(sum(pagamento.valor for pagamento in pagamentos))
+        })
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao registrar pagamentos em lote: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao registrar pagamentos'}), 500
+
+@app.route('/api/financeiro/recebiveis')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_recebiveis():
+    try:
+        aging = aging_recebiveis(current_user.id)
+        return jsonify({
+            'pacientes': recebiveis_por_paciente(current_user.id),
+            'aging': aging,
+            'total': sum(faixa['saldo'] for faixa in aging.values())
+        })
+    except Exception as e:
+        print(f"❌ Erro na API de recebíveis: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+# ========== ROTAS DE RELATÓRIOS ==========
+
+def inicio_periodo(periodo, hoje):
+    """Primeiro dia do período do seletor de relatórios ('1', '3', '6' ou '12' meses)."""
+    if periodo == '1':
+        return hoje.replace(day=1)
+    elif periodo == '3':
+        return hoje - timedelta(days=90)
+    elif periodo == '6':
+        return hoje - timedelta(days=180)
+    return hoje - timedelta(days=365)
+
+@app.route('/relatorios')
+@login_required
+@resposta_condicional
+@leitura_replica
+def relatorios():
+    print("✅ Rota /relatorios acessada")
+    try:
+        periodo = request.args.get('periodo', '12')
+        hoje = date.today()
+        data_inicio = inicio_periodo(periodo, hoje)
+        
+        stats = obter_estatisticas_gerais(data_inicio, hoje)
+        
+        return render_template('relatorios.html', 
+                             stats=stats,
+                             periodo=periodo,
+                             data_inicio=data_inicio.strftime('%Y-%m-%d'),
+                             data_fim=hoje.strftime('%Y-%m-%d'))
+    except Exception as e:
+        print(f"❌ Erro na página de relatórios: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar relatórios', 'error')
+        return redirect(url_for('dashboard'))
+
+# Acima deste período o relatório financeiro não lista as sessões na página
+RELATORIO_DIAS_SINCRONO = 366
+
+@app.route('/relatorios/financeiro')
+@login_required
+@resposta_condicional
+@leitura_replica
+def relatorio_financeiro():
+    try:
+        data_inicio = request.args.get('data_inicio', '')
+        data_fim = request.args.get('data_fim', '')
+        
+        if not data_inicio or not data_fim:
+            hoje = date.today()
+            data_fim = hoje.strftime('%Y-%m-%d')
+            data_inicio = hoje.replace(day=1).strftime('%Y-%m-%d')
+        
+        data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+        data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d').date()
+        
+        if (data_fim_obj - data_inicio_obj).days > RELATORIO_DIAS_SINCRONO:
+            # Período longo: a página mostra só os totais, calculados em uma
+            # consulta agrupada; o detalhamento sai como tarefa em segundo plano
+            ano = extract('year', Sessao.data_sessao)
+            mes = extract('month', Sessao.data_sessao)
+            agregados = db.session.query(
+                ano, mes, Sessao.status, func.count(Sessao.id), func.sum(Sessao.valor)
+            ).filter(
+                Sessao.psicologo_id == current_user.id,
+                Sessao.data_sessao >= datetime.combine(data_inicio_obj, time.min),
+                Sessao.data_sessao < datetime.combine(data_fim_obj + timedelta(days=1), time.min)
+            ).group_by(ano, mes, Sessao.status).order_by(ano, mes).all()
+            
+            sessoes = []
+            quantidade_sessoes = total_sessoes = sessoes_canceladas = 0
+            total_receita = receita_pendente = 0
+            receita_mensal = {}
+            for ano_sessao, mes_sessao, status, quantidade, total in agregados:
+                quantidade_sessoes += quantidade
+                if status == 'realizada':
+                    total_sessoes += quantidade
+                    total_receita += float(total or 0)
+                    if total:
+                        mes_ano = f'{int(mes_sessao):02d}/{int(ano_sessao)}'
+                        receita_mensal[mes_ano] = receita_mensal.get(mes_ano, 0) + float(total)
+                elif status == 'agendada':
+                    receita_pendente += float(total or 0)
+                elif status in ['cancelada', 'faltou']:
+                    sessoes_canceladas += quantidade
+        else:
+            sessoes = Sessao.query.options(
+                db.joinedload(Sessao.paciente).load_only(Paciente.id, Paciente.nome, Paciente.telefone),
+                db.with_expression(Sessao.observacoes_resumo, resumo_texto(Sessao.observacoes))
+            ).filter(
+                Sessao.psicologo_id == current_user.id,
+                func.date(Sessao.data_sessao) >= data_inicio_obj,
+                func.date(Sessao.data_sessao) <= data_fim_obj
+            ).order_by(Sessao.data_sessao.desc()).all()
+            
+            quantidade_sessoes = len(sessoes)
+            total_receita = sum(float(s.valor or 0) for s in sessoes if s.status == 'realizada')
+            total_sessoes = len([s for s in sessoes if s.status == 'realizada'])
+            receita_pendente = sum(float(s.valor or 0) for s in sessoes if s.status == 'agendada')
+            sessoes_canceladas = len([s for s in sessoes if s.status in ['cancelada', 'faltou']])
+            
+            receita_mensal = {}
+            for sessao in sessoes:
+                if sessao.status == 'realizada' and sessao.valor:
+                    mes_ano = sessao.data_sessao.strftime('%m/%Y')
+                    if mes_ano not in receita_mensal:
+                        receita_mensal[mes_ano] = 0
+                    receita_mensal[mes_ano] += float(sessao.valor)
+        
+        return render_template('relatorio_financeiro.html',
+                             sessoes=sessoes,
+                             quantidade_sessoes=quantidade_sessoes,
+                             detalhe_em_segundo_plano=(data_fim_obj - data_inicio_obj).days > RELATORIO_DIAS_SINCRONO,
+                             total_receita=total_receita,
+                             total_sessoes=total_sessoes,
+                             receita_pendente=receita_pendente,
+                             sessoes_canceladas=sessoes_canceladas,
+                             receita_mensal=receita_mensal,
+                             data_inicio=data_inicio,
+                             data_fim=data_fim)
+    except Exception as e:
+        print(f"❌ Erro no relatório financeiro: {e}")
+        traceback.print_exc()
+        flash('Erro ao gerar relatório financeiro', 'error')
+        return redirect(url_for('relatorios'))
+
+# ========== APIs PARA GRÁFICOS ==========
+
+@app.route('/api/relatorios/receita-mensal')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_receita_mensal():
+    try:
+        periodo = int(request.args.get('periodo', 12))
+        meses_ref = [date.today().replace(day=1)]
+        for _ in range(periodo - 1):
+            meses_ref.insert(0, (meses_ref[0] - timedelta(days=1)).replace(day=1))
+        
+        receita_por_mes = dict(db.session.query(ReceitaMensal.mes, ReceitaMensal.total).filter(
+            ReceitaMensal.psicologo_id == current_user.id,
+            ReceitaMensal.status == 'realizada',
+            ReceitaMensal.mes >= meses_ref[0]
+        ).all())
+        
+        meses = [mes.strftime('%m/%Y') for mes in meses_ref]
+        receitas = [float(receita_por_mes.get(mes) or 0) for mes in meses_ref]
+        
+        return jsonify({'labels': meses, 'data': receitas})
+    except Exception as e:
+        print(f"❌ Erro na API receita mensal: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+@app.route('/api/relatorios/sessoes-status')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_sessoes_status():
+    try:
+        periodo = int(request.args.get('periodo', 12))
+        hoje = date.today()
+        data_inicio = hoje - timedelta(days=periodo*30)
+        
+        status_counts = db.session.query(
+            Sessao.status,
+            func.count(Sessao.id)
+        ).filter(
+            Sessao.psicologo_id == current_user.id,
+            func.date(Sessao.data_sessao) >= data_inicio
+        ).group_by(Sessao.status).all()
+        
+        labels = []
+        data = []
+        colors = {
+            'realizada': '#28a745',
+            'agendada': '#007bff',
+            'cancelada': '#dc3545',
+            'faltou': '#ffc107'
+        }
+        background_colors = []
+        
+        for status, count in status_counts:
+            labels.append(status.title())
+            data.append(count)
+            background_colors.append(colors.get(status, '#6c757d'))
+        
+        return jsonify({'labels': labels, 'data': data, 'backgroundColor': background_colors})
+    except Exception as e:
+        print(f"❌ Erro na API sessões status: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+DIAS_SEMANA = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
+STATUS_COMPARECIMENTO = ('realizada', 'faltou', 'cancelada', 'agendada')
+MINIMO_SESSOES_TAXA_PACIENTE = 3
+
+def taxa(parte, total):
+    return round(parte * 100 / total, 1) if total else None
+
+@app.route('/api/relatorios/comparecimento-heatmap')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_comparecimento_heatmap():
+    """Faltas e cancelamentos por dia da semana × hora e por paciente.
+    
+    A matriz 7×24 sai de uma única consulta agrupada por (dia, hora, status),
+    filtrada por data_sessao pura para usar o índice (psicologo_id,
+    data_sessao). Dias: 0 = domingo, como no extract('dow') do PostgreSQL.
+    """
+    try:
+        periodo = int(request.args.get('periodo', 12))
+        hoje = date.today()
+        data_inicio = datetime.combine(hoje - timedelta(days=periodo*30), time.min)
+        data_fim = datetime.combine(hoje + timedelta(days=1), time.min)
+        no_periodo = (
+            Sessao.psicologo_id == current_user.id,
+            Sessao.data_sessao >= data_inicio,
+            Sessao.data_sessao < data_fim
+        )
+        
+        dia = extract('dow', Sessao.data_sessao)
+        hora = extract('hour', Sessao.data_sessao)
+        contagens = {status: [[0] * 24 for _ in range(7)] for status in STATUS_COMPARECIMENTO}
+        for linha_dia, linha_hora, status, quantidade in db.session.query(
+            dia, hora, Sessao.status, func.count(Sessao.id)
+        ).filter(*no_periodo).group_by(dia, hora, Sessao.status).all():
+            status = status or 'agendada'
+            if status in contagens:
+                contagens[status][int(linha_dia)][int(linha_hora)] += quantidade
+        
+        taxa_faltas = [[None] * 24 for _ in range(7)]
+        taxa_cancelamento = [[None] * 24 for _ in range(7)]
+        for d in range(7):
+            for h in range(24):
+                realizadas = contagens['realizada'][d][h]
+                faltas = contagens['faltou'][d][h]
+                total = sum(contagens[status][d][h] for status in STATUS_COMPARECIMENTO)
+                taxa_faltas[d][h] = taxa(faltas, realizadas + faltas)
+                taxa_cancelamento[d][h] = taxa(contagens['cancelada'][d][h], total)
+        
+        realizadas = func.sum(case((Sessao.status == 'realizada', 1), else_=0))
+        faltas = func.sum(case((Sessao.status == 'faltou', 1), else_=0))
+        canceladas = func.sum(case((Sessao.status == 'cancelada', 1), else_=0))
+        por_paciente = db.session.query(
+            Sessao.paciente_id, realizadas.label('realizadas'), faltas.label('faltas'),
+            canceladas.label('canceladas'), func.count(Sessao.id).label('total')
+        ).filter(*no_periodo).group_by(Sessao.paciente_id).having(
+            realizadas + faltas >= MINIMO_SESSOES_TAXA_PACIENTE
+        ).subquery()
+        
+        pacientes = []
+        for linha in db.session.query(Paciente.id, Paciente.nome, por_paciente).join(
+            por_paciente, por_paciente.c.paciente_id == Paciente.id
+        ).order_by(
+            (por_paciente.c.faltas * 1.0 / (por_paciente.c.realizadas + por_paciente.c.faltas)).desc(),
+            por_paciente.c.faltas.desc(), Paciente.nome
+        ).all():
+            pacientes.append({
+                'id': linha.id,
+                'nome': linha.nome,
+                'realizadas': int(linha.realizadas or 0),
+                'faltas': int(linha.faltas or 0),
+                'canceladas': int(linha.canceladas or 0),
+                'taxa_faltas': taxa(int(linha.faltas or 0), int(linha.realizadas or 0) + int(linha.faltas or 0)),
+                'taxa_cancelamento': taxa(int(linha.canceladas or 0), linha.total)
+            })
+        
+        return jsonify({
+            'dias': DIAS_SEMANA,
+            'contagens': contagens,
+            'taxa_faltas': taxa_faltas,
+            'taxa_cancelamento': taxa_cancelamento,
+            'pacientes': pacientes
+        })
+    except Exception as e:
+        print(f"❌ Erro na API heatmap de comparecimento: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+MARCOS_RETENCAO = (1, 3, 6, 12)
+DIAS_ABANDONO = 60
+
+@app.route('/api/relatorios/retencao')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_retencao():
+    """Retenção dos pacientes agrupados pelo mês da primeira sessão realizada.
+    
+    Funções de janela dão a primeira e a última sessão e o total de cada
+    paciente direto no banco; a consulta externa agrupa por coorte. Um
+    paciente conta como retido após N meses se a última sessão está N ou
+    mais meses-calendário depois da primeira, e como abandono se não tem
+    sessão realizada há mais de DIAS_ABANDONO dias.
+    """
+    try:
+        hoje = date.today()
+        por_paciente = Sessao.paciente_id
+        janela = db.session.query(
+            Sessao.paciente_id.label('paciente_id'),
+            func.min(Sessao.data_sessao).over(partition_by=por_paciente).label('primeira'),
+            func.max(Sessao.data_sessao).over(partition_by=por_paciente).label('ultima'),
+            func.count(Sessao.id).over(partition_by=por_paciente).label('sessoes'),
+            func.row_number().over(partition_by=por_paciente, order_by=(Sessao.data_sessao, Sessao.id)).label('ordem')
+        ).filter(
+            Sessao.psicologo_id == current_user.id,
+            Sessao.status == 'realizada'
+        ).subquery()
+        
+        ano = extract('year', janela.c.primeira)
+        mes = extract('month', janela.c.primeira)
+        meses_em_terapia = (
+            (extract('year', janela.c.ultima) - ano) * 12 + extract('month', janela.c.ultima) - mes
+        )
+        abandonou = janela.c.ultima < datetime.combine(hoje - timedelta(days=DIAS_ABANDONO), time.min)
+        
+        coortes = db.session.query(
+            ano.label('ano'),
+            mes.label('mes'),
+            func.count().label('pacientes'),
+            *(func.sum(case((meses_em_terapia >= marco, 1), else_=0)).label(f'retidos_{marco}')
+              for marco in MARCOS_RETENCAO),
+            func.sum(case((abandonou, 1), else_=0)).label('abandonos'),
+            func.avg(case((abandonou, janela.c.sessoes))).label('sessoes_ate_abandono'),
+            func.avg(janela.c.sessoes).label('sessoes_media')
+        ).filter(janela.c.ordem == 1).group_by(ano, mes).order_by(ano, mes).all()
+        
+        resultado = []
+        for linha in coortes:
+            ano_coorte, mes_coorte = int(linha.ano), int(linha.mes)
+            meses_decorridos = (hoje.year - ano_coorte) * 12 + hoje.month - mes_coorte
+            retencao = {}
+            for marco in MARCOS_RETENCAO:
+                # Coorte recente demais para o marco: ainda não há como saber
+                if meses_decorridos < marco:
+                    retencao[marco] = None
+                else:
+                    retidos = int(getattr(linha, f'retidos_{marco}') or 0)
+                    retencao[marco] = {'pacientes': retidos, 'taxa': taxa(retidos, linha.pacientes)}
+            resultado.append({
+                'coorte': f'{mes_coorte:02d}/{ano_coorte}',
+                'pacientes': linha.pacientes,
+                'retencao': retencao,
+                'abandonos': int(linha.abandonos or 0),
+                'sessoes_ate_abandono': round(float(linha.sessoes_ate_abandono), 1) if linha.sessoes_ate_abandono is not None else None,
+                'sessoes_media': round(float(linha.sessoes_media or 0), 1)
+            })
+        
+        inicio = inicio_dados_ativos('sessoes')
+        return jsonify({
+            'marcos': list(MARCOS_RETENCAO),
+            'dias_abandono': DIAS_ABANDONO,
+            'coortes': resultado,
+            # Sessões anteriores a esta data foram arquivadas (`flask arquivar`)
+            'dados_desde': inicio.isoformat() if inicio else None
+        })
+    except Exception as e:
+        print(f"❌ Erro na API de retenção: {e}")
+        traceback.print_exc()
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+@app.route('/api/relatorios/pacientes-ativos')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_pacientes_ativos():
+    try:
+        ativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=True).count()
+        inativos = Paciente.query.filter_by(psicologo_id=current_user.id, ativo=False).count()
+        
+        return jsonify({
+            'labels': ['Ativos', 'Inativos'],
+            'data': [ativos, inativos],
+            'backgroundColor': ['#28a745', '#dc3545']
+        })
+    except Exception as e:
+        print(f"❌ Erro na API pacientes ativos: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+@app.route('/api/relatorios/evolucao-sessoes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_evolucao_sessoes():
+    try:
+        periodo = int(request.args.get('periodo', 12))
+        hoje = date.today()
+        semanas = []
+        sessoes_realizadas = []
+        sessoes_agendadas = []
+        
+        for i in range(periodo):
+            inicio_semana = hoje - timedelta(days=hoje.weekday() + i*7)
+            fim_semana = inicio_semana + timedelta(days=6)
+            
+            realizadas = Sessao.query.filter(
+                Sessao.psicologo_id == current_user.id,
+                Sessao.status == 'realizada',
+                func.date(Sessao.data_sessao) >= inicio_semana,
+                func.date(Sessao.data_sessao) <= fim_semana
+            ).count()
+            
+            agendadas = Sessao.query.filter(
+                Sessao.psicologo_id == current_user.id,
+                Sessao.status == 'agendada',
+                func.date(Sessao.data_sessao) >= inicio_semana,
+                func.date(Sessao.data_sessao) <= fim_semana
+            ).count()
+            
+            semanas.insert(0, f"{inicio_semana.strftime('%d/%m')}")
+            sessoes_realizadas.insert(0, realizadas)
+            sessoes_agendadas.insert(0, agendadas)
+        
+        return jsonify({
+            'labels': semanas,
+            'datasets': [
+                {
+                    'label': 'Realizadas',
+                    'data': sessoes_realizadas,
+                    'borderColor': '#28a745',
+                    'backgroundColor': 'rgba(40, 167, 69, 0.1)',
+                    'fill': True
+                },
+                {
+                    'label': 'Agendadas',
+                    'data': sessoes_agendadas,
+                    'borderColor': '#007bff',
+                    'backgroundColor': 'rgba(0, 123, 255, 0.1)',
+                    'fill': True
+                }
+            ]
+        })
+    except Exception as e:
+        print(f"❌ Erro na API evolução sessões: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+# Métrica pedida na API -> coluna agregada usada na ordenação
+METRICAS_RANKING_PACIENTES = {
+    'sessoes': 'sessoes',
+    'receita': 'receita',
+    'faltas': 'taxa_faltas',
+    'recencia': 'ultima_sessao',
+}
+
+@app.route('/api/relatorios/top-pacientes')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_top_pacientes():
+    try:
+        periodo = int(request.args.get('periodo', 12))
+        metrica = request.args.get('metrica', 'sessoes')
+        limite = min(max(request.args.get('limite', 5, type=int), 1), 100)
+        pagina = max(request.args.get('pagina', 1, type=int), 1)
+        
+        if metrica not in METRICAS_RANKING_PACIENTES:
+            return jsonify({'error': f'Métrica inválida: {metrica}'}), 400
+        
+        data_inicio = datetime.combine(date.today() - timedelta(days=periodo*30), time.min)
+        
+        realizada = Sessao.status == 'realizada'
+        sessoes = func.sum(case((realizada, 1), else_=0))
+        faltas = func.sum(case((Sessao.status == 'faltou', 1), else_=0))
+        colunas = {
+            'sessoes': sessoes.label('sessoes'),
+            'faltas': faltas.label('faltas'),
+            'receita': func.sum(case((realizada, Sessao.valor), else_=0)).label('receita'),
+            'ultima_sessao': func.max(case((realizada, Sessao.data_sessao))).label('ultima_sessao'),
+            'taxa_faltas': (faltas * 1.0 / func.nullif(sessoes + faltas, 0)).label('taxa_faltas'),
+        }
+        ordem = METRICAS_RANKING_PACIENTES[metrica]
+        minimo = (sessoes + faltas) if metrica == 'faltas' else sessoes
+        
+        # O agrupamento usa só o índice (psicologo_id, data_sessao); o nome
+        # dos pacientes é buscado apenas para as linhas da página pedida.
+        ranking = db.session.query(
+            Sessao.paciente_id.label('paciente_id'),
+            *colunas.values()
+        ).filter(
+            Sessao.psicologo_id == current_user.id,
+            Sessao.data_sessao >= data_inicio
+        ).group_by(Sessao.paciente_id).having(minimo > 0).order_by(
+            colunas[ordem].desc().nulls_last(), Sessao.paciente_id
+        ).limit(limite).offset((pagina - 1) * limite).subquery()
+        
+        top_pacientes = db.session.query(Paciente.id, Paciente.nome, ranking).join(
+            ranking, ranking.c.paciente_id == Paciente.id
+        ).order_by(ranking.c[ordem].desc().nulls_last(), Paciente.id).all()
+        
+        pacientes = []
+        for linha in top_pacientes:
+            pacientes.append({
+                'id': linha.id,
+                'nome': linha.nome,
+                'sessoes': int(linha.sessoes or 0),
+                'faltas': int(linha.faltas or 0),
+                'receita': float(linha.receita or 0),
+                'taxa_faltas': round(float(linha.taxa_faltas or 0) * 100, 1),
+                'ultima_sessao': linha.ultima_sessao.isoformat() if linha.ultima_sessao else None
+            })
+        
+        return jsonify({
+            'pacientes': pacientes,
+            'metrica': metrica,
+            'pagina': pagina,
+            'limite': limite
+        })
+    except Exception as e:
+        print(f"❌ Erro na API top pacientes: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+# ========== RELATÓRIOS DA CLÍNICA (ADMIN) ==========
+# Visão do dono da clínica (Usuario.tipo == 'admin') sobre todos os
+# psicólogos. Os números saem de consultas agrupadas por psicólogo, não de
+# uma consulta por usuário: uma para usuários e pacientes e as de
+# resumo_sessoes_por_psicologo (receita_mensal mais as pontas do período).
+
+def admin_required(view):
+    """Restringe a view ao administrador da clínica. Deve ficar abaixo de @login_required."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.tipo != 'admin':
+            flash('Acesso restrito ao administrador da clínica', 'error')
+            return redirect(url_for('dashboard'))
+        return view(*args, **kwargs)
+    return wrapper
+
+def estatisticas_clinica(data_inicio, data_fim):
+    """Indicadores por psicólogo e o total da clínica no período."""
+    pacientes_ativos = func.sum(case((Paciente.ativo.is_(True), 1), else_=0))
+    usuarios = db.session.query(
+        Usuario.id,
+        Usuario.nome,
+        Usuario.email,
+        Usuario.ativo,
+        func.count(Paciente.id),
+        pacientes_ativos
+    ).outerjoin(Paciente, Paciente.psicologo_id == Usuario.id).group_by(
+        Usuario.id, Usuario.nome, Usuario.email, Usuario.ativo
+    ).order_by(Usuario.nome).all()
+    
+    resumos = resumo_sessoes_por_psicologo(data_inicio, data_fim)
+    
+    psicologos = []
+    resumo_clinica = {}
+    total_pacientes = total_ativos = 0
+    for usuario_id, nome, email, ativo, quantidade_pacientes, quantidade_ativos in usuarios:
+        resumo = resumos.get(usuario_id, {})
+        if not resumo and not quantidade_pacientes:
+            continue
+        
+        stats = estatisticas_do_resumo(resumo, quantidade_pacientes or 0, int(quantidade_ativos or 0))
+        stats.update({'id': usuario_id, 'nome': nome, 'email': email, 'ativo': ativo})
+        psicologos.append(stats)
+        
+        total_pacientes += stats['total_pacientes']
+        total_ativos += stats['pacientes_ativos']
+        for status, item in resumo.items():
+            acumulado = resumo_clinica.setdefault(status, {'quantidade': 0, 'com_valor': 0, 'total': 0.0})
+            for chave in acumulado:
+                acumulado[chave] += item[chave]
+    
+    return psicologos, estatisticas_do_resumo(resumo_clinica, total_pacientes, total_ativos)
+
+@app.route('/admin/relatorios')
+@login_required
+@admin_required
+@leitura_replica
+def admin_relatorios():
+    print("✅ Rota /admin/relatorios acessada")
+    try:
+        periodo = request.args.get('periodo', '1')
+        hoje = date.today()
+        data_inicio = inicio_periodo(periodo, hoje)
+        psicologos, total = estatisticas_clinica(data_inicio, hoje)
+        
+        return render_template('admin_relatorios.html',
+                             psicologos=psicologos,
+                             total=total,
+                             periodo=periodo,
+                             data_inicio=data_inicio,
+                             data_fim=hoje)
+    except Exception as e:
+        print(f"❌ Erro nos relatórios da clínica: {e}")
+        traceback.print_exc()
+        flash('Erro ao carregar relatórios da clínica', 'error')
+        return redirect(url_for('dashboard'))
+
+@app.route('/api/admin/relatorios')
+@login_required
+@admin_required
+@leitura_replica
+def api_admin_relatorios():
+    try:
+        hoje = date.today()
+        data_inicio = inicio_periodo(request.args.get('periodo', '1'), hoje)
+        psicologos, total = estatisticas_clinica(data_inicio, hoje)
+        return jsonify({
+            'inicio': data_inicio.isoformat(),
+            'fim': hoje.isoformat(),
+            'psicologos': psicologos,
+            'total': total
+        })
+    except Exception as e:
+        print(f"❌ Erro na API de relatórios da clínica: {e}")
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+@app.route('/api/admin/metricas-login')
+@login_required
+@admin_required
+def api_admin_metricas_login():
+    """Contadores de tentativas de login recusadas e com falha."""
+    try:
+        return jsonify({'backend': app.config['LIMITE_LOGIN_BACKEND'], 'contadores': limitador_login().metricas()})
+    except Exception as e:
+        print(f"❌ Erro nas métricas de login: {e}")
+        return jsonify({'error': 'Erro ao buscar métricas'}), 500
+
+# ========== SINCRONIZAÇÃO (API) ==========
+# /api/sync devolve só o que mudou desde o cursor anterior: pacientes,
+# sessões e evoluções com atualizado_em posterior e as exclusões registradas
+# em `exclusoes`. Cada tabela é percorrida em ordem de (atualizado_em, id)
+# pelos índices *_atualizado*, então o custo acompanha o volume de mudanças.
+# O cursor guarda a posição de cada tabela. As linhas dos últimos
+# SYNC_MARGEM segundos ficam para a próxima chamada, para que uma transação
+# ainda não confirmada com horário anterior não seja pulada.
+
+SYNC_LIMITE = 500
+SYNC_MARGEM = timedelta(seconds=5)
+SYNC_RETENCAO_EXCLUSOES = timedelta(days=90)
+
+@event.listens_for(db.session, 'before_flush')
+def registrar_exclusoes(session, flush_context, instances):
+    for objeto in list(session.deleted):
+        if isinstance(objeto, (Paciente, Sessao, Evolucao)) and objeto.psicologo_id is not None:
+            session.add(Exclusao(psicologo_id=objeto.psicologo_id, tabela=objeto.__tablename__, registro_id=objeto.id))
+
+def limpar_exclusoes_antigas():
+    db.session.execute(db.delete(Exclusao).where(Exclusao.excluido_em < datetime.utcnow() - SYNC_RETENCAO_EXCLUSOES))
+    db.session.commit()
+
+# Campos de cada tabela expostos pela API (/api/sync e /api/v1)
+CAMPOS_API = {
+    'pacientes': ('id', 'nome', 'email', 'telefone', 'data_nascimento', 'endereco', 'observacoes',
+                  'ativo', 'data_cadastro', 'atualizado_em'),
+    'sessoes': ('id', 'paciente_id', 'data_sessao', 'duracao', 'valor', 'status', 'observacoes',
+                'data_criacao', 'atualizado_em'),
+    'evolucoes': ('id', 'paciente_id', 'data_evolucao', 'tipo', 'titulo', 'humor', 'descricao',
+                  'medicamentos', 'observacoes_privadas', 'atualizado_em'),
+    'exclusoes': ('tabela', 'registro_id', 'excluido_em'),
+}
+
+MODELOS_API = {'pacientes': Paciente, 'sessoes': Sessao, 'evolucoes': Evolucao, 'exclusoes': Exclusao}
+
+def valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+def serializar_campos(objeto, campos):
+    return {campo: valor_json(getattr(objeto, campo)) for campo in campos}
+
+def consulta_do_usuario(tabela, usuario_id):
+    """Consulta da tabela restrita aos registros do psicólogo."""
+    modelo = MODELOS_API[tabela]
+    return modelo.query.filter(modelo.psicologo_id == usuario_id)
+
+def consultas_sync(usuario_id):
+    """Consulta e coluna de horário de cada tabela sincronizada."""
+    consultas = {}
+    for tabela in ('pacientes', 'sessoes', 'evolucoes'):
+        modelo = MODELOS_API[tabela]
+        consultas[tabela] = (consulta_do_usuario(tabela, usuario_id).options(db.undefer('*')), modelo.atualizado_em)
+    consultas['exclusoes'] = (consulta_do_usuario('exclusoes', usuario_id), Exclusao.excluido_em)
+    return consultas
+
+def ler_cursor_sync(cursor):
+    """{tabela: (horário, id)} a partir do cursor opaco; ValueError se for inválido."""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii') + b'=' * (-len(cursor) % 4)))
+        return {tabela: (datetime.fromisoformat(horario), int(ultimo_id)) for tabela, (horario, ultimo_id) in dados.items()}
+    except Exception as e:
+        raise ValueError('Cursor inválido') from e
+
+def gerar_cursor_sync(posicoes):
+    dados = {tabela: [horario.isoformat(), ultimo_id] for tabela, (horario, ultimo_id) in posicoes.items()}
+    return base64.urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode('ascii')).decode('ascii').rstrip('=')
+
+@app.route('/api/sync')
+@login_required
+def api_sync():
+    try:
+        posicoes = ler_cursor_sync(request.args['since']) if request.args.get('since') else {}
+    except ValueError:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    
+    limite = datetime.utcnow() - SYNC_MARGEM
+    if posicoes and min(horario for horario, _ in posicoes.values()) < limite - SYNC_RETENCAO_EXCLUSOES:
+        # As exclusões desse período já foram apagadas: o cliente precisa recomeçar
+        return jsonify({'error': 'Cursor expirado, faça uma sincronização completa'}), 410
+    
+    try:
+        resposta = {'mais': False}
+        novas_posicoes = {}
+        for tabela, (consulta, coluna_horario) in consultas_sync(current_user.id).items():
+            coluna_id = MODELOS_API[tabela].id
+            posicao = posicoes.get(tabela)
+            if tabela == 'exclusoes' and not posicoes:
+                # Sincronização completa: não há o que remover no cliente
+                resposta[tabela], novas_posicoes[tabela] = [], (limite, 0)
+                continue
+            
+            consulta = consulta.filter(coluna_horario < limite)
+            if posicao:
+                consulta = consulta.filter(db.or_(
+                    coluna_horario > posicao[0],
+                    db.and_(coluna_horario == posicao[0], coluna_id > posicao[1])
+                ))
+            linhas = consulta.order_by(coluna_horario, coluna_id).limit(SYNC_LIMITE + 1).all()
+            
+            if len(linhas) > SYNC_LIMITE:
+                linhas = linhas[:SYNC_LIMITE]
+                ultima = linhas[-1]
+                novas_posicoes[tabela] = (getattr(ultima, coluna_horario.key), ultima.id)
+                resposta['mais'] = True
+            else:
+                novas_posicoes[tabela] = (limite, 0)
+            resposta[tabela] = [serializar_campos(linha, CAMPOS_API[tabela]) for linha in linhas]
+        
+        resposta['cursor'] = gerar_cursor_sync(novas_posicoes)
+        return jsonify(resposta)
+    except Exception as e:
+        print(f"❌ Erro na API de sincronização: {e}")
+        traceback.print_exc()
+        return jsonify({'error': 'Erro ao sincronizar'}), 500
+
+# ========== API REST (v1) ==========
+# /api/v1/<recurso> lista pacientes, sessões e evoluções em JSON, em ordem de
+# id, com paginação por chave (?apos=<último id>&limite=N).
+#   fields=nome,telefone   só essas colunas são lidas (load_only); id sempre vem
+#   include=paciente       relacionados carregados em uma consulta extra cada
+#   ids=3,8,15             busca em lote pelos ids, sem paginação
+#   paciente_id=N          filtra sessões/evoluções de um paciente
+
+API_V1_LIMITE_PADRAO = 50
+API_V1_LIMITE_MAXIMO = 200
+API_V1_MAXIMO_IDS = 100
+
+# Relacionamentos aceitos em include=: nome -> (recurso relacionado, coluna local necessária)
+INCLUDES_API_V1 = {
+    'pacientes': {'sessoes': ('sessoes', None), 'evolucoes': ('evolucoes', None)},
+    'sessoes': {'paciente': ('pacientes', 'paciente_id')},
+    'evolucoes': {'paciente': ('pacientes', 'paciente_id')},
+}
+
+def lista_parametro(nome):
+    return [item.strip() for item in request.args.get(nome, '').split(',') if item.strip()]
+
+@app.route('/api/v1/<any(pacientes, sessoes, evolucoes):recurso>')
+@login_required
+@resposta_condicional
+@leitura_replica
+def api_v1_listar(recurso):
+    modelo = MODELOS_API[recurso]
+    
+    campos = lista_parametro('fields') or list(CAMPOS_API[recurso])
+    invalidos = [campo for campo in campos if campo not in CAMPOS_API[recurso]]
+    if invalidos:
+        return jsonify({'error': f'Campo inválido: {", ".join(invalidos)}'}), 400
+    if 'id' not in campos:
+        campos.insert(0, 'id')
+    
+    includes = lista_parametro('include')
+    invalidos = [nome for nome in includes if nome not in INCLUDES_API_V1[recurso]]
+    if invalidos:
+        return jsonify({'error': f'Include inválido: {", ".join(invalidos)}'}), 400
+    
+    try:
+        ids = [int(valor) for valor in lista_parametro('ids')]
+    except ValueError:
+        return jsonify({'error': 'ids deve ser uma lista de números separados por vírgula'}), 400
+    if len(ids) > API_V1_MAXIMO_IDS:
+        return jsonify({'error': f'No máximo {API_V1_MAXIMO_IDS} ids por requisição'}), 400
+    
+    try:
+        # Colunas lidas: as pedidas mais as chaves que os includes precisam
+        colunas = set(campos)
+        for nome in includes:
+            coluna_local = INCLUDES_API_V1[recurso][nome][1]
+            if coluna_local:
+                colunas.add(coluna_local)
+        opcoes = [db.load_only(*(getattr(modelo, coluna) for coluna in colunas))]
+        for nome in includes:
+            relacionado = INCLUDES_API_V1[recurso][nome][0]
+            modelo_relacionado = MODELOS_API[relacionado]
+            opcoes.append(db.selectinload(getattr(modelo, nome)).load_only(
+                *(getattr(modelo_relacionado, coluna) for coluna in CAMPOS_API[relacionado])
+            ))
+        
+        consulta = consulta_do_usuario(recurso, current_user.id).options(*opcoes)
+        if recurso != 'pacientes' and request.args.get('paciente_id', type=int):
+            consulta = consulta.filter(modelo.paciente_id == request.args.get('paciente_id', type=int))
+        
+        proximo = None
+        if ids:
+            objetos = consulta.filter(modelo.id.in_(ids)).order_by(modelo.id).all()
+        else:
+            limite = min(max(request.args.get('limite', API_V1_LIMITE_PADRAO, type=int), 1), API_V1_LIMITE_MAXIMO)
+            apos = request.args.get('apos', type=int)
+            if apos:
+                consulta = consulta.filter(modelo.id > apos)
+            objetos = consulta.order_by(modelo.id).limit(limite + 1).all()
+            if len(objetos) > limite:
+                objetos = objetos[:limite]
+                proximo = objetos[-1].id
+        
+        dados = []
+        for objeto in objetos:
+            item = serializar_campos(objeto, campos)
+            for nome in includes:
+                relacionado = INCLUDES_API_V1[recurso][nome][0]
+                valor = getattr(objeto, nome)
+                if isinstance(valor, list):
+                    item[nome] = [serializar_campos(outro, CAMPOS_API[relacionado]) for outro in sorted(valor, key=lambda outro: outro.id)]
+                else:
+                    item[nome] = serializar_campos(valor, CAMPOS_API[relacionado]) if valor else None
+            dados.append(item)
+        
+        return jsonify({'dados': dados, 'proximo': proximo})
+    except Exception as e:
+        print(f"❌ Erro na API v1 ({recurso}): {e}")
+        traceback.print_exc()
+        return jsonify({'error': 'Erro ao buscar dados'}), 500
+
+# ========== TAREFAS EM SEGUNDO PLANO ==========
+# Relatórios e exportações pesados não rodam dentro da requisição: a rota
+# grava uma Tarefa pendente e responde na hora, e o processo `flask worker`
+# reserva as tarefas uma a uma, executa e guarda o arquivo gerado na própria
+# linha para download. Com TAREFAS_MODO=thread (ambiente local, sem worker)
+# a tarefa roda numa thread do próprio servidor web.
+
+TIPOS_TAREFA = {}
+TAREFA_TEMPO_MAXIMO = timedelta(minutes=30)
+TAREFA_MAX_TENTATIVAS = 3
+TAREFA_RETENCAO = timedelta(days=7)
+
+def tipo_tarefa(nome):
+    """Registra a função que executa as tarefas de um tipo.
+    
+    A função recebe (usuario, parametros) e devolve
+    (nome_do_arquivo, mimetype, conteudo_em_bytes).
+    """
+    def registrar(funcao):
+        TIPOS_TAREFA[nome] = funcao
+        return funcao
+    return registrar
+
+def enfileirar_tarefa(usuario_id, tipo, parametros):
+    tarefa = Tarefa(usuario_id=usuario_id, tipo=tipo, parametros=json.dumps(parametros))
+    db.session.add(tarefa)
+    db.session.commit()
+    
+    if app.config['TAREFAS_MODO'] == 'thread':
+        threading.Thread(target=executar_tarefa_em_thread, args=(tarefa.id,), daemon=True).start()
+    return tarefa
+
+def executar_tarefa_em_thread(tarefa_id):
+    with app.app_context():
+        if reservar_tarefa(tarefa_id):
+            executar_tarefa(tarefa_id)
+
+def reservar_tarefa(tarefa_id):
+    """Passa a tarefa para 'executando' só se ela ainda estiver pendente."""
+    resultado = db.session.execute(
+        db.update(Tarefa)
+        .where(Tarefa.id == tarefa_id, Tarefa.status == 'pendente')
+        .values(status='executando', iniciada_em=datetime.utcnow(), tentativas=Tarefa.tentativas + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return resultado.rowcount == 1
+
+def reservar_proxima_tarefa():
+    # No PostgreSQL vários workers podem disputar a fila: SKIP LOCKED faz cada
+    # um pular a linha que outro já está reservando.
+    while True:
+        consulta = db.select(Tarefa.id).where(Tarefa.status == 'pendente').order_by(Tarefa.id).limit(1)
+        if db.engine.dialect.name == 'postgresql':
+            consulta = consulta.with_for_update(skip_locked=True)
+        tarefa_id = db.session.execute(consulta).scalar()
+        if tarefa_id is None:
+            db.session.rollback()
+            return None
+        if reservar_tarefa(tarefa_id):
+            return tarefa_id
+
+def executar_tarefa(tarefa_id):
+    tarefa = db.session.get(Tarefa, tarefa_id)
+    if tarefa is None:
+        # Apagada ou expurgada entre a reserva e a execução
+        print(f"⚠️ Tarefa {tarefa_id} não existe mais")
+        return
+    tipo = tarefa.tipo
+    try:
+        usuario = db.session.get(Usuario, tarefa.usuario_id)
+        nome, mimetype, conteudo = TIPOS_TAREFA[tipo](usuario, json.loads(tarefa.parametros or '{}'))
+        tarefa.resultado = conteudo
+        tarefa.resultado_nome = nome
+        tarefa.resultado_mimetype = mimetype
+        tarefa.status = 'concluida'
+    except Exception as e:
+        print(f"❌ Erro na tarefa {tarefa_id} ({tipo}): {e}")
+        traceback.print_exc()
+        db.session.rollback()
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        if tarefa is None:
+            return
+        tarefa.status = 'erro'
+        tarefa.erro = str(e)[:1000] or e.__class__.__name__
+    
+    tarefa.concluida_em = datetime.utcnow()
+    try:
+        db.session.commit()
+    except Exception as e:
+        # A tarefa fica 'executando' e recuperar_tarefas_abandonadas() a devolve à fila
+        print(f"❌ Erro ao salvar o resultado da tarefa {tarefa_id}: {e}")
+        traceback.print_exc()
+        db.session.rollback()
+
+def recuperar_tarefas_abandonadas():
+    """Devolve à fila as tarefas de um worker que morreu no meio da execução."""
+    limite = datetime.utcnow() - TAREFA_TEMPO_MAXIMO
+    abandonadas = db.and_(Tarefa.status == 'executando', Tarefa.iniciada_em < limite)
+    db.session.execute(
+        db.update(Tarefa).where(abandonadas, Tarefa.tentativas < TAREFA_MAX_TENTATIVAS)
+        .values(status='pendente').execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.update(Tarefa).where(abandonadas)
+        .values(status='erro', erro='Tempo máximo de execução excedido', concluida_em=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def limpar_tarefas_antigas():
+    db.session.execute(
+        db.delete(Tarefa).where(
+            Tarefa.status.in_(['concluida', 'erro']),
+            Tarefa.concluida_em < datetime.utcnow() - TAREFA_RETENCAO
+        )
+    )
+    db.session.commit()
+
+def descrever_tarefa(tarefa):
+    descricao = {
+        'id': tarefa.id,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'criada_em': tarefa.criada_em.isoformat() if tarefa.criada_em else None,
+        'concluida_em': tarefa.concluida_em.isoformat() if tarefa.concluida_em else None,
+        'url_status': url_for('api_status_tarefa', id=tarefa.id)
+    }
+    if tarefa.status == 'concluida':
+        descricao['url_download'] = url_for('baixar_resultado_tarefa', id=tarefa.id)
+    elif tarefa.status == 'erro':
+        descricao['erro'] = tarefa.erro
+    return descricao
+
+@tipo_tarefa('relatorio_financeiro_csv')
+def tarefa_relatorio_financeiro_csv(usuario, parametros):
+    data_inicio = datetime.strptime(parametros['data_inicio'], '%Y-%m-%d').date()
+    data_fim = datetime.strptime(parametros['data_fim'], '%Y-%m-%d').date()
+    
+    sessoes = db.session.query(
+        Sessao.data_sessao,
+        Paciente.nome,
+        Sessao.status,
+        Sessao.valor,
+        Sessao.observacoes
+    ).join(Paciente, Paciente.id == Sessao.paciente_id).filter(
+        Sessao.psicologo_id == usuario.id,
+        Sessao.data_sessao >= datetime.combine(data_inicio, time.min),
+        Sessao.data_sessao < datetime.combine(data_fim + timedelta(days=1), time.min)
+    ).order_by(Sessao.data_sessao).execution_options(yield_per=1000)
+    
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(['Data', 'Hora', 'Paciente', 'Status', 'Valor', 'Observações'])
+    for sessao in sessoes:
+        escritor.writerow([
+            sessao.data_sessao.strftime('%d/%m/%Y'),
+            sessao.data_sessao.strftime('%H:%M'),
+            sessao.nome,
+            sessao.status,
+            f'{sessao.valor:.2f}' if sessao.valor is not None else '',
+            sessao.observacoes or ''
+        ])
+    
+    # BOM para o Excel reconhecer o arquivo como UTF-8
+    conteudo = ('\ufeff' + saida.getvalue()).encode('utf-8')
+    return f'relatorio_financeiro_{data_inicio}_{data_fim}.csv', 'text/csv', conteudo
+
+@app.route('/api/tarefas', methods=['POST'])
+@login_required
+def api_criar_tarefa():
+    dados = request.get_json(silent=True) or {}
+    tipo = dados.get('tipo')
+    if tipo not in TIPOS_TAREFA:
+        return jsonify({'error': f'Tipo de tarefa inválido: {tipo}'}), 400
+    
+    try:
+        tarefa = enfileirar_tarefa(current_user.id, tipo, dados.get('parametros') or {})
+        return jsonify(descrever_tarefa(tarefa)), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erro ao enfileirar tarefa: {e}")
+        return jsonify({'error': 'Erro ao criar tarefa'}), 500
+
+@app.route('/api/tarefas/<int:id>')
+@login_required
+def api_status_tarefa(id):
+    tarefa = Tarefa.query.filter_by(id=id, usuario_id=current_user.id).first_or_404()
+    return jsonify(descrever_tarefa(tarefa))
+
+@app.route('/tarefas/<int:id>/download')
+@login_required
+def baixar_resultado_tarefa(id):
+    tarefa = Tarefa.query.options(db.undefer(Tarefa.resultado)).filter_by(
+        id=id, usuario_id=current_user.id, status='concluida'
+    ).first_or_404()
+    
+    resposta = Response(tarefa.resultado, mimetype=tarefa.resultado_mimetype)
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{tarefa.resultado_nome}"'
+    resposta.headers['Cache-Control'] = 'private, max-age=3600'
+    return resposta
+
+# ========== DOCUMENTOS PDF ==========
+# Prontuário e relatório financeiro em PDF. Os estilos e o modelo de página
+# são montados uma vez no import; o conteúdo é gerado a partir de consultas
+# que trazem só as colunas necessárias, em lotes, e as tabelas longas são
+# quebradas em blocos para o layout não processar milhares de linhas de uma
+# vez. O PDF gerado fica em cache em disco, com a versão dos dados do usuário
+# no nome: baixar de novo um documento sem alterações só lê o arquivo.
+
+def _estilos_pdf():
+    base = getSampleStyleSheet()
+    return {
+        'titulo': ParagraphStyle('Titulo', parent=base['Heading1'], fontSize=16, spaceAfter=4),
+        'subtitulo': ParagraphStyle('Subtitulo', parent=base['Normal'], fontSize=9, textColor=colors.grey, spaceAfter=12),
+        'secao': ParagraphStyle('Secao', parent=base['Heading3'], spaceBefore=12, spaceAfter=2),
+        'meta': ParagraphStyle('Meta', parent=base['Normal'], fontSize=8, textColor=colors.grey, spaceAfter=4),
+        'texto': ParagraphStyle('Texto', parent=base['Normal'], fontSize=10, leading=14),
+        'celula': ParagraphStyle('Celula', parent=base['Normal'], fontSize=8, leading=10),
+    }
+
+ESTILOS_PDF = _estilos_pdf()
+ESTILO_TABELA_PDF = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+LINHAS_POR_TABELA_PDF = 200
+PASTA_CACHE_PDF = os.path.join(app.instance_path, 'cache_pdf')
+CACHE_PDF_VALIDADE = timedelta(days=7)
+CACHE_PDF_MAXIMO_BYTES = 200 * 1024 * 1024
+
+def _texto_pdf(texto):
+    return escape(texto or '').replace('\n', '<br/>')
+
+JANELA_FLOWABLES_PDF = 200
+
+class FlowablesSobDemanda(list):
+    """Lista de flowables reabastecida do gerador à medida que o ReportLab a consome.
+
+    O build() tira os itens da frente e consulta len() a cada passo; aqui
+    len() puxa do gerador até JANELA_FLOWABLES_PDF itens, então só essa
+    janela (e não o prontuário inteiro) fica em memória durante o desenho.
+    """
+    _FIM = object()
+    
+    def __init__(self, fonte, janela=JANELA_FLOWABLES_PDF):
+        super().__init__()
+        self.fonte = iter(fonte)
+        self.janela = janela
+    
+    def __len__(self):
+        while self.fonte is not None and list.__len__(self) < self.janela:
+            item = next(self.fonte, self._FIM)
+            if item is self._FIM:
+                self.fonte = None
+            else:
+                self.append(item)
+        return list.__len__(self)
+
+def montar_pdf(titulo, conteudo):
+    def rodape(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawString(2 * cm, 1.2 * cm, f'MindCarePro - {titulo}')
+        canvas.drawRightString(A4[0] - 2 * cm, 1.2 * cm, f'Página {documento.page}')
+        canvas.restoreState()
+    
+    buffer = io.BytesIO()
+    documento = SimpleDocTemplate(buffer, pagesize=A4, title=titulo, author='MindCarePro',
+                                  leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+    documento.build(FlowablesSobDemanda(conteudo), onFirstPage=rodape, onLaterPages=rodape)
+    return buffer.getvalue()
+
+def tabelas_pdf(cabecalho, linhas, larguras):
+    """Divide as linhas em tabelas de LINHAS_POR_TABELA_PDF, repetindo o cabeçalho."""
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) == LINHAS_POR_TABELA_PDF:
+            yield Table([cabecalho] + bloco, colWidths=larguras, repeatRows=1, style=ESTILO_TABELA_PDF)
+            bloco = []
+    if bloco:
+        yield Table([cabecalho] + bloco, colWidths=larguras, repeatRows=1, style=ESTILO_TABELA_PDF)
+
+def limpar_cache_pdf():
+    """Apaga os PDFs mais velhos que CACHE_PDF_VALIDADE e, se a pasta ainda
+    passar de CACHE_PDF_MAXIMO_BYTES, os menos recentes até caber."""
+    try:
+        arquivos = []
+        for entrada in os.scandir(PASTA_CACHE_PDF):
+            if entrada.is_file():
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+    except FileNotFoundError:
+        return
+    
+    limite = relogio.time() - CACHE_PDF_VALIDADE.total_seconds()
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for modificado_em, tamanho, caminho in sorted(arquivos):
+        if modificado_em >= limite and total <= CACHE_PDF_MAXIMO_BYTES:
+            break
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+
+def pdf_em_cache(usuario, documento, gerar):
+    """Devolve o PDF do cache em disco ou gera e grava um novo.
+    
+    O nome do arquivo leva a versão dos dados do usuário; ao gravar, todos
+    os PDFs do usuário de versões anteriores são apagados, e o cache inteiro
+    é limitado por idade e tamanho (limpar_cache_pdf). A data de emissão
+    entra na chave, para o "Emitido em" do documento nunca ficar defasado.
+    """
+    chave = f'{VERSAO_APP}|{date.today()}|{documento}'
+    prefixo = f'{usuario.id}-' + hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]
+    caminho = os.path.join(PASTA_CACHE_PDF, f'{prefixo}-{usuario.versao_dados}.pdf')
+    
+    try:
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        pass
+    
+    conteudo = gerar()
+    try:
+        os.makedirs(PASTA_CACHE_PDF, exist_ok=True)
+        versao_atual = f'-{usuario.versao_dados}.pdf'
+        for nome in os.listdir(PASTA_CACHE_PDF):
+            if nome.startswith(f'{usuario.id}-') and (nome.startswith(prefixo + '-') or not nome.endswith(versao_atual)):
+                try:
+                    os.remove(os.path.join(PASTA_CACHE_PDF, nome))
+                except FileNotFoundError:
+                    pass
+        temporario = f'{caminho}.{os.getpid()}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+        limpar_cache_pdf()
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o PDF em cache: {e}")
+    return conteudo
+
+def resposta_pdf(conteudo, nome_arquivo):
+    resposta = Response(conteudo, mimetype='application/pdf')
+    resposta.headers['Content-Disposition'] = f'inline; filename="{nome_arquivo}"'
+    return resposta
+
+def conteudo_pdf_prontuario(usuario, paciente):
+    estilos = ESTILOS_PDF
+    config = Configuracao.query.filter_by(usuario_id=usuario.id).first()
+    profissional = (config.nome_completo if config and config.nome_completo else usuario.nome)
+    if config and config.crp:
+        profissional += f' - CRP {config.crp}'
+    
+    yield Paragraph(f'Prontuário - {_texto_pdf(paciente.nome)}', estilos['titulo'])
+    yield Paragraph(f'Profissional: {_texto_pdf(profissional)} | Emitido em {date.today():%d/%m/%Y}', estilos['subtitulo'])
+    
+    dados = []
+    if paciente.data_nascimento:
+        dados.append(f'Nascimento: {paciente.data_nascimento:%d/%m/%Y}')
+    if paciente.telefone:
+        dados.append(f'Telefone: {_texto_pdf(paciente.telefone)}')
+    if paciente.email:
+        dados.append(f'Email: {_texto_pdf(paciente.email)}')
+    if paciente.data_cadastro:
+        dados.append(f'Cadastro: {paciente.data_cadastro:%d/%m/%Y}')
+    if dados:
+        yield Paragraph(' | '.join(dados), estilos['texto'])
+    yield Spacer(1, 0.4 * cm)
+    
+    # Observações privadas ficam fora do documento impresso
+    evolucoes = db.session.query(
+        Evolucao.data_evolucao,
+        Evolucao.titulo,
+        Evolucao.tipo,
+        Evolucao.descricao,
+        Evolucao.medicamentos
+    ).filter(Evolucao.paciente_id == paciente.id).order_by(
+        Evolucao.data_evolucao
+    ).execution_options(yield_per=200)
+    
+    # Anos arquivados vêm antes, já que são todos anteriores aos ativos
+    if existe_tabela(db.session.connection(), 'evolucoes_arquivo'):
+        arquivo = EVOLUCOES_ARQUIVO.c
+        evolucoes = itertools.chain(db.session.execute(db.select(
+            arquivo.data_evolucao, arquivo.titulo, arquivo.tipo, arquivo.descricao, arquivo.medicamentos
+        ).where(arquivo.paciente_id == paciente.id).order_by(
+            arquivo.data_evolucao
+        ).execution_options(yield_per=200)), evolucoes)
+    
+    vazio = True
+    for evolucao in evolucoes:
+        vazio = False
+        yield Paragraph(_texto_pdf(evolucao.titulo), estilos['secao'])
+        yield Paragraph(f'{evolucao.data_evolucao:%d/%m/%Y %H:%M} | {_texto_pdf((evolucao.tipo or "").title())}', estilos['meta'])
+        yield Paragraph(_texto_pdf(evolucao.descricao), estilos['texto'])
+        if evolucao.medicamentos:
+            yield Paragraph(f'<b>Medicamentos:</b> {_texto_pdf(evolucao.medicamentos)}', estilos['texto'])
+    
+    if vazio:
+        yield Paragraph('Nenhuma evolução registrada.', estilos['texto'])
+
+def conteudo_pdf_relatorio_financeiro(usuario, data_inicio, data_fim):
+    estilos = ESTILOS_PDF
+    yield Paragraph('Relatório Financeiro', estilos['titulo'])
+    yield Paragraph(
+        f'{_texto_pdf(usuario.nome)} | Período: {data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y} | '
+        f'Emitido em {date.today():%d/%m/%Y}', estilos['subtitulo']
+    )
+    
+    resumo = resumo_sessoes_por_status(usuario.id, data_inicio, data_fim)
+    linhas_resumo = [
+        [status.title(), str(item['quantidade']), f'R$ {item["total"]:,.2f}']
+        for status, item in sorted(resumo.items())
+    ]
+    linhas_resumo.append([
+        'Total',
+        str(sum(item['quantidade'] for item in resumo.values())),
+        f'R$ {sum(item["total"] for item in resumo.values()):,.2f}'
+    ])
+    yield from tabelas_pdf(['Status', 'Sessões', 'Valor'], linhas_resumo, [6 * cm, 3 * cm, 4 * cm])
+    yield Spacer(1, 0.6 * cm)
+    
+    sessoes = db.session.query(
+        Sessao.data_sessao,
+        Paciente.nome,
+        Sessao.status,
+        Sessao.valor
+    ).join(Paciente, Paciente.id == Sessao.paciente_id).filter(
+        Sessao.psicologo_id == usuario.id,
+        Sessao.data_sessao >= datetime.combine(data_inicio, time.min),
+        Sessao.data_sessao < datetime.combine(data_fim + timedelta(days=1), time.min)
+    ).order_by(Sessao.data_sessao).execution_options(yield_per=1000)
+    
+    yield Paragraph('Sessões', estilos['secao'])
+    yield from tabelas_pdf(
+        ['Data', 'Paciente', 'Status', 'Valor'],
+        ([
+            f'{sessao.data_sessao:%d/%m/%Y %H:%M}',
+            Paragraph(_texto_pdf(sessao.nome), estilos['celula']),
+            (sessao.status or '').title(),
+            f'R$ {sessao.valor:,.2f}' if sessao.valor is not None else '-'
+        ] for sessao in sessoes),
+        [3.5 * cm, 7 * cm, 3 * cm, 3.5 * cm]
+    )
+
+def gerar_pdf_prontuario(usuario, paciente):
+    return pdf_em_cache(usuario, f'prontuario|{paciente.id}', lambda: montar_pdf(
+        f'Prontuário - {paciente.nome}', conteudo_pdf_prontuario(usuario, paciente)
+    ))
+
+def gerar_pdf_relatorio_financeiro(usuario, data_inicio, data_fim):
+    return pdf_em_cache(usuario, f'relatorio_financeiro|{data_inicio}|{data_fim}', lambda: montar_pdf(
+        'Relatório Financeiro', conteudo_pdf_relatorio_financeiro(usuario, data_inicio, data_fim)
+    ))
+
+@tipo_tarefa('prontuario_pdf')
+def tarefa_prontuario_pdf(usuario, parametros):
+    paciente = Paciente.query.filter_by(id=int(parametros['paciente_id']), psicologo_id=usuario.id).one()
+    return f'prontuario_{paciente.id}.pdf', 'application/pdf', gerar_pdf_prontuario(usuario, paciente)
+
+@tipo_tarefa('relatorio_financeiro_pdf')
+def tarefa_relatorio_financeiro_pdf(usuario, parametros):
+    data_inicio = datetime.strptime(parametros['data_inicio'], '%Y-%m-%d').date()
+    data_fim = datetime.strptime(parametros['data_fim'], '%Y-%m-%d').date()
+    conteudo = gerar_pdf_relatorio_financeiro(usuario, data_inicio, data_fim)
+    return f'relatorio_financeiro_{data_inicio}_{data_fim}.pdf', 'application/pdf', conteudo
+
+@app.route('/prontuario/<int:paciente_id>/pdf')
+@login_required
+@resposta_condicional
+@leitura_replica
+def prontuario_pdf(paciente_id):
+    try:
+        paciente = Paciente.query.filter_by(id=paciente_id, psicologo_id=current_user.id).first_or_404()
+        return resposta_pdf(gerar_pdf_prontuario(current_user, paciente), f'prontuario_{paciente.id}.pdf')
+    except Exception as e:
+        print(f"❌ Erro ao gerar PDF do prontuário: {e}")
+        traceback.print_exc()
+        flash('Erro ao gerar PDF do prontuário', 'error')
+        return redirect(url_for('pacientes'))
+
+@app.route('/relatorios/financeiro/pdf')
+@login_required
+@resposta_condicional
+@leitura_replica
+def relatorio_financeiro_pdf():
+    try:
+        hoje = date.today()
+        data_inicio = datetime.strptime(request.args.get('data_inicio') or hoje.replace(day=1).isoformat(), '%Y-%m-%d').date()
+        data_fim = datetime.strptime(request.args.get('data_fim') or hoje.isoformat(), '%Y-%m-%d').date()
+        
+        if (data_fim - data_inicio).days > RELATORIO_DIAS_SINCRONO:
+            flash('Para períodos acima de um ano, gere o PDF em segundo plano', 'info')
+            return redirect(url_for('relatorio_financeiro', data_inicio=data_inicio, data_fim=data_fim))
+        
+        conteudo = gerar_pdf_relatorio_financeiro(current_user, data_inicio, data_fim)
+        return resposta_pdf(conteudo, f'relatorio_financeiro_{data_inicio}_{data_fim}.pdf')
+    except Exception as e:
+        print(f"❌ Erro ao gerar PDF do relatório financeiro: {e}")
+        traceback.print_exc()
+        flash('Erro ao gerar PDF do relatório financeiro', 'error')
+        return redirect(url_for('relatorio_financeiro'))
+
+# ========== PARTICIONAMENTO E ARQUIVO ==========
+# Opcional e só no PostgreSQL: `flask particionar` transforma sessoes e
+# evolucoes em tabelas particionadas por ano (RANGE em data_sessao /
+# data_evolucao), com uma partição padrão para as datas fora dos anos
+# criados. Os modelos não mudam; as consultas com faixa de data (agenda,
+# dashboard, pontas dos relatórios, ICS) leem só as partições dos anos
+# envolvidos. Rode o comando de novo no fim do ano para criar o seguinte.
+#
+# A chave primária das tabelas particionadas passa a ser (id, data), então
+# a FK pagamentos.sessao_id -> sessoes.id deixa de existir no banco (o
+# PostgreSQL exige a coluna de partição em chaves referenciadas).
+#
+# `flask arquivar ANO` tira das tabelas ativas os anos fechados até ANO,
+# inclusive: com particionamento as partições são desanexadas e anexadas a
+# sessoes_arquivo/evolucoes_arquivo sem copiar linhas; sem particionamento
+# (SQLite, PostgreSQL simples) as linhas são copiadas e apagadas em lotes.
+# Os pagamentos das sessões arquivadas vão para pagamentos_arquivo.
+# receita_mensal não é tocada, e os relatórios dos meses arquivados
+# continuam com os totais.
+#
+# O prontuário (página, anotações e PDF) também lê evolucoes_arquivo. Fora
+# dele o histórico arquivado sai da aplicação: listas, agenda e /api/v1 não
+# mostram essas linhas, e /api/sync as envia como exclusões. Anos com
+# sessões ainda não pagas não são arquivados, para que os recebíveis
+# continuem completos.
+
+TABELAS_PARTICIONAVEIS = {'sessoes': 'data_sessao', 'evolucoes': 'data_evolucao'}
+
+# Só as colunas que o prontuário lê; fora de db.metadata para que create_all
+# e o autogenerate não criem a tabela.
+EVOLUCOES_ARQUIVO = db.Table(
+    'evolucoes_arquivo', db.MetaData(),
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('paciente_id', db.Integer),
+    db.Column('data_evolucao', db.DateTime),
+    db.Column('titulo', db.String(200)),
+    db.Column('descricao', db.Text),
+    db.Column('tipo', db.String(50)),
+    db.Column('humor', db.String(20)),
+    db.Column('medicamentos', db.Text),
+    db.Column('observacoes_privadas', db.Text),
+)
+LOTE_ARQUIVO = 5000
+
+def tabela_particionada(conexao, tabela):
+    if conexao.dialect.name != 'postgresql':
+        return False
+    return conexao.execute(
+        db.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:tabela)"),
+        {'tabela': tabela}
+    ).first() is not None
+
+def criar_particao_ano(conexao, tabela, coluna, ano):
+    """Cria a partição de um ano, trazendo da partição padrão as linhas que já caíram nela."""
+    nome = f'{tabela}_{ano}'
+    if conexao.execute(db.text('SELECT to_regclass(:nome)'), {'nome': nome}).scalar():
+        return False
+    
+    faixa = {'inicio': date(ano, 1, 1), 'fim': date(ano + 1, 1, 1)}
+    conexao.execute(db.text(f'CREATE TABLE {nome} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conexao.execute(db.text(
+        f'WITH movidas AS (DELETE FROM {tabela}_padrao WHERE {coluna} >= :inicio AND {coluna} < :fim RETURNING *) '
+        f'INSERT INTO {nome} SELECT * FROM movidas'
+    ), faixa)
+    conexao.execute(db.text(
+        f"ALTER TABLE {tabela} ATTACH PARTITION {nome} FOR VALUES FROM ('{faixa['inicio']}') TO ('{faixa['fim']}')"
+    ))
+    return True
+
+def particionar_tabela(conexao, tabela, coluna):
+    """Converte a tabela em particionada por ano, ou só cria as partições que faltam.
+    
+    A conversão copia as linhas para a nova tabela dentro de uma transação e
+    trava a tabela durante a cópia: rode em janela de manutenção.
+    """
+    ano_atual = date.today().year
+    if tabela_particionada(conexao, tabela):
+        return [ano for ano in (ano_atual, ano_atual + 1) if criar_particao_ano(conexao, tabela, coluna, ano)]
+    
+    if conexao.execute(db.text(f'SELECT 1 FROM {tabela} WHERE {coluna} IS NULL LIMIT 1')).first():
+        raise click.ClickException(f'{tabela}.{coluna} tem valores nulos; preencha antes de particionar')
+    
+    anos = set(conexao.execute(db.text(
+        f'SELECT DISTINCT CAST(EXTRACT(YEAR FROM {coluna}) AS INTEGER) FROM {tabela}'
+    )).scalars()) | {ano_atual, ano_atual + 1}
+    sequencia = conexao.execute(db.text("SELECT pg_get_serial_sequence(:tabela, 'id')"), {'tabela': tabela}).scalar()
+    
+    referencias = conexao.execute(db.text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:tabela)"
+    ), {'tabela': tabela}).all()
+    for origem, restricao in referencias:
+        conexao.execute(db.text(f'ALTER TABLE {origem} DROP CONSTRAINT "{restricao}"'))
+    
+    conexao.execute(db.text(f'ALTER TABLE {tabela} RENAME TO {tabela}_antiga'))
+    conexao.execute(db.text(
+        f'CREATE TABLE {tabela} (LIKE {tabela}_antiga INCLUDING DEFAULTS) PARTITION BY RANGE ({coluna})'
+    ))
+    conexao.execute(db.text(f'CREATE TABLE {tabela}_padrao PARTITION OF {tabela} DEFAULT'))
+    for ano in sorted(anos):
+        criar_particao_ano(conexao, tabela, coluna, ano)
+    
+    conexao.execute(db.text(f'INSERT INTO {tabela} SELECT * FROM {tabela}_antiga'))
+    if sequencia:
+        conexao.execute(db.text(f'ALTER SEQUENCE {sequencia} OWNED BY {tabela}.id'))
+    conexao.execute(db.text(f'DROP TABLE {tabela}_antiga'))
+    
+    # Chave primária, índices e FKs de saída são recriados na tabela nova a
+    # partir dos modelos; o PostgreSQL os propaga para cada partição.
+    conexao.execute(db.text(f'ALTER TABLE {tabela} ADD PRIMARY KEY (id, {coluna})'))
+    modelo = db.metadata.tables[tabela]
+    for indice in modelo.indexes:
+        indice.create(conexao)
+    for restricao in modelo.foreign_key_constraints:
+        conexao.execute(AddConstraint(restricao))
+    return sorted(anos)
+
+def existe_tabela(conexao, nome):
+    """Consulta barata de existência, sem refletir o esquema inteiro."""
+    if conexao.dialect.name == 'postgresql':
+        return conexao.execute(db.text('SELECT to_regclass(:nome)'), {'nome': nome}).scalar() is not None
+    return conexao.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"), {'nome': nome}
+    ).first() is not None
+
+def garantir_tabela_arquivo(conexao, tabela, coluna=None):
+    """Cria <tabela>_arquivo com as mesmas colunas, particionada se `coluna` for informada."""
+    arquivo = f'{tabela}_arquivo'
+    if not existe_tabela(conexao, arquivo):
+        if coluna:
+            conexao.execute(db.text(f'CREATE TABLE {arquivo} (LIKE {tabela}) PARTITION BY RANGE ({coluna})'))
+        else:
+            conexao.execute(db.text(f'CREATE TABLE {arquivo} AS SELECT * FROM {tabela} WHERE 1 = 0'))
+    return arquivo
+
+def colunas_arquivo(conexao, tabela, arquivo):
+    # Colunas adicionadas depois que o arquivo foi criado ficam de fora dele
+    existentes = {coluna['name'] for coluna in sa_inspect(conexao).get_columns(arquivo)}
+    return ', '.join(coluna['name'] for coluna in sa_inspect(conexao).get_columns(tabela) if coluna['name'] in existentes)
+
+def registrar_exclusoes_arquivadas(conexao, tabela, condicao, origem=None):
+    """Grava em exclusoes as linhas que vão para o arquivo, para os clientes de /api/sync.
+
+    O psicólogo vem de pacientes: evolucoes arquivadas antes da 0008 não têm
+    psicologo_id.
+    """
+    origem = origem or tabela
+    conexao.execute(db.text(
+        f"INSERT INTO exclusoes (psicologo_id, tabela, registro_id, excluido_em) "
+        f"SELECT pacientes.psicologo_id, '{tabela}', {tabela}.id, :agora "
+        f"FROM {origem} AS {tabela} JOIN pacientes ON pacientes.id = {tabela}.paciente_id WHERE {condicao}"
+    ), {'agora': datetime.utcnow()})
+
+def mover_linhas(conexao, tabela, condicao, parametros=None):
+    """Copia para <tabela>_arquivo e apaga as linhas que atendem `condicao`, em lotes por id."""
+    arquivo = garantir_tabela_arquivo(conexao, tabela)
+    colunas = colunas_arquivo(conexao, tabela, arquivo)
+    selecionar = db.text(f'SELECT id FROM {tabela} WHERE {condicao} ORDER BY id LIMIT {LOTE_ARQUIVO}')
+    copiar = db.text(
+        f'INSERT INTO {arquivo} ({colunas}) SELECT {colunas} FROM {tabela} WHERE id IN :ids'
+    ).bindparams(db.bindparam('ids', expanding=True))
+    apagar = db.text(f'DELETE FROM {tabela} WHERE id IN :ids').bindparams(db.bindparam('ids', expanding=True))
+    
+    movidas = 0
+    while True:
+        ids = conexao.execute(selecionar, parametros or {}).scalars().all()
+        if not ids:
+            return movidas
+        if tabela == 'sessoes':
+            mover_linhas(conexao, 'pagamentos', f'sessao_id IN ({", ".join(map(str, ids))})')
+        if tabela in TABELAS_PARTICIONAVEIS:
+            registrar_exclusoes_arquivadas(conexao, tabela, f'{tabela}.id IN ({", ".join(map(str, ids))})')
+        conexao.execute(copiar, {'ids': ids})
+        conexao.execute(apagar, {'ids': ids})
+        conexao.commit()
+        movidas += len(ids)
+
+def sessoes_em_aberto_ate(conexao, ate_ano):
+    """Quantas sessões realizadas até `ate_ano` ainda têm saldo a receber."""
+    pagos = db.select(
+        Pagamento.sessao_id, func.sum(Pagamento.valor).label('pago')
+    ).group_by(Pagamento.sessao_id).subquery()
+    return conexao.execute(db.select(func.count()).select_from(Sessao).outerjoin(
+        pagos, pagos.c.sessao_id == Sessao.id
+    ).where(
+        Sessao.data_sessao < datetime(ate_ano + 1, 1, 1),
+        Sessao.status == 'realizada',
+        Sessao.valor > 0,
+        Sessao.valor - func.coalesce(pagos.c.pago, 0) > 0
+    )).scalar()
+
+def arquivar_tabela(conexao, tabela, coluna, ate_ano):
+    """Move os anos até `ate_ano` (inclusive) para <tabela>_arquivo. Retorna o que foi movido."""
+    if not tabela_particionada(conexao, tabela):
+        limite = datetime(ate_ano + 1, 1, 1)
+        return f'{mover_linhas(conexao, tabela, f"{coluna} < :limite", {"limite": limite})} linhas'
+    
+    arquivo = garantir_tabela_arquivo(conexao, tabela, coluna)
+    particoes = conexao.execute(db.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabela) AND c.relname ~ :padrao"
+    ), {'tabela': tabela, 'padrao': f'^{tabela}_[0-9]{{4}}$'}).scalars().all()
+    
+    movidas = []
+    for particao in sorted(particoes):
+        ano = int(particao[-4:])
+        if ano > ate_ano:
+            continue
+        if tabela == 'sessoes':
+            mover_linhas(conexao, 'pagamentos', f'sessao_id IN (SELECT id FROM {particao})')
+        registrar_exclusoes_arquivadas(conexao, tabela, '1 = 1', origem=particao)
+        conexao.execute(db.text(f'ALTER TABLE {tabela} DETACH PARTITION {particao}'))
+        conexao.execute(db.text(
+            f"ALTER TABLE {arquivo} ATTACH PARTITION {particao} "
+            f"FOR VALUES FROM ('{date(ano, 1, 1)}') TO ('{date(ano + 1, 1, 1)}')"
+        ))
+        conexao.commit()
+        movidas.append(particao)
+    return ', '.join(movidas) or 'nenhuma partição'
+
+# O limite só muda quando `flask arquivar` roda (uma vez por ano, em outro
+# processo), então cada processo guarda o valor por alguns minutos.
+CACHE_INICIO_DADOS_SEGUNDOS = 300
+_inicio_dados_ativos = {}
+
+def inicio_dados_ativos(tabela, usar_cache=True):
+    """Primeiro dia ainda não arquivado da tabela, ou None se nada foi arquivado."""
+    em_cache = _inicio_dados_ativos.get(tabela)
+    if usar_cache and em_cache and relogio.monotonic() - em_cache[1] < CACHE_INICIO_DADOS_SEGUNDOS:
+        return em_cache[0]
+    
+    arquivo = f'{tabela}_arquivo'
+    conexao = db.session.connection()
+    inicio = None
+    if existe_tabela(conexao, arquivo):
+        ultima = conexao.execute(db.text(
+            f'SELECT max({TABELAS_PARTICIONAVEIS[tabela]}) FROM {arquivo}'
+        )).scalar()
+        if isinstance(ultima, str):
+            ultima = datetime.fromisoformat(ultima)
+        if ultima is not None:
+            inicio = date(ultima.year + 1, 1, 1)
+    _inicio_dados_ativos[tabela] = (inicio, relogio.monotonic())
+    return inicio
+
+# ========== SAÚDE E VERIFICAÇÃO DE INICIALIZAÇÃO ==========
+
+@app.route('/health')
+def health():
+    """Usado pelo healthcheck do deploy: responde 503 se o banco não responde."""
+    try:
+        db.session.execute(db.text('SELECT 1'))
+        return jsonify({'status': 'ok', 'versao': VERSAO_APP})
+    except Exception as e:
+        print(f"❌ Erro no healthcheck: {e}")
+        db.session.rollback()
+        return jsonify({'status': 'erro'}), 503
+
+def verificar_inicializacao():
+    """Confere configuração, templates e banco antes de aceitar requisições.
+    
+    Chamada pelo gunicorn.conf.py no processo mestre: com preload_app os
+    templates compilados aqui já vão prontos para os workers. Encerra o
+    processo se algo impede a aplicação de funcionar.
+    """
+    problemas = []
+    if not app.config['SQLALCHEMY_DATABASE_URI']:
+        problemas.append('DATABASE_URL não definida')
+    if PERFIL == 'producao' and app.config['SECRET_KEY'] == SECRET_KEY_PADRAO:
+        problemas.append('SECRET_KEY não definida (a chave padrão é pública)')
+    
+    for nome in app.jinja_env.list_templates(extensions=['html']):
+        try:
+            app.jinja_env.get_template(nome)
+        except Exception as e:
+            problemas.append(f'Template {nome} com erro: {e}')
+    
+    if app.config['SQLALCHEMY_DATABASE_URI']:
+        with app.app_context():
+            try:
+                with db.engine.connect() as conexao:
+                    conexao.execute(db.text('SELECT 1'))
+            except Exception as e:
+                problemas.append(f'Banco de dados inacessível: {e}')
+            finally:
+                # Conexões abertas no mestre não podem ser herdadas pelos workers
+                for engine in db.engines.values():
+                    engine.dispose()
+    
+    if not carregar_manifesto_assets():
+        print("⚠️ static/dist/manifest.json ausente: rode `flask assets-build` para servir os assets minificados")
+    
+    if problemas:
+        for problema in problemas:
+            print(f"❌ {problema}")
+        raise SystemExit(1)
+    print(f"✅ Verificação de inicialização concluída (perfil {PERFIL})")
+
+@app.cli.command('verificar')
+def verificar():
+    """Executa a verificação de inicialização feita pelo gunicorn."""
+    verificar_inicializacao()
+
+# ========== ROTA DE DEBUG ==========
+
+@app.route('/debug/rotas')
+@login_required
+def debug_rotas():
+    """Rota para listar todas as rotas disponíveis"""
+    rotas = []
+    for rule in app.url_map.iter_rules():
+        rotas.append({
+            'endpoint': rule.endpoint,
+            'methods': ','.join(rule.methods),
+            'path': str(rule)
+        })
+    return jsonify(rotas)
+
+# ========== INICIALIZAÇÃO ==========
+
+def revisao_alvo_implantacao():
+    """Última migração que pode rodar antes do código novo entrar no ar.
+
+    Migrações com `apos_implantacao = True` (ex.: NOT NULL numa coluna que a
+    versão anterior não preenche) ficam para a implantação seguinte quando
+    chegam junto de outras pendentes. Um banco novo recebe todas.
+    """
+    with db.engine.connect() as conexao:
+        atual = MigrationContext.configure(conexao).get_current_revision()
+    if atual is None:
+        return 'head'
+    scripts = ScriptDirectory.from_config(migrate.get_config())
+    alvo = atual
+    for posicao, revisao in enumerate(reversed(list(scripts.iterate_revisions('head', atual)))):
+        if posicao > 0 and getattr(revisao.module, 'apos_implantacao', False):
+            print(f"⏳ Migração {revisao.revision} fica para a próxima implantação")
+            break
+        alvo = revisao.revision
+    return alvo
+
+@app.cli.command('db-init')
+@click.option('--todas', is_flag=True, help='Aplica também as migrações marcadas para depois da implantação.')
+def db_init(todas):
+    """Aplica as migrações pendentes (cria o schema em bancos novos)."""
+    try:
+        migrar_banco(revision='head' if todas else revisao_alvo_implantacao())
+        print("=" * 60)
+        print("✅ Migrações aplicadas com sucesso!")
+        print("=" * 60)
+    except Exception as e:
+        print("=" * 60)
+        print(f"❌ Erro ao aplicar migrações: {e}")
+        traceback.print_exc()
+        print("=" * 60)
+        raise SystemExit(1)
+
+@app.cli.command('receita-rebuild')
+@click.option('--psicologo', type=int, default=None, help='Reconstrói apenas um psicólogo.')
+def receita_rebuild(psicologo):
+    """Recalcula a tabela receita_mensal a partir das sessões."""
+    linhas = reconstruir_receita_mensal(psicologo)
+    print(f"✅ receita_mensal reconstruída ({linhas} linhas)")
+
+@app.cli.command('particionar')
+def particionar():
+    """Particiona sessoes e evolucoes por ano (PostgreSQL) e cria as partições que faltam."""
+    with db.engine.begin() as conexao:
+        if conexao.dialect.name != 'postgresql':
+            raise click.ClickException('Particionamento disponível só no PostgreSQL')
+        for tabela, coluna in TABELAS_PARTICIONAVEIS.items():
+            anos = particionar_tabela(conexao, tabela, coluna)
+            print(f"✅ {tabela}: partições criadas {anos or 'nenhuma (já existiam)'}")
+
+@app.cli.command('arquivar')
+@click.argument('ate_ano', type=int)
+@click.option('--tabela', 'tabelas', multiple=True, type=click.Choice(list(TABELAS_PARTICIONAVEIS)),
+              help='Arquiva só esta tabela (pode repetir). Padrão: todas.')
+def arquivar(ate_ano, tabelas):
+    """Move os anos fechados até ATE_ANO (inclusive) para as tabelas de arquivo."""
+    if ate_ano >= date.today().year:
+        raise click.ClickException('Só anos já encerrados podem ser arquivados')
+    
+    with db.engine.connect() as conexao:
+        tabelas = tabelas or tuple(TABELAS_PARTICIONAVEIS)
+        em_aberto = sessoes_em_aberto_ate(conexao, ate_ano) if 'sessoes' in tabelas else 0
+        if em_aberto:
+            raise click.ClickException(
+                f'{em_aberto} sessões realizadas até {ate_ano} ainda têm saldo a receber; '
+                'registre os pagamentos antes de arquivar'
+            )
+        for tabela in tabelas:
+            movido = arquivar_tabela(conexao, tabela, TABELAS_PARTICIONAVEIS[tabela], ate_ano)
+            print(f"✅ {tabela}: arquivado {movido}")
+        _inicio_dados_ativos.clear()
+        
+        # As linhas saíram por SQL direto: invalida os ETags e PDFs em cache
+        conexao.execute(db.update(Usuario).values(
+            versao_dados=Usuario.versao_dados + 1, dados_atualizados_em=datetime.utcnow()
+        ))
+        conexao.commit()
+
+@app.cli.command('assets-build')
+def assets_build():
+    """Copia os CSS/JS para static/dist com hash no nome e baixa as bibliotecas de terceiros."""
+    destino = os.path.join(app.static_folder, 'dist')
+    manifesto = {}
+    
+    # Os arquivos são copiados sem alteração: o Flask-Compress já reduz o
+    # tráfego, e minificar com expressões regulares corrompia template
+    # literals e strings com // ou /* dentro.
+    for pasta, extensao in (('css', '.css'), ('js', '.js')):
+        os.makedirs(os.path.join(destino, pasta), exist_ok=True)
+        for nome in sorted(os.listdir(os.path.join(app.static_folder, pasta))):
+            if not nome.endswith(extensao):
+                continue
+            with open(os.path.join(app.static_folder, pasta, nome), 'rb') as arquivo:
+                conteudo = arquivo.read()
+            hash_conteudo = hashlib.sha256(conteudo).hexdigest()[:12]
+            nome_final = f'{pasta}/{nome[:-len(extensao)]}.{hash_conteudo}{extensao}'
+            with open(os.path.join(destino, nome_final), 'wb') as arquivo:
+                arquivo.write(conteudo)
+            manifesto[f'{pasta}/{nome}'] = f'dist/{nome_final}'
+    
+    bibliotecas_incompletas = set()
+    for nome, url in ASSETS_VENDOR.items():
+        caminho = os.path.join(app.static_folder, nome)
+        if os.path.exists(caminho):
+            continue
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            urllib.request.urlretrieve(url, caminho)
+        except Exception as e:
+            print(f"⚠️ Não foi possível baixar {url}: {e} (a página usará a CDN)")
+            bibliotecas_incompletas.add(os.path.join(app.static_folder, *nome.split('/')[:2]))
+    
+    # Uma biblioteca pela metade (ex.: CSS sem as fontes) quebraria a página;
+    # sem a pasta, asset_url() volta a apontar para a CDN.
+    for pasta in bibliotecas_incompletas:
+        shutil.rmtree(pasta, ignore_errors=True)
+    
+    with open(os.path.join(destino, 'manifest.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    print(f"✅ {len(manifesto)} arquivos gerados em static/dist")
+
+@app.cli.command('usuario-admin')
+@click.argument('email')
+@click.option('--remover', is_flag=True, help='Volta o usuário para psicólogo.')
+def usuario_admin(email, remover):
+    """Define o usuário como administrador da clínica."""
+    usuario = Usuario.query.filter_by(email=email).first()
+    if not usuario:
+        print(f"❌ Usuário não encontrado: {email}")
+        return
+    usuario.tipo = 'psicologo' if remover else 'admin'
+    db.session.commit()
+    print(f"✅ {usuario.email} agora é {usuario.tipo}")
+
+@app.cli.command('worker')
+@click.option('--intervalo', default=2.0, help='Segundos de espera quando a fila está vazia.')
+@click.option('--uma-vez', is_flag=True, help='Executa as tarefas pendentes e sai.')
+def worker(intervalo, uma_vez):
+    """Executa as tarefas em segundo plano (relatórios e exportações)."""
+    print("✅ Worker de tarefas iniciado")
+    recuperar_tarefas_abandonadas()
+    ultima_manutencao = relogio.monotonic()
+    
+    while True:
+        try:
+            tarefa_id = reservar_proxima_tarefa()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Erro ao buscar tarefas: {e}")
+            tarefa_id = None
+        
+        if tarefa_id is not None:
+            print(f"⚙️ Executando tarefa {tarefa_id}")
+            try:
+                executar_tarefa(tarefa_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erro ao executar a tarefa {tarefa_id}: {e}")
+                traceback.print_exc()
+            continue
+        
+        if uma_vez:
+            break
+        
+        if relogio.monotonic() - ultima_manutencao > 600:
+            try:
+                recuperar_tarefas_abandonadas()
+                limpar_tarefas_antigas()
+                limpar_exclusoes_antigas()
+                limpar_cache_pdf()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erro na manutenção do worker: {e}")
+                traceback.print_exc()
+            ultima_manutencao = relogio.monotonic()
+        relogio.sleep(intervalo)
+
+@app.cli.command('rotas')
+def listar_rotas():
+    """Lista as rotas registradas na aplicação."""
+    print("🔗 ROTAS REGISTRADAS:")
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: str(r)):
+        print(f"   - {rule}")
+
+if __name__ == '__main__':
+    app.run(debug=True)
+
@@ -0,0 +1,52 @@
+"""Configuração do gunicorn para produção (Procfile / railway.json).
+
+Workers gthread: cada processo atende várias requisições ao mesmo tempo em
+threads, o que cabe bem numa aplicação que passa a maior parte do tempo
+esperando o banco. A aplicação é carregada uma vez no processo mestre
+(preload_app) e os workers compartilham a memória dela.
+Todos os valores podem ser ajustados por variáveis de ambiente.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('APP_PERFIL', 'producao')
+
+
+def _cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', _cpus() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+
+# Recicla os workers de tempos em tempos (vazamentos de memória); o jitter
+# evita que todos reiniciem ao mesmo tempo
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Relatórios pesados rodam no `flask worker`; requisição web acima disso travou
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    from app import verificar_inicializacao
+    verificar_inicializacao()
+
+
+def post_fork(server, worker):
+    # Cada worker abre o seu próprio pool de conexões
+    from app import app, db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,179 @@
+"""Operações auxiliares para migrações que rodam com o sistema em produção.
+
+No PostgreSQL os índices são criados com CREATE INDEX CONCURRENTLY e os
+backfills são feitos em lotes com commit por lote, para que as tabelas
+grandes (sessoes, evolucoes) continuem aceitando escritas durante a migração.
+Nos demais bancos (SQLite em desenvolvimento) as operações equivalentes
+simples são usadas.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+def _postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _particoes(tabela):
+    """Partições da tabela, ou None se ela não é particionada (`flask particionar`)."""
+    bind = op.get_bind()
+    if not bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:tabela)"
+    ), {'tabela': tabela}).first():
+        return None
+    return bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabela)"
+    ), {'tabela': tabela}).scalars().all()
+
+
+def agora_utc():
+    """Expressão SQL do instante atual em UTC, como o datetime.utcnow() da aplicação.
+
+    No PostgreSQL, CURRENT_TIMESTAMP numa coluna sem fuso é convertido para
+    o fuso da sessão; no SQLite ele já é UTC.
+    """
+    return "(now() AT TIME ZONE 'utc')" if _postgres() else 'CURRENT_TIMESTAMP'
+
+
+def criar_tabela_se_ausente(nome, *colunas, **kw):
+    if not sa.inspect(op.get_bind()).has_table(nome):
+        op.create_table(nome, *colunas, **kw)
+
+
+def adicionar_colunas_ausentes(tabela, *colunas):
+    existentes = {c['name'] for c in sa.inspect(op.get_bind()).get_columns(tabela)}
+    for coluna in colunas:
+        if coluna.name not in existentes:
+            op.add_column(tabela, coluna)
+
+
+def criar_indice_concorrente(nome, tabela, colunas, **kw):
+    """Cria um índice sem bloquear escritas na tabela.
+
+    CREATE INDEX CONCURRENTLY não pode rodar dentro de transação, então a
+    criação acontece em um bloco autocommit. Se uma tentativa anterior
+    falhou no meio, o PostgreSQL deixa o índice marcado como inválido; nesse
+    caso ele é removido e criado de novo.
+    """
+    if not _postgres():
+        op.create_index(nome, tabela, colunas, if_not_exists=True, **kw)
+        return
+
+    particoes = _particoes(tabela)
+    if particoes is not None:
+        _criar_indice_particionado(nome, tabela, colunas, particoes, kw.get('unique'))
+        return
+
+    with op.get_context().autocommit_block():
+        invalido = op.get_bind().execute(sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :nome AND NOT i.indisvalid"
+        ), {'nome': nome}).first()
+        if invalido:
+            op.drop_index(nome, table_name=tabela, postgresql_concurrently=True)
+        op.create_index(nome, tabela, colunas, if_not_exists=True,
+                        postgresql_concurrently=True, **kw)
+
+
+def _criar_indice_particionado(nome, tabela, colunas, particoes, unico=False):
+    # CONCURRENTLY não existe para tabelas particionadas: o índice do pai é
+    # criado com ON ONLY (sem ler dados), o de cada partição sem travar
+    # escritas, e cada um é anexado ao do pai, que então fica válido.
+    bind = op.get_bind()
+    tipo = 'UNIQUE INDEX' if unico else 'INDEX'
+    lista = ', '.join(colunas)
+    bind.execute(sa.text(f'CREATE {tipo} IF NOT EXISTS {nome} ON ONLY {tabela} ({lista})'))
+    with op.get_context().autocommit_block():
+        for particao in particoes:
+            indice = f'{nome}_{particao.rsplit("_", 1)[-1]}'
+            bind.execute(sa.text(f'CREATE {tipo} CONCURRENTLY IF NOT EXISTS {indice} ON {particao} ({lista})'))
+            bind.execute(sa.text(f'ALTER INDEX {nome} ATTACH PARTITION {indice}'))
+
+
+def remover_indice_concorrente(nome, tabela):
+    if not _postgres() or _particoes(tabela) is not None:
+        op.drop_index(nome, table_name=tabela, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(nome, table_name=tabela, if_exists=True,
+                      postgresql_concurrently=True)
+
+
+def backfill_em_lotes(tabela, atribuicoes, condicao='1 = 1', tamanho_lote=5000):
+    """Executa um UPDATE em faixas de id, com commit a cada lote.
+
+    `atribuicoes` e `condicao` são trechos SQL, por exemplo
+    backfill_em_lotes('sessoes', 'atualizado_em = data_criacao',
+    'atualizado_em IS NULL'). Cada lote trava só as linhas da sua faixa,
+    então o sistema continua gravando normalmente durante o backfill.
+    """
+    bind = op.get_bind()
+    menor, maior = bind.execute(sa.text(f'SELECT min(id), max(id) FROM {tabela}')).one()
+    if menor is None:
+        return
+
+    comando = sa.text(
+        f'UPDATE {tabela} SET {atribuicoes} '
+        f'WHERE id >= :inicio AND id < :fim AND ({condicao})'
+    )
+    with op.get_context().autocommit_block():
+        for inicio in range(menor, maior + 1, tamanho_lote):
+            bind.execute(comando, {'inicio': inicio, 'fim': inicio + tamanho_lote})
+
+
+def adicionar_fk_sem_bloqueio(nome, tabela, coluna, referencia, coluna_referencia='id'):
+    """Cria a chave estrangeira sem travar escritas enquanto as linhas são conferidas.
+
+    No PostgreSQL a restrição entra como NOT VALID (só vale para linhas novas)
+    e o VALIDATE CONSTRAINT, que lê a tabela inteira mas deixa as escritas
+    seguirem, roda num passo autocommit separado. Numa tabela particionada
+    cada partição recebe e valida a sua; a do pai é criada depois e só
+    reaproveita as das partições.
+    """
+    if not _postgres():
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.create_foreign_key(nome, referencia, [coluna], [coluna_referencia])
+        return
+
+    bind = op.get_bind()
+    particoes = _particoes(tabela)
+    for alvo, restricao in ([(p, f'{nome}_{p.rsplit("_", 1)[-1]}') for p in particoes]
+                            if particoes is not None else [(tabela, nome)]):
+        bind.execute(sa.text(
+            f'ALTER TABLE {alvo} ADD CONSTRAINT {restricao} FOREIGN KEY ({coluna}) '
+            f'REFERENCES {referencia} ({coluna_referencia}) NOT VALID'
+        ))
+        with op.get_context().autocommit_block():
+            bind.execute(sa.text(f'ALTER TABLE {alvo} VALIDATE CONSTRAINT {restricao}'))
+    if particoes is not None:
+        op.create_foreign_key(nome, tabela, referencia, [coluna], [coluna_referencia])
+
+
+def definir_not_null_sem_bloqueio(tabela, coluna, tipo):
+    """Marca a coluna como NOT NULL sem varrer a tabela sob trava exclusiva.
+
+    No PostgreSQL um CHECK (coluna IS NOT NULL) é criado como NOT VALID e
+    validado num passo autocommit; o SET NOT NULL seguinte usa esse CHECK em
+    vez de ler a tabela, e o CHECK é removido em seguida. Numa tabela
+    particionada isso é feito em cada partição antes do pai.
+    """
+    if not _postgres():
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.alter_column(coluna, existing_type=tipo, nullable=False)
+        return
+
+    bind = op.get_bind()
+    particoes = _particoes(tabela)
+    for alvo in particoes if particoes is not None else [tabela]:
+        restricao = f'ck_{alvo}_{coluna}_not_null'
+        bind.execute(sa.text(
+            f'ALTER TABLE {alvo} ADD CONSTRAINT {restricao} CHECK ({coluna} IS NOT NULL) NOT VALID'
+        ))
+        with op.get_context().autocommit_block():
+            bind.execute(sa.text(f'ALTER TABLE {alvo} VALIDATE CONSTRAINT {restricao}'))
+        bind.execute(sa.text(f'ALTER TABLE {alvo} ALTER COLUMN {coluna} SET NOT NULL'))
+        bind.execute(sa.text(f'ALTER TABLE {alvo} DROP CONSTRAINT {restricao}'))
+    if particoes is not None:
+        bind.execute(sa.text(f'ALTER TABLE {tabela} ALTER COLUMN {coluna} SET NOT NULL'))
@@ -0,0 +1,117 @@
+"""schema inicial
+
+Cria as tabelas que o db.create_all() criava na inicialização. Bancos que já
+existiam antes das migrações têm as tabelas preservadas; só as colunas de
+prontuário em `evolucoes`, que o create_all() nunca adicionava, são criadas
+se estiverem faltando.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.operacoes import adicionar_colunas_ausentes, criar_tabela_se_ausente
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    criar_tabela_se_ausente(
+        'usuarios',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('senha_hash', sa.String(length=255), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('ativo', sa.Boolean(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+    )
+    criar_tabela_se_ausente(
+        'pacientes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('telefone', sa.String(length=20), nullable=True),
+        sa.Column('data_nascimento', sa.Date(), nullable=True),
+        sa.Column('endereco', sa.Text(), nullable=True),
+        sa.Column('observacoes', sa.Text(), nullable=True),
+        sa.Column('ativo', sa.Boolean(), nullable=True),
+        sa.Column('data_cadastro', sa.DateTime(), nullable=True),
+        sa.Column('psicologo_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['psicologo_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    criar_tabela_se_ausente(
+        'sessoes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('paciente_id', sa.Integer(), nullable=False),
+        sa.Column('psicologo_id', sa.Integer(), nullable=False),
+        sa.Column('data_sessao', sa.DateTime(), nullable=False),
+        sa.Column('duracao', sa.Integer(), nullable=True),
+        sa.Column('valor', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('observacoes', sa.Text(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id']),
+        sa.ForeignKeyConstraint(['psicologo_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    criar_tabela_se_ausente(
+        'evolucoes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('paciente_id', sa.Integer(), nullable=False),
+        sa.Column('data_evolucao', sa.DateTime(), nullable=True),
+        sa.Column('titulo', sa.String(length=200), nullable=False),
+        sa.Column('descricao', sa.Text(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=True),
+        sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    adicionar_colunas_ausentes(
+        'evolucoes',
+        sa.Column('humor', sa.String(length=20), nullable=True),
+        sa.Column('medicamentos', sa.Text(), nullable=True),
+        sa.Column('observacoes_privadas', sa.Text(), nullable=True),
+    )
+    criar_tabela_se_ausente(
+        'configuracoes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('nome_completo', sa.String(length=200), nullable=True),
+        sa.Column('crp', sa.String(length=20), nullable=True),
+        sa.Column('especialidade', sa.String(length=200), nullable=True),
+        sa.Column('telefone_profissional', sa.String(length=20), nullable=True),
+        sa.Column('email_profissional', sa.String(length=120), nullable=True),
+        sa.Column('endereco', sa.String(length=300), nullable=True),
+        sa.Column('cidade', sa.String(length=100), nullable=True),
+        sa.Column('estado', sa.String(length=2), nullable=True),
+        sa.Column('cep', sa.String(length=10), nullable=True),
+        sa.Column('duracao_sessao', sa.Integer(), nullable=True),
+        sa.Column('valor_sessao', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('horario_inicio', sa.Time(), nullable=True),
+        sa.Column('horario_fim', sa.Time(), nullable=True),
+        sa.Column('dias_atendimento', sa.String(length=50), nullable=True),
+        sa.Column('lembrete_paciente', sa.Boolean(), nullable=True),
+        sa.Column('antecedencia_lembrete', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('configuracoes')
+    op.drop_table('evolucoes')
+    op.drop_table('sessoes')
+    op.drop_table('pacientes')
+    op.drop_table('usuarios')
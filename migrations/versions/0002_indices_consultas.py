@@ -0,0 +1,32 @@
+"""índices das consultas por psicólogo e paciente
+
+Criados com CREATE INDEX CONCURRENTLY no PostgreSQL, sem bloquear escritas
+em `sessoes` durante o horário de atendimento.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from migrations.operacoes import criar_indice_concorrente, remover_indice_concorrente
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    criar_indice_concorrente('ix_sessoes_psicologo_data', 'sessoes', ['psicologo_id', 'data_sessao'])
+    criar_indice_concorrente('ix_sessoes_paciente_data', 'sessoes', ['paciente_id', 'data_sessao'])
+    criar_indice_concorrente('ix_pacientes_psicologo_nome', 'pacientes', ['psicologo_id', 'nome'])
+    criar_indice_concorrente('ix_evolucoes_paciente_data', 'evolucoes', ['paciente_id', 'data_evolucao'])
+
+
+def downgrade():
+    remover_indice_concorrente('ix_evolucoes_paciente_data', 'evolucoes')
+    remover_indice_concorrente('ix_pacientes_psicologo_nome', 'pacientes')
+    remover_indice_concorrente('ix_sessoes_paciente_data', 'sessoes')
+    remover_indice_concorrente('ix_sessoes_psicologo_data', 'sessoes')
@@ -0,0 +1,81 @@
+"""tabela agregada receita_mensal
+
+Guarda quantidade e soma dos valores das sessões por psicólogo, mês e status.
+A carga inicial é feita aqui; depois disso a aplicação mantém a tabela a cada
+flush de Sessao (e `flask receita-rebuild` refaz a tabela se necessário).
+
+A versão anterior, ainda no ar durante a implantação, grava sessões sem
+atualizar a tabela. A etapa de release (Procfile, railway.json) roda
+`flask receita-rebuild` depois do `db-init`; na implantação que traz esta
+migração, rode o comando mais uma vez quando as instâncias antigas saírem.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    receita_mensal = op.create_table(
+        'receita_mensal',
+        sa.Column('psicologo_id', sa.Integer(), nullable=False),
+        sa.Column('mes', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('quantidade_com_valor', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['psicologo_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('psicologo_id', 'mes', 'status'),
+    )
+
+    sessoes = sa.table(
+        'sessoes',
+        sa.column('id', sa.Integer),
+        sa.column('psicologo_id', sa.Integer),
+        sa.column('data_sessao', sa.DateTime),
+        sa.column('valor', sa.Numeric),
+        sa.column('status', sa.String),
+    )
+    ano = sa.extract('year', sessoes.c.data_sessao)
+    mes = sa.extract('month', sessoes.c.data_sessao)
+    status = sa.func.coalesce(sessoes.c.status, 'agendada')
+    linhas = op.get_bind().execute(
+        sa.select(
+            sessoes.c.psicologo_id,
+            ano,
+            mes,
+            status,
+            sa.func.count(sessoes.c.id),
+            sa.func.sum(sa.case((sessoes.c.valor != 0, 1), else_=0)),
+            sa.func.sum(sessoes.c.valor),
+        ).group_by(sessoes.c.psicologo_id, ano, mes, status)
+    ).all()
+
+    if linhas:
+        op.bulk_insert(receita_mensal, [
+            {
+                'psicologo_id': psicologo_id,
+                'mes': date(int(ano_linha), int(mes_linha), 1),
+                'status': status_linha,
+                'quantidade': quantidade,
+                'quantidade_com_valor': com_valor or 0,
+                'total': total or 0,
+            }
+            for psicologo_id, ano_linha, mes_linha, status_linha, quantidade, com_valor, total in linhas
+        ])
+
+
+def downgrade():
+    op.drop_table('receita_mensal')
@@ -0,0 +1,28 @@
+"""contador versao_dados em usuarios
+
+Usado como validador (ETag) das páginas e relatórios de cada usuário.
+O server_default evita reescrever a tabela no PostgreSQL 11+.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('usuarios', sa.Column('versao_dados', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.drop_column('versao_dados')
@@ -0,0 +1,37 @@
+"""token da agenda ICS e data da última alteração dos dados
+
+token_agenda autentica o feed /agenda/<token>.ics; dados_atualizados_em é
+gravado junto com versao_dados e vira o Last-Modified do feed.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.operacoes import adicionar_colunas_ausentes, criar_indice_concorrente, remover_indice_concorrente
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    adicionar_colunas_ausentes(
+        'usuarios',
+        sa.Column('dados_atualizados_em', sa.DateTime(), nullable=True),
+        sa.Column('token_agenda', sa.String(length=64), nullable=True),
+    )
+    criar_indice_concorrente('ix_usuarios_token_agenda', 'usuarios', ['token_agenda'], unique=True)
+
+
+def downgrade():
+    remover_indice_concorrente('ix_usuarios_token_agenda', 'usuarios')
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.drop_column('token_agenda')
+        batch_op.drop_column('dados_atualizados_em')
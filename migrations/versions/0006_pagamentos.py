@@ -0,0 +1,46 @@
+"""tabela pagamentos
+
+Pagamentos (inclusive parciais) ligados a cada sessão. psicologo_id fica
+repetido na tabela para que a soma por sessão e os recebíveis de um
+psicólogo sejam lidos por índice, sem passar pela tabela de sessões.
+Sessões realizadas antes desta migração começam sem pagamento registrado.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'pagamentos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sessao_id', sa.Integer(), nullable=False),
+        sa.Column('psicologo_id', sa.Integer(), nullable=False),
+        sa.Column('valor', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('metodo', sa.String(length=20), nullable=False),
+        sa.Column('data_pagamento', sa.Date(), nullable=False),
+        sa.Column('observacoes', sa.Text(), nullable=True),
+        sa.Column('data_criacao', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['psicologo_id'], ['usuarios.id']),
+        sa.ForeignKeyConstraint(['sessao_id'], ['sessoes.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_pagamentos_sessao', 'pagamentos', ['sessao_id'])
+    op.create_index('ix_pagamentos_psicologo_data', 'pagamentos', ['psicologo_id', 'data_pagamento'])
+
+
+def downgrade():
+    op.drop_index('ix_pagamentos_psicologo_data', table_name='pagamentos')
+    op.drop_index('ix_pagamentos_sessao', table_name='pagamentos')
+    op.drop_table('pagamentos')
@@ -0,0 +1,48 @@
+"""fila de tarefas em segundo plano
+
+Tarefas pendentes são reservadas pelo `flask worker` em ordem de id
+(ix_tarefas_status_id); o arquivo gerado fica na coluna resultado.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tarefas',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('parametros', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), nullable=False),
+        sa.Column('erro', sa.Text(), nullable=True),
+        sa.Column('resultado_nome', sa.String(length=200), nullable=True),
+        sa.Column('resultado_mimetype', sa.String(length=100), nullable=True),
+        sa.Column('resultado', sa.LargeBinary(), nullable=True),
+        sa.Column('criada_em', sa.DateTime(), nullable=True),
+        sa.Column('iniciada_em', sa.DateTime(), nullable=True),
+        sa.Column('concluida_em', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tarefas_status_id', 'tarefas', ['status', 'id'])
+    op.create_index('ix_tarefas_usuario_criada', 'tarefas', ['usuario_id', 'criada_em'])
+
+
+def downgrade():
+    op.drop_index('ix_tarefas_usuario_criada', table_name='tarefas')
+    op.drop_index('ix_tarefas_status_id', table_name='tarefas')
+    op.drop_table('tarefas')
@@ -0,0 +1,72 @@
+"""atualizado_em e exclusões para a API de sincronização
+
+pacientes, sessoes e evolucoes ganham atualizado_em (preenchido com a data de
+criação nas linhas existentes) e índices (psicologo_id, atualizado_em, id)
+para percorrer as mudanças de cada psicólogo; evolucoes recebe uma cópia de
+pacientes.psicologo_id para isso (ainda aceitando NULL, ver 0009). exclusoes
+guarda os registros apagados.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.operacoes import (
+    adicionar_colunas_ausentes, adicionar_fk_sem_bloqueio, agora_utc, backfill_em_lotes,
+    criar_indice_concorrente, remover_indice_concorrente
+)
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for tabela, criacao in (('pacientes', 'data_cadastro'), ('sessoes', 'data_criacao'), ('evolucoes', 'data_evolucao')):
+        adicionar_colunas_ausentes(tabela, sa.Column('atualizado_em', sa.DateTime(), nullable=True))
+        backfill_em_lotes(tabela, f'atualizado_em = COALESCE({criacao}, {agora_utc()})', 'atualizado_em IS NULL')
+
+    adicionar_colunas_ausentes('evolucoes', sa.Column('psicologo_id', sa.Integer(), nullable=True))
+    backfill_em_lotes(
+        'evolucoes',
+        'psicologo_id = (SELECT pacientes.psicologo_id FROM pacientes WHERE pacientes.id = evolucoes.paciente_id)',
+        'psicologo_id IS NULL'
+    )
+    # O NOT NULL fica para a 0009: a versão anterior, ainda no ar durante a
+    # implantação, grava evoluções sem psicologo_id.
+    adicionar_fk_sem_bloqueio('fk_evolucoes_psicologo_id', 'evolucoes', 'psicologo_id', 'usuarios')
+
+    for tabela in ('pacientes', 'sessoes', 'evolucoes'):
+        criar_indice_concorrente(f'ix_{tabela}_psicologo_atualizado', tabela, ['psicologo_id', 'atualizado_em', 'id'])
+
+    op.create_table(
+        'exclusoes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('psicologo_id', sa.Integer(), nullable=False),
+        sa.Column('tabela', sa.String(length=20), nullable=False),
+        sa.Column('registro_id', sa.Integer(), nullable=False),
+        sa.Column('excluido_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['psicologo_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_exclusoes_psicologo_excluido', 'exclusoes', ['psicologo_id', 'excluido_em'])
+
+
+def downgrade():
+    op.drop_index('ix_exclusoes_psicologo_excluido', table_name='exclusoes')
+    op.drop_table('exclusoes')
+
+    for tabela in ('evolucoes', 'sessoes', 'pacientes'):
+        remover_indice_concorrente(f'ix_{tabela}_psicologo_atualizado', tabela)
+    with op.batch_alter_table('evolucoes') as batch_op:
+        batch_op.drop_constraint('fk_evolucoes_psicologo_id', type_='foreignkey')
+        batch_op.drop_column('psicologo_id')
+    for tabela in ('evolucoes', 'sessoes', 'pacientes'):
+        with op.batch_alter_table(tabela) as batch_op:
+            batch_op.drop_column('atualizado_em')
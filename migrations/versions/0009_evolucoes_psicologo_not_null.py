@@ -0,0 +1,40 @@
+"""evolucoes.psicologo_id NOT NULL
+
+Roda depois que a versão que preenche evolucoes.psicologo_id está no ar
+(apos_implantacao, ver `flask db-init`): as evoluções gravadas pela versão
+anterior durante a implantação da 0008 são preenchidas e a coluna passa a
+ser obrigatória sem travar escritas.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.operacoes import backfill_em_lotes, definir_not_null_sem_bloqueio
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# Só aplicada quando o código que grava a coluna já atende as requisições
+apos_implantacao = True
+
+
+def upgrade():
+    backfill_em_lotes(
+        'evolucoes',
+        'psicologo_id = (SELECT pacientes.psicologo_id FROM pacientes WHERE pacientes.id = evolucoes.paciente_id)',
+        'psicologo_id IS NULL'
+    )
+    definir_not_null_sem_bloqueio('evolucoes', 'psicologo_id', sa.Integer())
+
+
+def downgrade():
+    with op.batch_alter_table('evolucoes') as batch_op:
+        batch_op.alter_column('psicologo_id', existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,26 @@
+"""índice (psicologo_id, data_evolucao) para a lista de evoluções
+
+A lista de /evolucoes filtra pela cópia de psicologo_id e por faixa de
+data_evolucao, sem join com pacientes.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from migrations.operacoes import criar_indice_concorrente, remover_indice_concorrente
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    criar_indice_concorrente('ix_evolucoes_psicologo_data', 'evolucoes', ['psicologo_id', 'data_evolucao'])
+
+
+def downgrade():
+    remover_indice_concorrente('ix_evolucoes_psicologo_data', 'evolucoes')
@@ -0,0 +1,177 @@
+// Agenda semanal/mensal. Cada janela visível é buscada em
+// /api/agenda/eventos?inicio&fim e guardada em memória; depois de desenhar a
+// janela atual, as janelas anterior e seguinte são pré-carregadas para que a
+// navegação não espere pela rede.
+const agenda = document.getElementById('agenda');
+const urlEventos = agenda.dataset.urlEventos;
+const janelas = {};
+
+const NOMES_DIAS = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom'];
+const NOMES_MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho',
+                     'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'];
+
+let visao = agenda.dataset.visao;
+let referencia = lerData(agenda.dataset.referencia);
+// Cliques rápidos disparam vários mostrar(); só a resposta do último é desenhada.
+let ultimoPedido = 0;
+
+function lerData(texto) {
+    const [ano, mes, dia] = texto.split('-').map(Number);
+    return new Date(ano, mes - 1, dia);
+}
+
+function formatarData(data) {
+    const mes = String(data.getMonth() + 1).padStart(2, '0');
+    const dia = String(data.getDate()).padStart(2, '0');
+    return `${data.getFullYear()}-${mes}-${dia}`;
+}
+
+function somarDias(data, dias) {
+    const resultado = new Date(data);
+    resultado.setDate(resultado.getDate() + dias);
+    return resultado;
+}
+
+function inicioSemana(data) {
+    return somarDias(data, -((data.getDay() + 6) % 7));
+}
+
+// A visão mensal mostra semanas completas (segunda a domingo) que cobrem o mês.
+function calcularJanela(visao, data) {
+    if (visao === 'mes') {
+        const primeiro = new Date(data.getFullYear(), data.getMonth(), 1);
+        const ultimo = new Date(data.getFullYear(), data.getMonth() + 1, 0);
+        return { inicio: inicioSemana(primeiro), fim: somarDias(inicioSemana(ultimo), 6) };
+    }
+    const inicio = inicioSemana(data);
+    return { inicio: inicio, fim: somarDias(inicio, 6) };
+}
+
+function deslocar(visao, data, passos) {
+    if (visao === 'mes') {
+        return new Date(data.getFullYear(), data.getMonth() + passos, 1);
+    }
+    return somarDias(data, 7 * passos);
+}
+
+function carregarJanela(janela) {
+    const chave = `${formatarData(janela.inicio)}_${formatarData(janela.fim)}`;
+    if (!janelas[chave]) {
+        janelas[chave] = fetch(`${urlEventos}?inicio=${formatarData(janela.inicio)}&fim=${formatarData(janela.fim)}`)
+            .then(response => {
+                if (!response.ok) throw new Error('Erro ao buscar eventos');
+                return response.json();
+            })
+            .then(data => data.eventos)
+            .catch(erro => {
+                delete janelas[chave];
+                throw erro;
+            });
+    }
+    return janelas[chave];
+}
+
+function agruparPorDia(eventos) {
+    const dias = {};
+    eventos.forEach(evento => {
+        const dia = evento.inicio.slice(0, 10);
+        (dias[dia] = dias[dia] || []).push(evento);
+    });
+    return dias;
+}
+
+function desenharEvento(evento) {
+    const link = document.createElement('a');
+    link.href = `/sessoes/${evento.id}`;
+    link.className = `agenda-evento status-${evento.status}`;
+    link.title = `${evento.paciente} (${evento.status})`;
+    link.textContent = `${evento.inicio.slice(11, 16)} ${evento.paciente}`;
+    return link;
+}
+
+function desenhar(janela, eventos) {
+    const grade = document.getElementById('agenda-grade');
+    const porDia = agruparPorDia(eventos);
+    const hoje = formatarData(new Date());
+
+    grade.className = `agenda-grade agenda-${visao}`;
+    grade.innerHTML = '';
+
+    NOMES_DIAS.forEach(nome => {
+        const cabecalho = document.createElement('div');
+        cabecalho.className = 'agenda-cabecalho';
+        cabecalho.textContent = nome;
+        grade.appendChild(cabecalho);
+    });
+
+    for (let dia = janela.inicio; dia <= janela.fim; dia = somarDias(dia, 1)) {
+        const chave = formatarData(dia);
+        const celula = document.createElement('div');
+        celula.className = 'agenda-dia';
+        if (chave === hoje) celula.classList.add('agenda-hoje');
+        if (visao === 'mes' && dia.getMonth() !== referencia.getMonth()) celula.classList.add('agenda-fora-mes');
+
+        const numero = document.createElement('div');
+        numero.className = 'agenda-numero';
+        numero.textContent = dia.getDate();
+        celula.appendChild(numero);
+
+        (porDia[chave] || []).forEach(evento => celula.appendChild(desenharEvento(evento)));
+        grade.appendChild(celula);
+    }
+}
+
+function atualizarTitulo(janela) {
+    const titulo = document.getElementById('agenda-titulo');
+    if (visao === 'mes') {
+        titulo.textContent = `${NOMES_MESES[referencia.getMonth()]} de ${referencia.getFullYear()}`;
+    } else {
+        titulo.textContent = `${janela.inicio.toLocaleDateString('pt-BR')} a ${janela.fim.toLocaleDateString('pt-BR')}`;
+    }
+}
+
+function mostrar() {
+    const janela = calcularJanela(visao, referencia);
+    const carregando = document.getElementById('agenda-carregando');
+
+    atualizarTitulo(janela);
+    history.replaceState(null, '', `?visao=${visao}&data=${formatarData(referencia)}`);
+    document.querySelectorAll('[data-visao]').forEach(botao => {
+        if (botao !== agenda) botao.classList.toggle('active', botao.dataset.visao === visao);
+    });
+
+    const pedido = ++ultimoPedido;
+    carregando.style.display = 'block';
+    carregarJanela(janela)
+        .then(eventos => {
+            if (pedido !== ultimoPedido) return;
+            carregando.style.display = 'none';
+            desenhar(janela, eventos);
+
+            [-1, 1].forEach(passo => {
+                carregarJanela(calcularJanela(visao, deslocar(visao, referencia, passo))).catch(() => {});
+            });
+        })
+        .catch(() => {
+            if (pedido !== ultimoPedido) return;
+            carregando.style.display = 'none';
+            alert('Erro ao carregar a agenda');
+        });
+}
+
+document.querySelectorAll('[data-navegar]').forEach(botao => {
+    botao.addEventListener('click', function() {
+        const passos = Number(this.dataset.navegar);
+        referencia = passos === 0 ? new Date() : deslocar(visao, referencia, passos);
+        mostrar();
+    });
+});
+
+document.querySelectorAll('button[data-visao]').forEach(botao => {
+    botao.addEventListener('click', function() {
+        visao = this.dataset.visao;
+        mostrar();
+    });
+});
+
+mostrar();
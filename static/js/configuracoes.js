@@ -0,0 +1,16 @@
+// Navegação entre seções
+document.querySelectorAll('.list-group-item').forEach(item => {
+    item.addEventListener('click', function(e) {
+        e.preventDefault();
+
+        // Remove active de todos
+        document.querySelectorAll('.list-group-item').forEach(i => i.classList.remove('active'));
+        document.querySelectorAll('.section-card').forEach(s => s.classList.remove('active'));
+
+        // Adiciona active no clicado
+        this.classList.add('active');
+        const section = this.getAttribute('data-section');
+        document.getElementById(section).classList.add('active');
+    });
+});
+
@@ -0,0 +1,37 @@
+// Máscara para telefone
+document.getElementById('telefone').addEventListener('input', function(e) {
+    let value = e.target.value.replace(/\D/g, '');
+    if (value.length >= 11) {
+        value = value.replace(/(\d{2})(\d{5})(\d{4})/, '($1) $2-$3');
+    } else if (value.length >= 7) {
+        value = value.replace(/(\d{2})(\d{4})(\d{0,4})/, '($1) $2-$3');
+    } else if (value.length >= 3) {
+        value = value.replace(/(\d{2})(\d{0,5})/, '($1) $2');
+    }
+    e.target.value = value;
+});
+
+// Função para reativar paciente
+function ativarPaciente(id) {
+    if (confirm('Tem certeza que deseja reativar este paciente?')) {
+        fetch(`/pacientes/${id}/ativar`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Paciente reativado com sucesso!');
+                location.reload();
+            } else {
+                alert('Erro ao reativar paciente');
+            }
+        });
+    }
+}
+
+// Foco automático no primeiro campo
+document.getElementById('nome').focus();
+
@@ -0,0 +1,96 @@
+// Validação de conflito de horário
+document.querySelector('form').addEventListener('submit', function(e) {
+    const data = document.getElementById('data_sessao').value;
+    const hora = document.getElementById('hora_sessao').value;
+
+    if (!data || !hora) {
+        alert('Por favor, preencha data e horário.');
+        e.preventDefault();
+        return;
+    }
+
+    // Verificar se a data/hora não é no passado (apenas para sessões agendadas)
+    if (this.dataset.status === 'agendada') {
+        const agora = new Date();
+        const sessaoDateTime = new Date(data + 'T' + hora);
+
+        if (sessaoDateTime <= agora) {
+            if (!confirm('A data e horário são no passado. Deseja continuar mesmo assim?')) {
+                e.preventDefault();
+                return;
+            }
+        }
+    }
+});
+
+// Formatação do valor monetário
+document.getElementById('valor').addEventListener('input', function(e) {
+    let value = e.target.value;
+    // Remove caracteres não numéricos exceto ponto e vírgula
+    value = value.replace(/[^0-9.,]/g, '');
+    // Substitui vírgula por ponto
+    value = value.replace(',', '.');
+    e.target.value = value;
+});
+
+// Funções para ações da sessão
+function marcarRealizada(id) {
+    if (confirm('Marcar esta sessão como realizada?')) {
+        fetch(`/sessoes/${id}/marcar-realizada`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Sessão marcada como realizada!');
+                window.location.href = `/sessoes/${id}`;
+            } else {
+                alert('Erro ao atualizar sessão');
+            }
+        });
+    }
+}
+
+function marcarFaltou(id) {
+    if (confirm('Marcar que o paciente faltou nesta sessão?')) {
+        fetch(`/sessoes/${id}/marcar-faltou`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Sessão marcada como falta!');
+                window.location.href = `/sessoes/${id}`;
+            } else {
+                alert('Erro ao atualizar sessão');
+            }
+        });
+    }
+}
+
+function cancelarSessao(id) {
+    if (confirm('Tem certeza que deseja cancelar esta sessão?')) {
+        fetch(`/sessoes/${id}/cancelar`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Sessão cancelada!');
+                window.location.href = `/sessoes/${id}`;
+            } else {
+                alert('Erro ao cancelar sessão');
+            }
+        });
+    }
+}
+
@@ -0,0 +1,48 @@
+function registrarPagamento(url, dados) {
+    return fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(dados)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        } else {
+            alert(data.message || 'Erro ao registrar pagamento');
+        }
+    });
+}
+
+// Sem valor a sessão é quitada pelo saldo; um valor menor registra pagamento parcial
+function marcarPago(sessaoId) {
+    const valor = prompt('Valor recebido (deixe em branco para quitar o saldo):', '');
+    if (valor === null) return;
+    registrarPagamento(`/api/marcar_pagamento/${sessaoId}`, {
+        valor: valor,
+        metodo: document.getElementById('metodo-pagamento').value
+    });
+}
+
+function marcarSelecionadosPagos() {
+    const sessaoIds = Array.from(document.querySelectorAll('.selecionar-sessao:checked')).map(caixa => caixa.value);
+    if (!sessaoIds.length) {
+        alert('Selecione ao menos uma sessão.');
+        return;
+    }
+    if (confirm(`Marcar ${sessaoIds.length} sessão(ões) como pagas?`)) {
+        registrarPagamento('/api/pagamentos/marcar-pagos', {
+            sessao_ids: sessaoIds,
+            metodo: document.getElementById('metodo-pagamento').value
+        });
+    }
+}
+
+const selecionarTodas = document.getElementById('selecionar-todas');
+if (selecionarTodas) {
+    selecionarTodas.addEventListener('change', function() {
+        document.querySelectorAll('.selecionar-sessao').forEach(caixa => caixa.checked = this.checked);
+    });
+}
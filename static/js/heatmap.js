@@ -0,0 +1,95 @@
+// Heatmap de comparecimento, usado no dashboard e nos relatórios. Uma única
+// requisição a /api/relatorios/comparecimento-heatmap traz a matriz dia x hora
+// inteira; o seletor #heatmapMetrica só redesenha a partir desses dados.
+let dadosHeatmap;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const seletor = document.getElementById('heatmapMetrica');
+    if (seletor) {
+        seletor.addEventListener('change', renderizarHeatmap);
+    }
+
+    // O dashboard carrega sozinho; a página de relatórios chama carregarHeatmap com o período escolhido
+    const container = document.getElementById('heatmapComparecimento');
+    if (container && container.dataset.carregarAutomaticamente !== undefined) {
+        carregarHeatmap();
+    }
+});
+
+function carregarHeatmap(periodo) {
+    const carregando = document.getElementById('loading-heatmap');
+    const container = document.getElementById('heatmapComparecimento');
+    if (carregando) {
+        carregando.style.display = 'block';
+    }
+
+    const parametros = periodo ? `?periodo=${periodo}` : '';
+    return fetch(`/api/relatorios/comparecimento-heatmap${parametros}`)
+        .then(response => response.json())
+        .then(data => {
+            if (carregando) {
+                carregando.style.display = 'none';
+            }
+            dadosHeatmap = data;
+            renderizarHeatmap();
+            return data;
+        })
+        .catch(error => {
+            console.error('Erro ao carregar heatmap de comparecimento:', error);
+            if (carregando) {
+                carregando.style.display = 'none';
+            }
+            container.innerHTML = '<p class="text-danger text-center">Erro ao carregar dados</p>';
+            return null;
+        });
+}
+
+function renderizarHeatmap() {
+    if (!dadosHeatmap) {
+        return;
+    }
+
+    const metrica = document.getElementById('heatmapMetrica').value;
+    const taxas = dadosHeatmap[metrica];
+    const contagens = dadosHeatmap.contagens;
+    const container = document.getElementById('heatmapComparecimento');
+
+    // Só as horas em que houve alguma sessão viram colunas
+    const horas = [];
+    for (let h = 0; h < 24; h++) {
+        if (taxas.some(linha => linha[h] !== null)) {
+            horas.push(h);
+        }
+    }
+
+    if (horas.length === 0) {
+        container.innerHTML = '<p class="text-muted text-center">Nenhum dado encontrado</p>';
+        return;
+    }
+
+    let html = '<table class="heatmap-tabela"><thead><tr><th></th>';
+    horas.forEach(h => {
+        html += `<th>${String(h).padStart(2, '0')}h</th>`;
+    });
+    html += '</tr></thead><tbody>';
+
+    dadosHeatmap.dias.forEach((dia, d) => {
+        html += `<tr><th>${dia}</th>`;
+        horas.forEach(h => {
+            const valor = taxas[d][h];
+            if (valor === null) {
+                html += '<td class="heatmap-vazio"></td>';
+                return;
+            }
+            const total = Object.values(contagens).reduce((soma, matriz) => soma + matriz[d][h], 0);
+            const dica = `${dia} ${h}h: ${contagens.realizada[d][h]} realizadas, ${contagens.faltou[d][h]} faltas, ` +
+                `${contagens.cancelada[d][h]} canceladas (${total} sessões)`;
+            const intensidade = Math.min(valor / 50, 1);
+            html += `<td title="${dica}" style="background: rgba(220, 53, 69, ${0.08 + intensidade * 0.82}); ` +
+                `color: ${intensidade > 0.5 ? '#fff' : '#495057'}">${Math.round(valor)}%</td>`;
+        });
+        html += '</tr>';
+    });
+
+    container.innerHTML = html + '</tbody></table>';
+}
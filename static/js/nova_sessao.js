@@ -0,0 +1,104 @@
+// Definir data mínima como hoje
+document.addEventListener('DOMContentLoaded', function() {
+    const dataInput = document.getElementById('data_sessao');
+    const hoje = new Date().toISOString().split('T')[0];
+    dataInput.min = hoje;
+
+    // Sugerir horários comuns
+    const horaInput = document.getElementById('hora_sessao');
+    const agora = new Date();
+    const horaAtual = agora.getHours();
+
+    // Se for antes das 18h, sugerir próximo horário disponível
+    if (horaAtual < 18) {
+        const proximaHora = Math.max(8, horaAtual + 1);
+        horaInput.value = proximaHora.toString().padStart(2, '0') + ':00';
+    } else {
+        // Se for depois das 18h, sugerir 8h do próximo dia
+        horaInput.value = '08:00';
+    }
+});
+
+// Validação básica do formulário
+document.querySelector('form').addEventListener('submit', function(e) {
+    const paciente = document.getElementById('paciente_id').value;
+    const data = document.getElementById('data_sessao').value;
+    const hora = document.getElementById('hora_sessao').value;
+
+    if (!paciente) {
+        alert('Por favor, selecione um paciente.');
+        e.preventDefault();
+        return;
+    }
+
+    if (!data || !hora) {
+        alert('Por favor, preencha data e horário.');
+        e.preventDefault();
+        return;
+    }
+
+    // Verificar se a data/hora não é no passado
+    const agora = new Date();
+    const sessaoDateTime = new Date(data + 'T' + hora);
+
+    if (sessaoDateTime <= agora) {
+        alert('A data e horário da sessão devem ser futuros.');
+        e.preventDefault();
+        return;
+    }
+});
+
+// Formatação melhorada do valor monetário
+document.getElementById('valor').addEventListener('input', function(e) {
+    let value = e.target.value;
+
+    // Remove caracteres que não são números, vírgula ou ponto
+    value = value.replace(/[^0-9.,]/g, '');
+
+    // Se tem vírgula E ponto, remove o ponto
+    if (value.includes(',') && value.includes('.')) {
+        value = value.replace(/\./g, '');
+    }
+
+    // Limita a 2 casas decimais após vírgula ou ponto
+    if (value.includes(',')) {
+        const parts = value.split(',');
+        if (parts[1] && parts[1].length > 2) {
+            parts[1] = parts[1].substring(0, 2);
+            value = parts.join(',');
+        }
+    } else if (value.includes('.')) {
+        const parts = value.split('.');
+        if (parts[1] && parts[1].length > 2) {
+            parts[1] = parts[1].substring(0, 2);
+            value = parts.join('.');
+        }
+    }
+
+    e.target.value = value;
+});
+
+// Formatação ao sair do campo (blur)
+document.getElementById('valor').addEventListener('blur', function(e) {
+    let value = e.target.value.trim();
+
+    if (value === '') return;
+
+    // Converte vírgula para ponto para validação
+    let numValue = value.replace(',', '.');
+
+    // Verifica se é um número válido
+    if (!isNaN(numValue) && numValue !== '') {
+        // Formata para 2 casas decimais se necessário
+        const num = parseFloat(numValue);
+        if (num > 0) {
+            // Mantém o formato original (vírgula ou ponto) que o usuário digitou
+            if (value.includes(',')) {
+                e.target.value = num.toFixed(2).replace('.', ',');
+            } else {
+                e.target.value = num.toFixed(2);
+            }
+        }
+    }
+});
+
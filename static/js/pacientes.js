@@ -0,0 +1,31 @@
+// Busca em tempo real
+document.getElementById('searchInput').addEventListener('input', function() {
+    const searchTerm = this.value.toLowerCase();
+    const rows = document.querySelectorAll('tbody tr');
+
+    rows.forEach(row => {
+        const text = row.textContent.toLowerCase();
+        row.style.display = text.includes(searchTerm) ? '' : 'none';
+    });
+});
+
+// Função para desativar paciente
+function desativarPaciente(id) {
+    if (confirm('Tem certeza que deseja desativar este paciente?')) {
+        fetch(`/pacientes/${id}/desativar`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                alert('Erro ao desativar paciente');
+            }
+        });
+    }
+}
+
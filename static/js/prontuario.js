@@ -0,0 +1,83 @@
+// Linha do tempo do prontuário: a página traz só os cabeçalhos mais recentes.
+// As evoluções anteriores chegam por rolagem infinita e o corpo de cada
+// anotação é buscado quando o item é aberto.
+const timeline = document.getElementById('timeline-evolucoes');
+const sentinela = document.getElementById('timeline-sentinela');
+let carregandoEvolucoes = false;
+
+function carregarEvolucoesAnteriores() {
+    const cursor = timeline.dataset.cursor;
+    if (!cursor || carregandoEvolucoes) return;
+    carregandoEvolucoes = true;
+
+    fetch(`${timeline.dataset.url}?antes=${encodeURIComponent(cursor)}`)
+        .then(response => {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        })
+        .then(data => {
+            timeline.insertAdjacentHTML('beforeend', data.html);
+            timeline.dataset.cursor = data.proximo_cursor || '';
+            if (!data.proximo_cursor) {
+                sentinela.hidden = true;
+                observador.disconnect();
+            }
+        })
+        .catch(error => {
+            console.error('Erro ao carregar evoluções:', error);
+            sentinela.textContent = 'Erro ao carregar evoluções anteriores.';
+            observador.disconnect();
+        })
+        .finally(() => {
+            carregandoEvolucoes = false;
+        });
+}
+
+function alternarCorpoEvolucao(botao) {
+    const corpo = botao.nextElementSibling;
+
+    if (corpo.dataset.carregado) {
+        corpo.hidden = !corpo.hidden;
+        botao.innerHTML = corpo.hidden
+            ? '<i class="bi bi-chevron-down"></i> Ver anotação'
+            : '<i class="bi bi-chevron-up"></i> Ocultar anotação';
+        return;
+    }
+
+    botao.disabled = true;
+    fetch(`/api/evolucoes/${botao.dataset.id}/corpo`)
+        .then(response => {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        })
+        .then(data => {
+            corpo.innerHTML = data.html;
+            corpo.dataset.carregado = '1';
+            corpo.hidden = false;
+            botao.innerHTML = '<i class="bi bi-chevron-up"></i> Ocultar anotação';
+        })
+        .catch(error => {
+            console.error('Erro ao carregar anotação:', error);
+            alert('Erro ao carregar anotação');
+        })
+        .finally(() => {
+            botao.disabled = false;
+        });
+}
+
+const observador = new IntersectionObserver(entradas => {
+    if (entradas.some(entrada => entrada.isIntersecting)) {
+        carregarEvolucoesAnteriores();
+    }
+}, { rootMargin: '400px' });
+
+if (timeline) {
+    timeline.addEventListener('click', function(e) {
+        const botao = e.target.closest('.btn-corpo-evolucao');
+        if (botao) alternarCorpoEvolucao(botao);
+    });
+
+    if (timeline.dataset.cursor) {
+        observador.observe(sentinela);
+    }
+}
@@ -0,0 +1,134 @@
+// Configurar datas padrão
+document.addEventListener('DOMContentLoaded', function() {
+    // Se não houver datas definidas, usar o mês atual
+    const dataInicio = document.getElementById('data_inicio');
+    const dataFim = document.getElementById('data_fim');
+
+    if (!dataInicio.value) {
+        const hoje = new Date();
+        const primeiroDia = new Date(hoje.getFullYear(), hoje.getMonth(), 1);
+        dataInicio.value = primeiroDia.toISOString().split('T')[0];
+    }
+
+    if (!dataFim.value) {
+        const hoje = new Date();
+        dataFim.value = hoje.toISOString().split('T')[0];
+    }
+
+    // Validação de datas
+    dataInicio.addEventListener('change', validarDatas);
+    dataFim.addEventListener('change', validarDatas);
+});
+
+function validarDatas() {
+    const dataInicio = document.getElementById('data_inicio');
+    const dataFim = document.getElementById('data_fim');
+
+    if (dataInicio.value && dataFim.value) {
+        if (new Date(dataInicio.value) > new Date(dataFim.value)) {
+            alert('A data de início não pode ser maior que a data de fim.');
+            dataInicio.focus();
+        }
+    }
+}
+
+// Função para exportar para CSV
+function exportarCSV() {
+    const table = document.getElementById('sessoesTable');
+    if (!table) {
+        alert('Nenhuma tabela encontrada para exportar.');
+        return;
+    }
+
+    let csv = [];
+    const rows = table.querySelectorAll('tr');
+
+    for (let i = 0; i < rows.length; i++) {
+        const row = [];
+        const cols = rows[i].querySelectorAll('td, th');
+
+        for (let j = 0; j < cols.length; j++) {
+            // Limpar o texto e escapar aspas
+            let cellText = cols[j].innerText.replace(/"/g, '""');
+            row.push('"' + cellText + '"');
+        }
+        csv.push(row.join(','));
+    }
+
+    // Criar e baixar o arquivo
+    const csvContent = csv.join('\n');
+    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
+    const link = document.createElement('a');
+
+    if (link.download !== undefined) {
+        const url = URL.createObjectURL(blob);
+        link.setAttribute('href', url);
+        link.setAttribute('download', `relatorio_financeiro_${new Date().toISOString().split('T')[0]}.csv`);
+        link.style.visibility = 'hidden';
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+    } else {
+        alert('Seu navegador não suporta download de arquivos.');
+    }
+}
+
+// Função para imprimir com configurações otimizadas
+function imprimirRelatorio() {
+    window.print();
+}
+
+// Atalhos de teclado
+document.addEventListener('keydown', function(e) {
+    // Ctrl+P para imprimir
+    if (e.ctrlKey && e.key === 'p') {
+        e.preventDefault();
+        imprimirRelatorio();
+    }
+
+    // Ctrl+E para exportar CSV
+    if (e.ctrlKey && e.key === 'e') {
+        e.preventDefault();
+        exportarCSV();
+    }
+});
+
+// Períodos longos: o CSV/PDF é gerado por uma tarefa em segundo plano e a página
+// consulta o status até o arquivo ficar pronto para download.
+function gerarDetalhamentoEmSegundoPlano(tipo) {
+    const bloco = document.getElementById('detalhe-segundo-plano');
+    const status = document.getElementById('detalhe-status');
+
+    status.textContent = 'Gerando arquivo...';
+    fetch('/api/tarefas', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            tipo: tipo,
+            parametros: { data_inicio: bloco.dataset.inicio, data_fim: bloco.dataset.fim }
+        })
+    })
+    .then(response => response.json())
+    .then(tarefa => acompanharTarefa(tarefa, status))
+    .catch(() => status.textContent = 'Erro ao gerar o arquivo.');
+}
+
+function acompanharTarefa(tarefa, status) {
+    if (tarefa.status === 'concluida') {
+        status.textContent = 'Arquivo pronto.';
+        window.location.href = tarefa.url_download;
+        return;
+    }
+    if (tarefa.status === 'erro' || !tarefa.url_status) {
+        status.textContent = 'Erro ao gerar o arquivo.';
+        return;
+    }
+    setTimeout(() => {
+        fetch(tarefa.url_status)
+            .then(response => response.json())
+            .then(atualizada => acompanharTarefa(atualizada, status))
+            .catch(() => status.textContent = 'Erro ao consultar o andamento.');
+    }, 2000);
+}
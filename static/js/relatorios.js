@@ -0,0 +1,370 @@
+let receitaChart, statusChart, evolucaoChart, pacientesChart;
+
+// Configuração global dos gráficos
+Chart.defaults.font.family = "'Segoe UI', Tahoma, Geneva, Verdana, sans-serif";
+Chart.defaults.color = '#495057';
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Carregar todos os gráficos
+    carregarGraficos();
+
+    // Event listeners para os botões de período
+    document.querySelectorAll('.btn-period').forEach(btn => {
+        btn.addEventListener('click', function() {
+            // Remover classe active de todos os botões
+            document.querySelectorAll('.btn-period').forEach(b => {
+                b.classList.remove('active');
+                b.classList.add('btn-outline-primary');
+                b.classList.remove('btn-primary');
+            });
+
+            // Adicionar classe active ao botão clicado
+            this.classList.add('active');
+            this.classList.remove('btn-outline-primary');
+            this.classList.add('btn-primary');
+
+            // Atualizar período atual
+            currentPeriodo = this.dataset.periodo;
+
+            // Recarregar gráficos
+            carregarGraficos();
+        });
+    });
+});
+
+function carregarGraficos() {
+    carregarReceitaMensal();
+    carregarSessoesStatus();
+    carregarEvolucaoSessoes();
+    carregarPacientesAtivos();
+    carregarTopPacientes();
+    carregarHeatmapComparecimento();
+    carregarRetencao();
+}
+
+function carregarReceitaMensal() {
+    mostrarLoading('loading-receita');
+
+    fetch(`/api/relatorios/receita-mensal?periodo=${currentPeriodo}`)
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-receita');
+
+            if (receitaChart) {
+                receitaChart.destroy();
+            }
+
+            const ctx = document.getElementById('receitaChart').getContext('2d');
+            receitaChart = new Chart(ctx, {
+                type: 'bar',
+                data: {
+                    labels: data.labels,
+                    datasets: [{
+                        label: 'Receita (R\$)',
+                        data: data.data,
+                        backgroundColor: 'rgba(102, 126, 234, 0.8)',
+                        borderColor: 'rgba(102, 126, 234, 1)',
+                        borderWidth: 1,
+                        borderRadius: 5
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            display: false
+                        }
+                    },
+                    scales: {
+                        y: {
+                            beginAtZero: true,
+                            ticks: {
+                                callback: function(value) {
+                                    return 'R\$ ' + value.toLocaleString('pt-BR');
+                                }
+                            }
+                        }
+                    }
+                }
+            });
+        })
+        .catch(error => {
+            console.error('Erro ao carregar receita mensal:', error);
+            esconderLoading('loading-receita');
+            mostrarErro('receitaChart', 'Erro ao carregar dados de receita');
+        });
+}
+
+function carregarSessoesStatus() {
+    mostrarLoading('loading-status');
+
+    fetch(`/api/relatorios/sessoes-status?periodo=${currentPeriodo}`)
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-status');
+
+            if (statusChart) {
+                statusChart.destroy();
+            }
+
+            const ctx = document.getElementById('statusChart').getContext('2d');
+            statusChart = new Chart(ctx, {
+                type: 'pie',
+                data: {
+                    labels: data.labels,
+                    datasets: [{
+                        data: data.data,
+                        backgroundColor: data.backgroundColor,
+                        borderWidth: 2,
+                        borderColor: '#fff'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            position: 'bottom'
+                        }
+                    }
+                }
+            });
+        })
+        .catch(error => {
+            console.error('Erro ao carregar sessões por status:', error);
+            esconderLoading('loading-status');
+            mostrarErro('statusChart', 'Erro ao carregar dados de status');
+        });
+}
+
+function carregarEvolucaoSessoes() {
+    mostrarLoading('loading-evolucao');
+
+    fetch(`/api/relatorios/evolucao-sessoes?periodo=${currentPeriodo}`)
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-evolucao');
+
+            if (evolucaoChart) {
+                evolucaoChart.destroy();
+            }
+
+            const ctx = document.getElementById('evolucaoChart').getContext('2d');
+            evolucaoChart = new Chart(ctx, {
+                type: 'line',
+                data: data,
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            position: 'top'
+                        }
+                    },
+                    scales: {
+                        y: {
+                            beginAtZero: true
+                        }
+                    }
+                }
+            });
+        })
+        .catch(error => {
+            console.error('Erro ao carregar evolução de sessões:', error);
+            esconderLoading('loading-evolucao');
+            mostrarErro('evolucaoChart', 'Erro ao carregar dados de evolução');
+        });
+}
+
+function carregarPacientesAtivos() {
+    mostrarLoading('loading-pacientes-status');
+
+    fetch('/api/relatorios/pacientes-ativos')
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-pacientes-status');
+
+            if (pacientesChart) {
+                pacientesChart.destroy();
+            }
+
+            const ctx = document.getElementById('pacientesChart').getContext('2d');
+            pacientesChart = new Chart(ctx, {
+                type: 'doughnut',
+                data: {
+                    labels: data.labels,
+                    datasets: [{
+                        data: data.data,
+                        backgroundColor: data.backgroundColor,
+                        borderWidth: 3,
+                        borderColor: '#fff'
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        legend: {
+                            position: 'bottom'
+                        }
+                    }
+                }
+            });
+        })
+        .catch(error => {
+            console.error('Erro ao carregar pacientes ativos:', error);
+            esconderLoading('loading-pacientes-status');
+            mostrarErro('pacientesChart', 'Erro ao carregar dados de pacientes');
+        });
+}
+
+function carregarTopPacientes() {
+    mostrarLoading('loading-pacientes');
+
+    fetch(`/api/relatorios/top-pacientes?periodo=${currentPeriodo}`)
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-pacientes');
+
+            const container = document.getElementById('topPacientesList');
+            container.innerHTML = '';
+
+            if (data.pacientes && data.pacientes.length > 0) {
+                data.pacientes.forEach((paciente, index) => {
+                    const item = document.createElement('div');
+                    item.className = 'paciente-item';
+                    item.innerHTML = `
+                        <div>
+                            <div class="paciente-nome">${index + 1}. ${paciente.nome}</div>
+                            <div class="paciente-stats">
+                                ${paciente.sessoes} sessões • R\$ ${paciente.receita.toLocaleString('pt-BR', {minimumFractionDigits: 2})}
+                            </div>
+                        </div>
+                    `;
+                    container.appendChild(item);
+                });
+            } else {
+                container.innerHTML = '<p class="text-muted text-center">Nenhum dado encontrado</p>';
+            }
+        })
+        .catch(error => {
+            console.error('Erro ao carregar top pacientes:', error);
+            esconderLoading('loading-pacientes');
+            document.getElementById('topPacientesList').innerHTML = '<p class="text-danger text-center">Erro ao carregar dados</p>';
+        });
+}
+
+function carregarHeatmapComparecimento() {
+    carregarHeatmap(currentPeriodo).then(data => {
+        if (data) {
+            renderizarFaltasPacientes(data.pacientes);
+        }
+    });
+}
+
+function renderizarFaltasPacientes(pacientes) {
+    const container = document.getElementById('faltasPacientesList');
+    container.innerHTML = '';
+
+    if (!pacientes || pacientes.length === 0) {
+        container.innerHTML = '<p class="text-muted text-center">Nenhum dado encontrado</p>';
+        return;
+    }
+
+    pacientes.forEach(paciente => {
+        const item = document.createElement('div');
+        item.className = 'paciente-item';
+        const nome = document.createElement('div');
+        nome.className = 'paciente-nome';
+        nome.textContent = paciente.nome;
+        const estatisticas = document.createElement('div');
+        estatisticas.className = 'paciente-stats';
+        estatisticas.textContent = `${paciente.taxa_faltas ?? 0}% de faltas • ${paciente.faltas} faltas, ` +
+            `${paciente.realizadas} realizadas, ${paciente.canceladas} canceladas`;
+        const bloco = document.createElement('div');
+        bloco.append(nome, estatisticas);
+        item.appendChild(bloco);
+        container.appendChild(item);
+    });
+}
+
+function carregarRetencao() {
+    mostrarLoading('loading-retencao');
+
+    fetch('/api/relatorios/retencao')
+        .then(response => response.json())
+        .then(data => {
+            esconderLoading('loading-retencao');
+            renderizarRetencao(data);
+        })
+        .catch(error => {
+            console.error('Erro ao carregar retenção:', error);
+            esconderLoading('loading-retencao');
+            document.getElementById('retencaoCoortes').innerHTML = '<p class="text-danger text-center">Erro ao carregar dados</p>';
+        });
+}
+
+function renderizarRetencao(data) {
+    const container = document.getElementById('retencaoCoortes');
+    document.getElementById('retencaoDiasAbandono').textContent = data.dias_abandono;
+    if (data.dados_desde) {
+        const [ano, mes, dia] = data.dados_desde.split('-');
+        document.getElementById('retencaoDadosDesde').textContent =
+            `Sessões anteriores a ${dia}/${mes}/${ano} estão arquivadas e não entram no cálculo.`;
+    }
+
+    if (!data.coortes || data.coortes.length === 0) {
+        container.innerHTML = '<p class="text-muted text-center">Nenhum dado encontrado</p>';
+        return;
+    }
+
+    let html = '<table class="retencao-tabela"><thead><tr><th>Coorte</th><th>Pacientes</th>';
+    data.marcos.forEach(marco => {
+        html += `<th>${marco} ${marco === 1 ? 'mês' : 'meses'}</th>`;
+    });
+    html += '<th>Abandonos</th><th>Sessões até abandono</th></tr></thead><tbody>';
+
+    // Coortes mais recentes primeiro
+    data.coortes.slice().reverse().forEach(coorte => {
+        html += `<tr><th>${coorte.coorte}</th><td>${coorte.pacientes}</td>`;
+        data.marcos.forEach(marco => {
+            const valor = coorte.retencao[marco];
+            if (!valor) {
+                html += '<td class="retencao-vazio">—</td>';
+                return;
+            }
+            html += `<td title="${valor.pacientes} de ${coorte.pacientes} pacientes" ` +
+                `style="background: rgba(40, 167, 69, ${0.08 + valor.taxa / 100 * 0.72})">${Math.round(valor.taxa)}%</td>`;
+        });
+        html += `<td>${coorte.abandonos}</td><td>${coorte.sessoes_ate_abandono ?? '—'}</td></tr>`;
+    });
+
+    container.innerHTML = html + '</tbody></table>';
+}
+
+function mostrarLoading(id) {
+    const element = document.getElementById(id);
+    if (element) {
+        element.style.display = 'block';
+    }
+}
+
+function esconderLoading(id) {
+    const element = document.getElementById(id);
+    if (element) {
+        element.style.display = 'none';
+    }
+}
+
+function mostrarErro(canvasId, mensagem) {
+    const canvas = document.getElementById(canvasId);
+    if (canvas) {
+        const ctx = canvas.getContext('2d');
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        ctx.font = '16px Arial';
+        ctx.fillStyle = '#dc3545';
+        ctx.textAlign = 'center';
+        ctx.fillText(mensagem, canvas.width / 2, canvas.height / 2);
+    }
+}
@@ -0,0 +1,62 @@
+// As ações de status devolvem a linha atualizada e os contadores dos cards,
+// então a tabela é corrigida no lugar, sem recarregar a página.
+function atualizarStatusSessao(id, acao, mensagemErro, mensagemSucesso) {
+    fetch(`/sessoes/${id}/${acao}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ fragmento: 'linha' })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            alert(mensagemErro);
+            return;
+        }
+
+        const linha = document.getElementById(`sessao-${id}`);
+        if (linha && data.html) {
+            linha.outerHTML = data.html;
+        }
+
+        const contadores = data.contadores || {};
+        Object.keys(contadores).forEach(nome => {
+            const elemento = document.getElementById(`contador-${nome}`);
+            if (!elemento) return;
+            elemento.textContent = nome === 'receita_total'
+                ? `R$ ${contadores[nome].toFixed(2)}`
+                : contadores[nome];
+        });
+
+        if (mensagemSucesso) {
+            alert(mensagemSucesso);
+        }
+    })
+    .catch(() => alert(mensagemErro));
+}
+
+function marcarRealizada(id) {
+    if (confirm('Marcar esta sessão como realizada?')) {
+        atualizarStatusSessao(id, 'marcar-realizada', 'Erro ao atualizar sessão');
+    }
+}
+
+function marcarFaltou(id) {
+    if (confirm('Marcar que o paciente faltou nesta sessão?')) {
+        atualizarStatusSessao(id, 'marcar-faltou', 'Erro ao atualizar sessão');
+    }
+}
+
+function cancelarSessao(id) {
+    if (confirm('Tem certeza que deseja cancelar esta sessão?')) {
+        atualizarStatusSessao(id, 'cancelar', 'Erro ao cancelar sessão');
+    }
+}
+
+function reagendarSessao(id) {
+    if (confirm('Reagendar esta sessão?')) {
+        atualizarStatusSessao(id, 'reagendar', 'Erro ao reagendar sessão',
+            'Sessão reagendada! Você pode editar a data/hora agora.');
+    }
+}
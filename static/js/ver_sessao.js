@@ -0,0 +1,53 @@
+// As ações de status devolvem o selo de status e os botões já renderizados,
+// que substituem os atuais sem recarregar a página.
+function atualizarStatusSessao(id, acao, mensagemErro, mensagemSucesso) {
+    fetch(`/sessoes/${id}/${acao}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ fragmento: 'detalhe' })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            alert(mensagemErro);
+            return;
+        }
+
+        if (data.html) {
+            document.getElementById('sessao-status').outerHTML = data.html.status;
+            document.getElementById('sessao-acoes').innerHTML = data.html.acoes;
+        }
+
+        if (mensagemSucesso) {
+            alert(mensagemSucesso);
+        }
+    })
+    .catch(() => alert(mensagemErro));
+}
+
+function marcarRealizada(id) {
+    if (confirm('Marcar esta sessão como realizada?')) {
+        atualizarStatusSessao(id, 'marcar-realizada', 'Erro ao atualizar sessão');
+    }
+}
+
+function marcarFaltou(id) {
+    if (confirm('Marcar que o paciente faltou nesta sessão?')) {
+        atualizarStatusSessao(id, 'marcar-faltou', 'Erro ao atualizar sessão');
+    }
+}
+
+function cancelarSessao(id) {
+    if (confirm('Tem certeza que deseja cancelar esta sessão?')) {
+        atualizarStatusSessao(id, 'cancelar', 'Erro ao cancelar sessão');
+    }
+}
+
+function reagendarSessao(id) {
+    if (confirm('Reagendar esta sessão? Você poderá editar a data/hora depois.')) {
+        atualizarStatusSessao(id, 'reagendar', 'Erro ao reagendar sessão',
+            'Sessão reagendada! Você pode editar a data/hora agora.');
+    }
+}
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/teste.db'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacao  # noqa: E402
+from app import Pagamento, Paciente, Sessao, Usuario, app, db  # noqa: E402
+
+
+@pytest.fixture
+def cliente():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(nome='Ana', email='ana@teste.com')
+        usuario.set_password('123456')
+        db.session.add(usuario)
+        db.session.commit()
+        paciente = Paciente(nome='Paciente', psicologo_id=usuario.id)
+        db.session.add(paciente)
+        db.session.commit()
+        for dias in (1, 2):
+            db.session.add(Sessao(
+                paciente_id=paciente.id, psicologo_id=usuario.id, status='realizada',
+                data_sessao=datetime.now() - timedelta(days=dias), valor=Decimal('150.00')
+            ))
+        db.session.commit()
+    aplicacao._limitador_login = None
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'email': 'ana@teste.com', 'senha': '123456'})
+    yield cliente
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_marcar_pagas_duas_vezes_nao_duplica_pagamentos(cliente):
+    dados = {'sessao_ids': [1, 2], 'metodo': 'pix'}
+
+    primeira = cliente.post('/api/pagamentos/marcar-pagos', json=dados).get_json()
+    segunda = cliente.post('/api/pagamentos/marcar-pagos', json=dados).get_json()
+
+    assert primeira['quantidade'] == 2
+    assert segunda['success'] and segunda['quantidade'] == 0
+    with app.app_context():
+        pagamentos = Pagamento.query.order_by(Pagamento.sessao_id).all()
+        assert [p.sessao_id for p in pagamentos] == [1, 2]
+        assert sum(p.valor for p in pagamentos) == Decimal('300.00')
+
+
+def test_pagamento_parcial_limitado_ao_saldo(cliente):
+    cliente.post('/api/marcar_pagamento/1', json={'metodo': 'pix', 'valor': '100'})
+    resposta = cliente.post('/api/marcar_pagamento/1', json={'metodo': 'pix', 'valor': '100'})
+
+    assert resposta.get_json()['valor'] == 50.0
+    assert cliente.post('/api/marcar_pagamento/1', json={'metodo': 'pix'}).status_code == 404